@@ -0,0 +1,67 @@
+import os
+import json
+import asyncio
+from fastapi import APIRouter, Depends, Header, HTTPException, Request
+from fastapi.responses import StreamingResponse
+from app.services.events import event_bus
+from app.services.slot_admin import (
+    BulkSlotRequest, OPERATIONS,
+    expand_slots, create_job, get_job, list_jobs, run_job
+)
+
+# Admin endpoints are disabled unless ADMIN_API_TOKEN is set
+ADMIN_API_TOKEN = os.getenv("ADMIN_API_TOKEN")
+
+def require_admin(x_admin_token: str = Header(None)):
+    if not ADMIN_API_TOKEN or x_admin_token != ADMIN_API_TOKEN:
+        raise HTTPException(status_code=403, detail="Admin access denied")
+
+router = APIRouter(prefix="/admin/slots", dependencies=[Depends(require_admin)])
+# Keeps running jobs referenced until they finish
+_running = set()
+
+@router.post("/{operation}", status_code=202)
+async def bulk_slots(operation: str, request: BulkSlotRequest):
+    """Starts a bulk create/block/unblock/delete job; poll /admin/slots/jobs/{job_id} for progress."""
+    if operation not in OPERATIONS:
+        raise HTTPException(status_code=404, detail=f"Unknown operation '{operation}'")
+    try:
+        slots = expand_slots(request)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    job = create_job(operation, len(slots))
+    task = asyncio.create_task(asyncio.to_thread(run_job, job, slots))
+    _running.add(task)
+    task.add_done_callback(_running.discard)
+    return job.to_dict()
+
+@router.get("/jobs")
+def jobs():
+    return list_jobs()
+
+@router.get("/jobs/{job_id}")
+def job_status(job_id: str):
+    job = get_job(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job.to_dict()
+
+@router.get("/events")
+async def slot_events(request: Request):
+    """Server-sent events for every slot/appointment change, including other workers' (via the change stream)."""
+    subscription = event_bus.subscribe()
+
+    async def stream():
+        try:
+            while not await request.is_disconnected():
+                try:
+                    event = await asyncio.wait_for(subscription.get(), timeout=15)
+                except asyncio.TimeoutError:
+                    yield ": keepalive\n\n"
+                    continue
+                yield f"event: {event.type}\ndata: {json.dumps(event.to_dict(), default=str)}\n\n"
+        finally:
+            subscription.close()
+
+    return StreamingResponse(stream(), media_type="text/event-stream")
@@ -1,16 +1,27 @@
 from fastapi import APIRouter, Depends, Form, Response, WebSocket, Request
 from app.services.bookings import (
     HoldSlotRequest, ConfirmAppointmentRequest,
-    hold_slot, confirm_appointment,
-    get_appointments_by_phone, cancel_appointment,
-    resend_confirmation
+    hold_slot, confirm_appointment, send_sms_notification
 )
-from app.services.slots import get_available_slots
-from app.services.gemini_service import GeminiService
-from app.services.llm_interface import LLMInterface
+from app.services.slots import list_available_slots
+from app.services.llm_factory import create_llm_service
+from app.services.llm_interface import LLMInterface, ToolCall
+from app.services.tool_loop import tool_executor
+from app.services.idempotency import tool_cache, current_conversation
+from app.services.response_cache import CachedLLM
+from app.services.waitlist import handle_offer_reply, is_offer_reply, snapshot as waitlist_snapshot
+from app.services.events import event_bus
+from app.services.slot_versions import snapshot as slot_versions_snapshot
+from app.services import admission
+from app.background.reminders import snapshot as reminders_snapshot
+from app.background.sms_replies import enqueue_sms, mark_seen
+from app.voice.vad import VoiceActivityDetector
+from app.voice.recorder import CallRecorder
+from app.voice.pipeline import InboundAudioQueue, OutboundAudioPacer, record_call_totals, pipeline_totals
+from app.voice.tracing import start_call_trace, tracing_stats
 from twilio.twiml.messaging_response import MessagingResponse
 from twilio.twiml.voice_response import VoiceResponse, Connect
-import os, json, base64, asyncio
+import os, json, base64, asyncio, time
 from datetime import datetime
 from google import genai
 from google.genai import types
@@ -22,17 +33,18 @@ import traceback
 os.environ['WEBSOCKETS_MAX_SIZE'] = str(2**24)
 
 router = APIRouter()
-llm = GeminiService()
+# Repeated availability/FAQ questions are answered from cache instead of a new Gemini round trip
+llm = CachedLLM(create_llm_service())
 MODEL_ID = "gemini-2.5-flash-native-audio-preview-09-2025"
+# Calls over the voice limit: "hold" plays a hold message and retries, "text" goes straight to SMS
+VOICE_OVERFLOW_MODE = os.getenv("VOICE_OVERFLOW_MODE", "hold").lower()
+VOICE_OVERFLOW_HOLD_SECONDS = int(os.getenv("VOICE_OVERFLOW_HOLD_SECONDS", "20"))
+VOICE_OVERFLOW_MAX_HOLDS = int(os.getenv("VOICE_OVERFLOW_MAX_HOLDS", "2"))
+OVERFLOW_SMS = ("Sorry we couldn't take your call just now. Reply to this message with the day and time "
+                "you'd like and we'll book your appointment by text.")
 
-FUNCTIONS = {
-    "get_available_slots": get_available_slots,
-    "hold_slot": hold_slot,
-    "confirm_appointment": confirm_appointment,
-    "get_appointments_by_phone": get_appointments_by_phone,
-    "cancel_appointment": cancel_appointment,
-    "resend_confirmation": resend_confirmation,
-}
+# Queued by the receive loop when the VAD detects end of speech
+FLUSH = object()
 
 def _patched_ws_connect(uri, **kwargs):
     kwargs['ping_interval'] = 10
@@ -49,33 +61,84 @@ def hold(request: HoldSlotRequest):
 @router.post("/appointments/confirm")
 def confirm(request: ConfirmAppointmentRequest):
     return confirm_appointment(slot_id=request.slot_id,
-                               phone_number=request.phone_number)
+                               phone_number=request.phone_number,
+                               hold_token=request.hold_token)
 
 @router.get("/slots")
 def list_slots():
-    return get_available_slots()
+    return list_available_slots()
+
+def get_llm() -> LLMInterface:
+    return llm
 
 @router.post("/chat")
 async def chat_with_receptionist(
     user_message: str,
-    llm: LLMInterface = Depends(GeminiService)
+    llm: LLMInterface = Depends(get_llm)
 ):
-    response = llm.generate_response(user_message)
+    response = await llm.agenerate(user_message)
     return {"reply": response}
 
 @router.post("/sms/webhook")
-async def handle_sms(From: str = Form(...), Body: str = Form(...)):
+async def handle_sms(
+    From: str = Form(...),
+    Body: str = Form(...),
+    MessageSid: str = Form(None),
+    To: str = Form(None)
+):
     clean_phone = From.replace("whatsapp:", "")
     prompt_with_context = f"[User Phone: {clean_phone}] {Body}"
-    ai_reply = llm.generate_response(prompt_with_context)
     response = MessagingResponse()
+
+    if MessageSid and not mark_seen(MessageSid):
+        # Twilio retry of a message we already accepted: must not count against the sender
+        print(f"DEBUG: Duplicate webhook for {MessageSid} ignored")
+        return Response(content=str(response), media_type="application/xml")
+
+    # YES/NO to a waitlist offer is cheap and time-critical, so it skips the per-phone limit
+    offer_reply = await asyncio.to_thread(is_offer_reply, clean_phone, Body)
+    if not offer_reply and not admission.sms_senders.allow(clean_phone):
+        # Flooding sender: no LLM turn, one busy reply until they are allowed through again
+        print(f"⚠️  SMS rate limit hit for {clean_phone}")
+        if admission.sms_senders.first_refusal(clean_phone):
+            response.message(admission.BUSY_REPLY)
+        return Response(content=str(response), media_type="application/xml")
+
+    if admission.SMS_REPLY_MODE == "async":
+        # Empty TwiML acknowledges the webhook; the reply is sent by the background worker
+        enqueue_sms(llm, MessageSid, From, To, prompt_with_context)
+        return Response(content=str(response), media_type="application/xml")
+
+    current_conversation.set(clean_phone)
+    ai_reply = await asyncio.to_thread(handle_offer_reply, clean_phone, Body)
+    if ai_reply is None:
+        ai_reply = await admission.sms_turn(llm, prompt_with_context)
     response.message(ai_reply)
     return Response(content=str(response), media_type="application/xml")
 
+@router.get("/metrics")
+def metrics():
+    """Runtime counters, e.g. how many duplicate tool calls were absorbed."""
+    return {
+        "tool_dedup": tool_cache.snapshot(),
+        "tools": tool_executor.snapshot(),
+        "llm_response_cache": llm.snapshot(),
+        "voice_pipeline": dict(pipeline_totals),
+        "voice_tracing": tracing_stats(),
+        "waitlist": waitlist_snapshot(),
+        "events": event_bus.snapshot(),
+        "slot_conflicts": slot_versions_snapshot(),
+        "admission": admission.snapshot(),
+        "reminders": reminders_snapshot(),
+    }
+
 @router.post("/voice/webhook")
 async def handle_voice_entry(request: Request):
     """Initial entry point for the call — connects Twilio to our WebSocket."""
     response = VoiceResponse()
+    if not admission.voice.reserve():
+        form = await request.form()
+        return voice_overflow(response, form.get("From"), hold_count(request.query_params.get("holds")))
     host = request.headers.get("host")
     stream_url = f"wss://{host}/api/v1/voice/stream"
     connect = Connect()
@@ -85,9 +148,48 @@ async def handle_voice_entry(request: Request):
     return Response(content=str(response), media_type="application/xml")
 
 
+def hold_count(value) -> int:
+    """The ?holds= counter we put on the redirect; anything malformed counts as a first attempt."""
+    try:
+        return max(0, int(value))
+    except (TypeError, ValueError):
+        return 0
+
+
+def voice_overflow(response: VoiceResponse, caller: str, holds: int):
+    """TwiML for a call over the voice limit: hold and retry, then fall back to booking by text."""
+    if VOICE_OVERFLOW_MODE == "hold" and holds < VOICE_OVERFLOW_MAX_HOLDS:
+        print(f"⏳ Voice at capacity, holding caller (hold {holds + 1}/{VOICE_OVERFLOW_MAX_HOLDS})")
+        if holds == 0:
+            response.say("Thanks for calling The Tech Clinic. All of our lines are busy right now. Please stay on the line.")
+        response.pause(length=VOICE_OVERFLOW_HOLD_SECONDS)
+        response.redirect(f"/api/v1/voice/webhook?holds={holds + 1}", method="POST")
+    else:
+        print(f"📵 Voice at capacity, moving caller {caller} to SMS")
+        if caller:
+            asyncio.get_running_loop().run_in_executor(None, send_sms_notification, caller, OVERFLOW_SMS)
+            response.say("Sorry, we're still busy. We've sent you a text message so you can book your appointment by text. Goodbye.")
+        else:
+            response.say("Sorry, all of our lines are busy. Please call back in a few minutes. Goodbye.")
+        response.hangup()
+    return Response(content=str(response), media_type="application/xml")
+
+
 @router.websocket("/voice/stream")
 async def voice_stream(websocket: WebSocket):
     await websocket.accept()
+    # Normally claims the capacity the webhook reserved; direct connections are admitted here
+    if not admission.voice.claim():
+        print("📵 Voice stream rejected: at capacity")
+        await websocket.close(code=1013)
+        return
+    try:
+        await run_voice_session(websocket)
+    finally:
+        admission.voice.release()
+
+
+async def run_voice_session(websocket: WebSocket):
     print("🚀 Voice Stream Connected")
 
     client = genai.Client(
@@ -113,11 +215,20 @@ async def voice_stream(websocket: WebSocket):
                     "Get available appointment slots for a given date (YYYY-MM-DD). "
                     "MUST be called before discussing any available times. "
                     "Always convert relative dates like 'tomorrow' or 'next Monday' "
-                    "to YYYY-MM-DD format before calling this."
+                    "to YYYY-MM-DD format before calling this. "
+                    "Returns only times that haven't passed, as slot_id and time."
                 ),
                 "parameters": {
                     "type": "OBJECT",
-                    "properties": {"date": {"type": "STRING"}},
+                    "properties": {
+                        "date": {"type": "STRING"},
+                        "time_preference": {
+                            "type": "STRING",
+                            "enum": ["morning", "afternoon", "evening", "exact_time"],
+                            "description": "Narrow the list when the caller asks for a part of the day or an exact time"
+                        },
+                        "exact_time": {"type": "STRING", "description": "HH:MM 24h, with time_preference exact_time"}
+                    },
                     "required": ["date"]
                 }
             },
@@ -140,16 +251,17 @@ async def voice_stream(websocket: WebSocket):
                 "name": "confirm_appointment",
                 "description": (
                     "Permanently confirm and book an appointment. "
-                    "Also call this to RESEND a confirmation SMS — use the same slot_id and phone_number. "
+                    "Pass the hold_token that hold_slot returned for this slot. "
                     "MUST be called before saying a booking is confirmed."
                 ),
                 "parameters": {
                     "type": "OBJECT",
                     "properties": {
                         "slot_id": {"type": "STRING"},
-                        "phone_number": {"type": "STRING"}
+                        "phone_number": {"type": "STRING"},
+                        "hold_token": {"type": "STRING"}
                     },
-                    "required": ["slot_id", "phone_number"]
+                    "required": ["slot_id", "phone_number", "hold_token"]
                 }
             },
             {
@@ -181,6 +293,21 @@ async def voice_stream(websocket: WebSocket):
                     "properties": {"phone_number": {"type": "STRING"}},
                     "required": ["phone_number"]
                 }
+            },
+            {
+                "name": "join_waitlist",
+                "description": "Add the patient to the waitlist when no available slot suits them. They get an SMS offer if a matching slot opens up.",
+                "parameters": {
+                    "type": "OBJECT",
+                    "properties": {
+                        "phone_number": {"type": "STRING"},
+                        "start_date": {"type": "STRING", "description": "First acceptable date, YYYY-MM-DD"},
+                        "end_date": {"type": "STRING", "description": "Last acceptable date, YYYY-MM-DD"},
+                        "earliest_time": {"type": "STRING", "description": "Earliest acceptable start time, HH:MM 24h"},
+                        "latest_time": {"type": "STRING", "description": "Latest acceptable start time, HH:MM 24h"}
+                    },
+                    "required": ["phone_number", "start_date"]
+                }
             }
         ]}],
         "system_instruction": (
@@ -198,7 +325,8 @@ async def voice_stream(websocket: WebSocket):
             "5. NEVER invent slot IDs, times, or confirmation details.\n"
             "6. Always get the patient's phone number before calling hold_slot or confirm_appointment.\n"
             "7. If patient says 'didn't get SMS' or 'resend confirmation', call resend_confirmation with their phone number.\n"
-            "8. To check existing bookings, call get_appointments_by_phone first.\n"
+            "8. To check existing bookings, call get_appointments_by_phone first. "
+            "If no available time suits the patient, offer the waitlist and call join_waitlist.\n"
             "9. NEVER say you sent a message without calling a tool that actually sends it.\n"
             "10. If the patient interrupts you while you are speaking, stop immediately and listen. "
             "Do not finish your sentence. Acknowledge briefly if needed and respond to what they said.\n"
@@ -209,7 +337,13 @@ async def voice_stream(websocket: WebSocket):
 
     async with client.aio.live.connect(model=MODEL_ID, config=config) as session:
         stream_sid = None
-        audio_queue = asyncio.Queue()
+        audio_queue = InboundAudioQueue()
+        outbound = OutboundAudioPacer(websocket)
+        vad = VoiceActivityDetector()
+        resample_state = None
+        recorder = None   # created on Twilio "start" when CALL_RECORDING_DIR is set
+        call_trace = start_call_trace()
+        turn_timer = admission.TurnTimer(admission.voice)
         greeting_done = asyncio.Event()
         print("✅ Gemini session established")
 
@@ -217,8 +351,13 @@ async def voice_stream(websocket: WebSocket):
             turns={"role": "user", "parts": [{"text": "Greet the caller warmly and ask how you can help them today."}]},
             turn_complete=True
         )
+        call_trace.start_turn(kind="greeting")
         print("✅ Greeting sent to Gemini")
 
+        async def run_tool(call):
+            with call_trace.span(f"tool {call.name}", {"tool.name": call.name}):
+                return await tool_executor.run(call, conversation=stream_sid)
+
         async def send_to_twilio():
             """
             Receives responses from Gemini and forwards audio to Twilio.
@@ -235,40 +374,41 @@ async def voice_stream(websocket: WebSocket):
                         )'''
 
                         if message.tool_call:
-                            for fc in message.tool_call.function_calls:
-                                f_name = fc.name
-                                f_args = fc.args
-                                print(f"🛠️  Tool called: {f_name} with {f_args}")
-                                func = FUNCTIONS.get(f_name)
-                                try:
-                                    result = func(**f_args) if func else {"error": "Function not found"}
-                                    print(f"✅ Tool result: {result}")
-                                except Exception as e:
-                                    print(f"❌ Tool error: {e}")
-                                    result = {"error": str(e)}
-                                await session.send_tool_response(
-                                    function_responses=types.FunctionResponse(
-                                        name=f_name,
-                                        id=fc.id,
-                                        response={"result": result}
-                                    )
-                                )
+                            # Off the event loop, with timeouts; concurrently unless one of them writes
+                            calls = [
+                                ToolCall(name=fc.name, args=dict(fc.args or {}), id=fc.id)
+                                for fc in message.tool_call.function_calls
+                            ]
+                            for call in calls:
+                                print(f"🛠️  Tool called: {call.name} with {call.args}")
+                                if recorder:
+                                    recorder.event("tool_call", name=call.name, args=call.args)
+                            results = await tool_executor.run_all(calls, run=run_tool)
+                            for call, result in zip(calls, results):
+                                print(f"✅ Tool result: {result}")
+                                if recorder:
+                                    recorder.event("tool_result", name=call.name, result=result)
+                            await session.send_tool_response(
+                                function_responses=[
+                                    types.FunctionResponse(name=call.name, id=call.id, response={"result": result})
+                                    for call, result in zip(calls, results)
+                                ]
+                            )
 
                         if message.server_content:
 
                             # BARGE-IN: user spoke while Gemini was talking.
-                            # Gemini stops generating; we flush Twilio's audio buffer
-                            # so the caller doesn't hear the tail end of the sentence.
+                            # Gemini stops generating; we drop our unsent audio and flush
+                            # Twilio's buffer so the caller doesn't hear the tail end of the sentence.
                             if message.server_content.interrupted:
-                                print("🤚 Barge-in detected — clearing Twilio audio buffer")
-                                if stream_sid:
-                                    try:
-                                        await websocket.send_json({
-                                            "event": "clear",
-                                            "streamSid": stream_sid
-                                        })
-                                    except Exception as e:
-                                        print(f"❌ Failed to send clear: {e}")
+                                print("🤚 Barge-in detected — clearing outbound and Twilio audio buffers")
+                                if recorder:
+                                    recorder.event("interrupted")
+                                call_trace.end_turn(interrupted=True)
+                                try:
+                                    await outbound.clear()
+                                except Exception as e:
+                                    print(f"❌ Failed to send clear: {e}")
 
                             if message.server_content.model_turn:
                                 for part in message.server_content.model_turn.parts:
@@ -279,21 +419,26 @@ async def voice_stream(websocket: WebSocket):
                                         if remainder:
                                             raw_audio = raw_audio[:-remainder]
                                         if raw_audio:
+                                            call_trace.model_audio()
+                                            turn_timer.model_audio()
                                             try:
                                                 # Gemini outputs 24kHz PCM → 8kHz μ-law for Twilio
+                                                started = time.perf_counter_ns()
                                                 resampled, _ = audioop.ratecv(raw_audio, 2, 1, 24000, 8000, None)
                                                 mulaw = audioop.lin2ulaw(resampled, 2)
-                                                payload = base64.b64encode(mulaw).decode('utf-8')
-                                                await websocket.send_json({
-                                                    "event": "media",
-                                                    "streamSid": stream_sid,
-                                                    "media": {"payload": payload}
-                                                })
+                                                call_trace.transcode("outbound", time.perf_counter_ns() - started)
+                                                if recorder:
+                                                    recorder.outbound(resampled)
+                                                # Paced to real time by the outbound task
+                                                outbound.push(mulaw)
                                             except Exception as e:
                                                 print(f"❌ Audio conversion error: {e}")
 
                             if message.server_content.turn_complete:
                                 print("✅ Turn complete — looping for next turn")
+                                if recorder:
+                                    recorder.event("turn_complete")
+                                call_trace.end_turn()
                                 greeting_done.set()
 
             except asyncio.CancelledError:
@@ -310,11 +455,7 @@ async def voice_stream(websocket: WebSocket):
             Waits for greeting to finish, drains accumulated audio, then forwards.
             """
             await greeting_done.wait()
-            drained = 0
-            while not audio_queue.empty():
-                audio_queue.get_nowait()
-                audio_queue.task_done()
-                drained += 1
+            drained = audio_queue.drain_audio()
             print(f"Greeting done — drained {drained} pre-greeting chunks, forwarding user audio")
 
             audio_buffer = bytearray()
@@ -322,33 +463,36 @@ async def voice_stream(websocket: WebSocket):
 
             try:
                 while True:
-                    try:
-                        chunk = await asyncio.wait_for(audio_queue.get(), timeout=2.0)
-                        if chunk is None:   # poison pill — call ended
-                            break
-                        audio_buffer.extend(chunk)
-                        audio_queue.task_done()
-
-                        while len(audio_buffer) >= SEND_SIZE:
-                            await session.send_realtime_input(
-                                media=types.Blob(
-                                    data=bytes(audio_buffer[:SEND_SIZE]),
-                                    mime_type="audio/pcm;rate=16000"
-                                )
-                            )
-                            audio_buffer = audio_buffer[SEND_SIZE:]
-                            #print(f"Sent {SEND_SIZE} bytes to Gemini")
-
-                    except asyncio.TimeoutError:
-                        if audio_buffer:
-                            await session.send_realtime_input(
-                                media=types.Blob(
-                                    data=bytes(audio_buffer),
-                                    mime_type="audio/pcm;rate=16000"
+                    chunk = await audio_queue.get()
+                    if chunk is None:   # poison pill — call ended
+                        break
+
+                    if chunk is FLUSH:
+                        call_trace.flush_dequeued()
+                        # Caller stopped talking — push the partial tail now, then tell
+                        # Gemini the stream is paused so it closes the turn without waiting
+                        with call_trace.span("gemini.send_audio_tail", {"bytes": len(audio_buffer)}):
+                            if audio_buffer:
+                                await session.send_realtime_input(
+                                    media=types.Blob(
+                                        data=bytes(audio_buffer),
+                                        mime_type="audio/pcm;rate=16000"
+                                    )
                                 )
+                            await session.send_realtime_input(audio_stream_end=True)
+                        audio_buffer = bytearray()
+                        continue
+
+                    audio_buffer.extend(chunk)
+                    while len(audio_buffer) >= SEND_SIZE:
+                        await session.send_realtime_input(
+                            media=types.Blob(
+                                data=bytes(audio_buffer[:SEND_SIZE]),
+                                mime_type="audio/pcm;rate=16000"
                             )
-                            print(f"Flushed {len(audio_buffer)} bytes on timeout")
-                            audio_buffer = bytearray()
+                        )
+                        audio_buffer = audio_buffer[SEND_SIZE:]
+                        #print(f"Sent {SEND_SIZE} bytes to Gemini")
 
             except asyncio.CancelledError:
                 print("🛑 send_to_gemini cancelled (call ended)")
@@ -368,8 +512,10 @@ async def voice_stream(websocket: WebSocket):
 
         send_task = asyncio.create_task(send_to_twilio())
         gemini_task = asyncio.create_task(send_to_gemini())
+        pacer_task = asyncio.create_task(outbound.run())
         send_task.add_done_callback(task_exception_handler)
         gemini_task.add_done_callback(task_exception_handler)
+        pacer_task.add_done_callback(task_exception_handler)
 
         try:
             while True:
@@ -382,23 +528,43 @@ async def voice_stream(websocket: WebSocket):
 
                 elif event == "start":
                     stream_sid = data['start']['streamSid']
+                    outbound.stream_sid = stream_sid
+                    recorder = CallRecorder.open(stream_sid)
+                    call_trace.set_stream_sid(stream_sid)
                     print(f"📞 Call started — StreamSid: {stream_sid}")
 
                 elif event == "media":
                     payload    = data['media']['payload']
+                    call_trace.twilio_media(data['media'].get('timestamp'))
+                    started    = time.perf_counter_ns()
                     mu_law     = base64.b64decode(payload)
                     pcm_8k     = audioop.ulaw2lin(mu_law, 2)
-                    pcm_8k     = audioop.mul(pcm_8k, 2, 1.5)         # slight volume boost
-                    # Gemini requires 16kHz — upsample from Twilio's 8kHz
-                    pcm_16k, _ = audioop.ratecv(pcm_8k, 2, 1, 8000, 16000, None)
-                    await audio_queue.put(pcm_16k)
+                    decoded    = time.perf_counter_ns()
+                    if recorder:
+                        recorder.inbound(pcm_8k)
+                    # VAD drops long silences and applies adaptive gain
+                    voiced, end_of_speech = vad.process(pcm_8k)
+                    vad_done   = time.perf_counter_ns()
+                    if voiced:
+                        # Gemini requires 16kHz — upsample from Twilio's 8kHz
+                        pcm_16k, resample_state = audioop.ratecv(voiced, 2, 1, 8000, 16000, resample_state)
+                        audio_queue.put_nowait(pcm_16k)
+                    call_trace.transcode("vad", vad_done - decoded)
+                    call_trace.transcode("inbound", (decoded - started) + (time.perf_counter_ns() - vad_done))
+                    if end_of_speech:
+                        resample_state = None
+                        call_trace.speech_ended()
+                        turn_timer.speech_ended()
+                        audio_queue.put_nowait(FLUSH)
 
                 elif event == "stop":
                     print("📞 Call ended")
                     break
 
                 elif event == "mark":
-                    pass
+                    # Twilio has played our audio up to this mark
+                    outbound.on_mark(data['mark']['name'])
+                    call_trace.playback_acked()
 
                 else:
                     print(f"Unknown Twilio event: {event}")
@@ -406,10 +572,22 @@ async def voice_stream(websocket: WebSocket):
         except Exception as e:
             print(f"❌ WebSocket error: {e}")
         finally:
-            await audio_queue.put(None)
+            print(f"🎚️  VAD stats: {vad.stats()}")
+            print(f"📊 Inbound queue: {audio_queue.stats()} | Outbound: {outbound.stats()}")
+            record_call_totals(audio_queue, outbound)
+            audio_queue.put_nowait(None)
             send_task.cancel()
             gemini_task.cancel()
-            await asyncio.gather(send_task, gemini_task, return_exceptions=True)
+            pacer_task.cancel()
+            await asyncio.gather(send_task, gemini_task, pacer_task, return_exceptions=True)
+            # After the tasks stop, so no span is added once the trace is queued for export
+            call_trace.finish({
+                "vad.suppressed_ratio": vad.stats()["suppressed_ratio"],
+                "inbound.dropped_bytes": audio_queue.stats()["dropped_bytes"],
+                "outbound.dropped_bytes": outbound.stats()["dropped_bytes"],
+            })
+            if recorder:
+                await asyncio.to_thread(recorder.close)
             try:
                 await websocket.close()
             except Exception:
@@ -0,0 +1,176 @@
+import os
+import time
+import asyncio
+from botocore.exceptions import ClientError
+from boto3.dynamodb.types import TypeDeserializer
+from app.db import dynamodb, dynamodb_streams, slots_table, appointments_table
+from app.services.events import (
+    event_bus, ChangeEvent,
+    SLOT_CREATED, SLOT_HELD, SLOT_BOOKED, SLOT_RELEASED, SLOT_EXPIRED,
+    SLOT_BLOCKED, SLOT_UNBLOCKED, SLOT_DELETED,
+    APPOINTMENT_CONFIRMED, APPOINTMENT_CANCELLED, APPOINTMENT_UPDATED
+)
+
+# Follows DynamoDB Streams on the Slots and Appointments tables and republishes
+# changes made by other workers on the local event bus (remote=True), so
+# their holds/bookings invalidate this worker's caches without table scans.
+# Our own writes come back on the stream too and are skipped via
+# event_bus.is_echo(). DynamoDB Local supports Streams, so the same code runs
+# against DYNAMODB_ENDPOINT_URL in development.
+#
+# Streams must be enabled on the tables (setup_slots.py does this).
+
+CHANGE_STREAM_ENABLED = os.getenv("CHANGE_STREAM_ENABLED", "").lower() in ("1", "true", "yes")
+POLL_SECONDS = float(os.getenv("CHANGE_STREAM_POLL_SECONDS", "1"))
+SHARD_REFRESH_SECONDS = 30
+
+_deserializer = TypeDeserializer()
+
+
+def _image(record: dict, name: str) -> dict:
+    return {k: _deserializer.deserialize(v) for k, v in record["dynamodb"].get(name, {}).items()}
+
+
+def _slot_event_type(event_name: str, old: dict, new: dict, created_at: float):
+    if event_name == "INSERT":
+        return SLOT_CREATED
+    if event_name == "REMOVE":
+        return SLOT_DELETED
+    old_status, new_status = old.get("status"), new.get("status")
+    if old_status == new_status:
+        return None
+    if new_status == "HELD":
+        return SLOT_HELD
+    if new_status == "BOOKED":
+        return SLOT_BOOKED
+    if new_status == "BLOCKED":
+        return SLOT_BLOCKED
+    if new_status == "AVAILABLE":
+        if old_status == "BLOCKED":
+            return SLOT_UNBLOCKED
+        if old_status == "HELD" and (old.get("hold_expires_at") or 0) <= created_at:
+            return SLOT_EXPIRED
+        return SLOT_RELEASED
+    return None
+
+
+def record_to_event(table_name: str, record: dict):
+    """Converts a stream record to a remote ChangeEvent, or None if it isn't a state transition."""
+    old, new = _image(record, "OldImage"), _image(record, "NewImage")
+    keys = _image(record, "Keys")
+    created_at = record["dynamodb"].get("ApproximateCreationDateTime", time.time())
+    if hasattr(created_at, "timestamp"):
+        created_at = created_at.timestamp()
+
+    if table_name == slots_table.name:
+        key = keys.get("slot_id")
+        event_type = _slot_event_type(record["eventName"], old, new, created_at)
+    else:
+        key = keys.get("appointment_id")
+        event_type = {"INSERT": APPOINTMENT_CONFIRMED, "REMOVE": APPOINTMENT_CANCELLED}.get(record["eventName"], APPOINTMENT_UPDATED)
+    if event_type is None or key is None:
+        return None
+
+    data = {k: v for k, v in (new or old).items() if k in ("phone_number", "slot_id", "date", "start_time")}
+    return ChangeEvent(event_type, key, old.get("status"), new.get("status"), data, source="stream", remote=True)
+
+
+class StreamTailer:
+    """Reads every open shard of one table's stream, resuming after the last record seen."""
+
+    def __init__(self, table_name: str):
+        self.table_name = table_name
+        self.iterators = {}        # shard_id -> shard iterator
+        self.last_sequence = {}    # shard_id -> last sequence number read
+        self.finished = set()      # closed shards fully read
+        self.expired = set()       # shards whose iterator expired before anything was read
+        self._started = False
+        self.records = 0
+        self.published = 0
+
+    def refresh_shards(self):
+        table = dynamodb.meta.client.describe_table(TableName=self.table_name)["Table"]
+        stream_arn = table.get("LatestStreamArn")
+        if not stream_arn:
+            raise RuntimeError(f"Streams are not enabled on table '{self.table_name}'")
+
+        shards, kwargs = [], {"StreamArn": stream_arn}
+        while True:
+            description = dynamodb_streams.describe_stream(**kwargs)["StreamDescription"]
+            shards.extend(description.get("Shards", []))
+            if not description.get("LastEvaluatedShardId"):
+                break
+            kwargs["ExclusiveStartShardId"] = description["LastEvaluatedShardId"]
+
+        for shard in shards:
+            shard_id = shard["ShardId"]
+            if shard_id in self.iterators or shard_id in self.finished:
+                continue
+            closed = "EndingSequenceNumber" in shard["SequenceNumberRange"]
+            request = {"StreamArn": stream_arn, "ShardId": shard_id}
+            if shard_id in self.last_sequence:
+                request.update(ShardIteratorType="AFTER_SEQUENCE_NUMBER", SequenceNumber=self.last_sequence[shard_id])
+            elif not self._started or shard_id in self.expired:
+                # History from before this worker started (or before an expired iterator with
+                # no checkpoint) is already reflected in the table: don't replay up to 24h of it
+                self.expired.discard(shard_id)
+                if closed:
+                    self.finished.add(shard_id)
+                    continue
+                request["ShardIteratorType"] = "LATEST"
+            else:
+                # A shard created while we were running (split/rollover): read it from the start
+                request["ShardIteratorType"] = "TRIM_HORIZON"
+            self.iterators[shard_id] = dynamodb_streams.get_shard_iterator(**request)["ShardIterator"]
+        self._started = True
+
+    def poll(self) -> list:
+        events = []
+        for shard_id, iterator in list(self.iterators.items()):
+            try:
+                response = dynamodb_streams.get_records(ShardIterator=iterator, Limit=1000)
+            except ClientError as e:
+                if e.response["Error"]["Code"] == "ExpiredIteratorException":
+                    # Re-opened on the next refresh: after last_sequence, or at LATEST without one
+                    del self.iterators[shard_id]
+                    if shard_id not in self.last_sequence:
+                        self.expired.add(shard_id)
+                    continue
+                raise
+
+            for record in response.get("Records", []):
+                self.records += 1
+                self.last_sequence[shard_id] = record["dynamodb"]["SequenceNumber"]
+                event = record_to_event(self.table_name, record)
+                if event is not None and not event_bus.is_echo(event.key, event.new_status):
+                    events.append(event)
+
+            next_iterator = response.get("NextShardIterator")
+            if next_iterator:
+                self.iterators[shard_id] = next_iterator
+            else:
+                del self.iterators[shard_id]
+                self.finished.add(shard_id)
+        self.published += len(events)
+        return events
+
+
+async def tail_change_stream():
+    """Background task: republishes other workers' slot/appointment changes locally."""
+    tailers = [StreamTailer(slots_table.name), StreamTailer(appointments_table.name)]
+    last_refresh = 0.0
+    print(f"📡 Tailing change streams for {[t.table_name for t in tailers]}")
+    while True:
+        try:
+            if time.monotonic() - last_refresh > SHARD_REFRESH_SECONDS:
+                for tailer in tailers:
+                    await asyncio.to_thread(tailer.refresh_shards)
+                last_refresh = time.monotonic()
+            for tailer in tailers:
+                for event in await asyncio.to_thread(tailer.poll):
+                    event_bus.publish(event)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            print(f"ERROR in change stream tailer: {e}")
+        await asyncio.sleep(POLL_SECONDS)
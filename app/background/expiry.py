@@ -2,23 +2,56 @@ from app.db import slots_table
 from datetime import datetime
 import asyncio
 from app.services.bookings import current_ts
+from app.services.events import emit, SLOT_EXPIRED
+from app.services.slot_versions import record, is_conditional_failure
+from botocore.exceptions import ClientError
 import app
 
-# Auto-expire HELD slots
-async def expire_held_slots():
-    while True:
-        now_ts = current_ts()
-        response = slots_table.scan(
-            FilterExpression="#s = :held AND hold_expires_at <= :now",
-            ExpressionAttributeNames={"#s": "status"},
-            ExpressionAttributeValues={":held": "HELD", ":now": now_ts}
-        )
-        for slot in response.get("Items", []):
+def sweep_expired_holds() -> int:
+    """One pass over HELD slots whose hold has lapsed; returns how many were released.
+
+    Blocking boto3 calls: the loop below runs it off the event loop.
+    """
+    now_ts = current_ts()
+    response = slots_table.scan(
+        FilterExpression="#s = :held AND hold_expires_at <= :now",
+        ProjectionExpression="slot_id, version",
+        ExpressionAttributeNames={"#s": "status"},
+        ExpressionAttributeValues={":held": "HELD", ":now": now_ts}
+    )
+    expired = 0
+    for slot in response.get("Items", []):
+        # Only release the hold the scan saw: if the slot was confirmed or
+        # re-held since, its version moved on and the write is skipped
+        try:
             slots_table.update_item(
                 Key={"slot_id": slot["slot_id"]},
-                UpdateExpression="SET #s = :avail, hold_expires_at = :null",
+                UpdateExpression="SET #s = :avail, hold_expires_at = :null, version = version + :inc",
+                ConditionExpression="#s = :held AND version = :seen",
                 ExpressionAttributeNames={"#s": "status"},
-                ExpressionAttributeValues={":avail": "AVAILABLE", ":null": None}
+                ExpressionAttributeValues={":avail": "AVAILABLE", ":held": "HELD", ":null": None,
+                                           ":seen": slot["version"], ":inc": 1}
             )
-            print(f"Expired slot {slot['slot_id']} back to AVAILABLE")
+        except ClientError as e:
+            if is_conditional_failure(e):
+                record("expire", attempts=1, conflicts=1)
+                print(f"Skipped expiring slot {slot['slot_id']}: it changed since the sweep read it")
+            else:
+                # Throttling or a transient error: the next sweep picks the slot up again
+                print(f"ERROR expiring slot {slot['slot_id']}: {e}")
+            continue
+        record("expire", attempts=1)
+        emit(SLOT_EXPIRED, slot["slot_id"], "HELD", "AVAILABLE")
+        print(f"Expired slot {slot['slot_id']} back to AVAILABLE")
+        expired += 1
+    return expired
+
+
+# Auto-expire HELD slots
+async def expire_held_slots():
+    while True:
+        try:
+            await asyncio.to_thread(sweep_expired_holds)
+        except Exception as e:
+            print(f"ERROR in hold expiry sweep: {e}")
         await asyncio.sleep(5)
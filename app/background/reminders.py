@@ -0,0 +1,231 @@
+import os
+import time
+import asyncio
+from datetime import datetime, timedelta
+from boto3.dynamodb.conditions import Key, Attr
+from botocore.exceptions import ClientError
+from app.db import appointments_table, reminders_table
+from app.services.bookings import send_sms_notification
+from app.services.events import event_bus, APPOINTMENT_CONFIRMED, APPOINTMENT_CANCELLED
+from app.services.rate_limit import TokenBucket
+
+# Day-before and hour-before appointment reminders.
+#
+# Confirmed appointments are indexed in the Reminders table under the hour
+# they start in (bucket "YYYY-MM-DDTHH", sort key appointment_id). Each tick
+# the scheduler Queries only the buckets whose reminders are coming due, so
+# its cost follows the number of appointments in that hour rather than the
+# size of the Appointments table. A send is claimed first with a conditional
+# write of its "sent_<kind>" marker: restarts and parallel workers never send
+# the same reminder twice, and a failed send clears the marker for a retry.
+# A booking made inside a reminder's window (e.g. 20 minutes ahead) is indexed
+# with that marker already set: the confirmation SMS has just gone out.
+
+REMINDERS_ENABLED = os.getenv("REMINDERS_ENABLED", "true").lower() in ("1", "true", "yes")
+TICK_SECONDS = float(os.getenv("REMINDER_TICK_SECONDS", "60"))
+SENDS_PER_SECOND = float(os.getenv("REMINDER_SENDS_PER_SECOND", "10"))
+MAX_CONCURRENT_SENDS = int(os.getenv("REMINDER_MAX_CONCURRENT_SENDS", "8"))
+
+# kind -> how long before the appointment it goes out
+REMINDER_KINDS = {
+    "day_before": timedelta(hours=24),
+    "hour_before": timedelta(hours=1),
+}
+
+_stats = {"indexed": 0, "unindexed": 0, "ticks": 0, "buckets_queried": 0, "due": 0,
+          "sent": 0, "failed": 0, "already_sent": 0, "last_tick_ms": 0.0}
+
+
+def slot_start(slot_id: str) -> datetime:
+    return datetime.strptime(slot_id, "%Y-%m-%d-%H:%M")
+
+
+def bucket_for(moment: datetime) -> str:
+    return moment.strftime("%Y-%m-%dT%H")
+
+
+def index_item(appointment_id: str, slot_id: str, phone_number: str, booked_at: datetime = None) -> dict:
+    start = slot_start(slot_id)
+    item = {
+        "bucket": bucket_for(start),
+        "appointment_id": appointment_id,
+        "slot_id": slot_id,
+        "phone_number": phone_number,
+        "start_ts": int(start.timestamp()),
+        # DynamoDB TTL removes the entry a day after the appointment
+        "expires_at": int((start + timedelta(days=1)).timestamp()),
+    }
+    if booked_at is not None:
+        for kind, lead in REMINDER_KINDS.items():
+            if start - booked_at <= lead:
+                item[f"sent_{kind}"] = int(booked_at.timestamp())
+    return item
+
+
+def index_appointment(appointment_id: str, slot_id: str, phone_number: str, booked_at: datetime = None):
+    reminders_table.put_item(Item=index_item(appointment_id, slot_id, phone_number, booked_at))
+    _stats["indexed"] += 1
+
+
+_table_ready = None    # whether the Reminders table exists; None until checked
+
+
+def reminders_table_ready() -> bool:
+    """
+    Checks once that the Reminders table exists. Deployments upgraded without
+    running setup_slots.py get a single warning and no reminders, rather
+    than an error on every tick and booking.
+    """
+    global _table_ready
+    if _table_ready is None:
+        try:
+            reminders_table.load()
+            _table_ready = True
+        except ClientError as e:
+            if e.response['Error']['Code'] != 'ResourceNotFoundException':
+                raise
+            _table_ready = False
+            print("⚠️  Reminders table not found, reminders are disabled. Run `python setup_slots.py` to create it.")
+    return _table_ready
+
+
+def _on_appointment_event(event):
+    slot_id = event.data.get("slot_id")
+    if not slot_id or not reminders_table_ready():
+        return
+    if event.type == APPOINTMENT_CONFIRMED:
+        index_appointment(event.key, slot_id, event.data.get("phone_number"), booked_at=datetime.now())
+    else:
+        reminders_table.delete_item(Key={"bucket": bucket_for(slot_start(slot_id)), "appointment_id": event.key})
+        _stats["unindexed"] += 1
+
+
+# Only the worker that made the booking indexes it
+event_bus.subscribe_sync(_on_appointment_event, types={APPOINTMENT_CONFIRMED, APPOINTMENT_CANCELLED}, include_remote=False)
+
+
+def backfill_reminder_index() -> int:
+    """Indexes appointments booked before reminders existed (one-off full scan)."""
+    count, kwargs = 0, {}
+    now = datetime.now()
+    while True:
+        response = appointments_table.scan(**kwargs)
+        for item in response.get("Items", []):
+            if item.get("status") == "CONFIRMED" and item.get("slot_id") and slot_start(item["slot_id"]) > now:
+                index_appointment(item["appointment_id"], item["slot_id"], item.get("phone_number"))
+                count += 1
+        if "LastEvaluatedKey" not in response:
+            return count
+        kwargs["ExclusiveStartKey"] = response["LastEvaluatedKey"]
+
+
+def _query_bucket(bucket: str, kind: str) -> list:
+    items, kwargs = [], {
+        "KeyConditionExpression": Key("bucket").eq(bucket),
+        "FilterExpression": Attr(f"sent_{kind}").not_exists(),
+    }
+    while True:
+        response = reminders_table.query(**kwargs)
+        items.extend(response.get("Items", []))
+        if "LastEvaluatedKey" not in response:
+            return items
+        kwargs["ExclusiveStartKey"] = response["LastEvaluatedKey"]
+
+
+def _when(start: datetime, now: datetime) -> str:
+    """Worded from the actual lead time: a late tick or a catch-up send is not 'in one hour'."""
+    minutes = round((start - now).total_seconds() / 60)
+    if minutes < 90:
+        minutes = max(minutes, 1)
+        return f"in {minutes} minute{'s' if minutes != 1 else ''}, at {start:%H:%M}"
+    if start.date() == now.date():
+        return f"today at {start:%H:%M}"
+    if start.date() == (now + timedelta(days=1)).date():
+        return f"tomorrow at {start:%H:%M}"
+    return f"on {start:%A %d %B} at {start:%H:%M}"
+
+
+def _reminder_text(item: dict, now: datetime) -> str:
+    when = _when(slot_start(item["slot_id"]), now)
+    return (f"Reminder: your appointment at the Clinic is {when} ({item['slot_id']}). "
+            "Reply here if you need to reschedule or cancel.")
+
+
+def _claim_and_send(kind: str, item: dict, now: datetime) -> str:
+    """Claims the sent marker, then sends. Returns 'sent', 'failed' or 'already_sent'."""
+    key = {"bucket": item["bucket"], "appointment_id": item["appointment_id"]}
+    marker = f"sent_{kind}"
+    try:
+        reminders_table.update_item(
+            Key=key,
+            UpdateExpression="SET #m = :now",
+            ConditionExpression="attribute_not_exists(#m)",
+            ExpressionAttributeNames={"#m": marker},
+            ExpressionAttributeValues={":now": int(time.time())}
+        )
+    except ClientError as e:
+        if e.response['Error']['Code'] == 'ConditionalCheckFailedException':
+            return "already_sent"
+        raise
+
+    if item.get("phone_number") and send_sms_notification(item["phone_number"], _reminder_text(item, now)):
+        return "sent"
+    # Release the claim so the next tick retries
+    reminders_table.update_item(Key=key, UpdateExpression="REMOVE #m", ExpressionAttributeNames={"#m": marker})
+    return "failed"
+
+
+async def send_due_reminders(limiter: TokenBucket, now: datetime = None) -> dict:
+    """One scheduler tick: queries the due buckets and sends their reminders through the rate limiter."""
+    now = now or datetime.now()
+    started = time.perf_counter()
+    due = []
+    for kind, lead in REMINDER_KINDS.items():
+        horizon = now + lead
+        # The previous hour's bucket too, to catch up after a restart or a slow tick
+        for bucket in sorted({bucket_for(horizon - timedelta(hours=1)), bucket_for(horizon)}):
+            items = await asyncio.to_thread(_query_bucket, bucket, kind)
+            _stats["buckets_queried"] += 1
+            due.extend((kind, item) for item in items if now.timestamp() < int(item["start_ts"]) <= horizon.timestamp())
+
+    sends = asyncio.Semaphore(MAX_CONCURRENT_SENDS)
+
+    async def send(kind, item):
+        async with sends:
+            await limiter.acquire()
+            try:
+                return await asyncio.to_thread(_claim_and_send, kind, item, now)
+            except Exception as e:
+                print(f"ERROR sending {kind} reminder for {item['appointment_id']}: {e}")
+                return "failed"
+
+    outcomes = await asyncio.gather(*(send(kind, item) for kind, item in due))
+    tick = {"due": len(due)}
+    for outcome in outcomes:
+        tick[outcome] = tick.get(outcome, 0) + 1
+        _stats[outcome] += 1
+    _stats["ticks"] += 1
+    _stats["due"] += len(due)
+    _stats["last_tick_ms"] = round((time.perf_counter() - started) * 1000, 1)
+    if due:
+        print(f"🔔 Reminders: {tick}")
+    return tick
+
+
+async def run_reminder_scheduler():
+    """Background task: sends reminders as they come due."""
+    limiter = TokenBucket(SENDS_PER_SECOND)
+    while True:
+        try:
+            if not await asyncio.to_thread(reminders_table_ready):
+                return
+            await send_due_reminders(limiter)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            print(f"ERROR in reminder scheduler: {e}")
+        await asyncio.sleep(TICK_SECONDS)
+
+
+def snapshot() -> dict:
+    return dict(_stats, table_ready=_table_ready)
@@ -0,0 +1,104 @@
+import os
+import asyncio
+import traceback
+from collections import OrderedDict
+from app.services.bookings import twilio_client, twilio_number
+from app.services.idempotency import current_conversation
+from app.services.waitlist import handle_offer_reply
+from app.services.admission import sms_turn
+
+# Async SMS/WhatsApp replies.
+# The webhook acknowledges Twilio straight away with empty TwiML, the LLM turn
+# runs here on a per-sender worker and the answer goes back over the REST API.
+# One worker per sender keeps that sender's turns strictly in order.
+
+SEEN_SID_LIMIT = int(os.getenv("SMS_SEEN_SID_LIMIT", "5000"))
+WORKER_IDLE_SECONDS = float(os.getenv("SMS_WORKER_IDLE_SECONDS", "60"))
+FALLBACK_REPLY = "Sorry, I ran into a problem handling that message. Please try again in a moment."
+
+_seen_sids = OrderedDict()
+_sender_queues = {}
+_sender_tasks = {}
+
+
+def mark_seen(message_sid: str) -> bool:
+    """Records a MessageSid; returns False if Twilio already delivered it."""
+    if message_sid in _seen_sids:
+        _seen_sids.move_to_end(message_sid)
+        return False
+    _seen_sids[message_sid] = True
+    while len(_seen_sids) > SEEN_SID_LIMIT:
+        _seen_sids.popitem(last=False)
+    return True
+
+
+def send_reply(to: str, from_: str, body: str):
+    """Sends the assistant's reply back to the sender through the Twilio REST API."""
+    try:
+        twilio_client.messages.create(body=body, from_=from_, to=to)
+        return True
+    except Exception as e:
+        print(f"ERROR: Failed to send SMS reply to {to}: {e}")
+        return False
+
+
+def enqueue_sms(llm, message_sid: str, sender: str, recipient: str, prompt: str):
+    """
+    Queues an inbound message for background processing. The webhook has
+    already dropped Twilio retries (mark_seen) and rate-limited the sender.
+    """
+    if not recipient:
+        prefix = "whatsapp:" if sender.startswith("whatsapp:") else ""
+        recipient = f"{prefix}{twilio_number}"
+
+    queue = _sender_queues.get(sender)
+    if queue is None:
+        queue = asyncio.Queue()
+        _sender_queues[sender] = queue
+        _sender_tasks[sender] = asyncio.create_task(_sender_worker(llm, sender, queue))
+    queue.put_nowait((message_sid, recipient, prompt))
+
+
+async def _sender_worker(llm, sender: str, queue: asyncio.Queue):
+    """Processes one sender's messages in arrival order, exiting after a quiet period."""
+    try:
+        while True:
+            try:
+                message_sid, recipient, prompt = await asyncio.wait_for(queue.get(), timeout=WORKER_IDLE_SECONDS)
+            except asyncio.TimeoutError:
+                # No await between the emptiness check and the removal, so
+                # enqueue_sms can't slip a message into a queue nobody reads.
+                if queue.empty():
+                    _sender_queues.pop(sender, None)
+                    _sender_tasks.pop(sender, None)
+                    return
+                continue
+
+            # Tool threads inherit this context, so tools and history see this conversation
+            phone = sender.replace("whatsapp:", "")
+            current_conversation.set(phone)
+            try:
+                # YES/NO to a waitlist offer is answered directly, without a model turn
+                reply = await asyncio.to_thread(handle_offer_reply, phone, prompt)
+                if reply is None:
+                    # Bounded by the SMS admission limit (app/services/admission.py)
+                    reply = await sms_turn(llm, prompt)
+            except Exception as e:
+                print(f"❌ SMS turn failed for {message_sid}: {e}")
+                traceback.print_exc()
+                reply = FALLBACK_REPLY
+
+            await asyncio.to_thread(send_reply, sender, recipient, reply)
+            queue.task_done()
+    except asyncio.CancelledError:
+        _sender_queues.pop(sender, None)
+        _sender_tasks.pop(sender, None)
+        raise
+
+
+async def shutdown_sms_workers():
+    """Cancels all sender workers (called on app shutdown)."""
+    tasks = list(_sender_tasks.values())
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
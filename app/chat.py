@@ -1,12 +1,12 @@
 from fastapi import APIRouter, Depends
 from app.schemas import ChatRequest
-from app.services.gemini_service import GeminiService
+from app.services.llm_factory import create_llm_service
 from app.services.llm_interface import LLMInterface
 
 router = APIRouter()
 
 def get_llm_service()->LLMInterface:
-    return GeminiService()
+    return create_llm_service()
 
 @router.post("/chat")
 async def chat(
@@ -18,5 +18,5 @@ async def chat(
     Gemini will automatically decide if it needs to call 
     'get_available_slots' or 'hold_slot' based on the conversation.
     """
-    response_text = llm.generate_response(request.message)
+    response_text = await llm.agenerate(request.message)
     return {"reply": response_text}
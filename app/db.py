@@ -1,5 +1,7 @@
 import os
 import boto3
+from botocore.config import Config
+from boto3.dynamodb.types import TypeDeserializer
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -8,16 +10,74 @@ load_dotenv()
 aws_access_key = os.getenv("AWS_ACCESS_ID")
 aws_secret_key = os.getenv("AWS_SECRET_ACCESS_KEY")
 aws_region = os.getenv("AWS_REGION", "us-east-1")
+# Point at DynamoDB Local (e.g. http://localhost:8000) for replay runs and benchmarks
+endpoint_url = os.getenv("DYNAMODB_ENDPOINT_URL") or None
+
+# DynamoDB calls run on worker threads (asyncio.to_thread, admin/export pools,
+# the waitlist matcher), so the HTTP pool must be at least as large as the
+# number of concurrent calls or they queue inside botocore. Timeouts give
+# every call a deadline; adaptive retries back off client-side on throttling.
+MAX_POOL_CONNECTIONS = int(os.getenv("DYNAMODB_MAX_POOL_CONNECTIONS", "64"))
+RETRY_MODE = os.getenv("DYNAMODB_RETRY_MODE", "adaptive")
+MAX_ATTEMPTS = int(os.getenv("DYNAMODB_MAX_ATTEMPTS", "5"))
+CONNECT_TIMEOUT = float(os.getenv("DYNAMODB_CONNECT_TIMEOUT", "2"))
+READ_TIMEOUT = float(os.getenv("DYNAMODB_READ_TIMEOUT", "5"))
 
 print(f"🚀 DEBUG: Manual Auth Init - Region: {aws_region}")
 
-dynamodb = boto3.resource(
-    'dynamodb',
+# One session per process: clients made from it share credentials and config
+session = boto3.session.Session(
     aws_access_key_id=aws_access_key,
     aws_secret_access_key=aws_secret_key,
     region_name=aws_region
 )
 
+client_config = Config(
+    max_pool_connections=MAX_POOL_CONNECTIONS,
+    retries={"mode": RETRY_MODE, "max_attempts": MAX_ATTEMPTS},
+    connect_timeout=CONNECT_TIMEOUT,
+    read_timeout=READ_TIMEOUT,
+    tcp_keepalive=True
+)
+
+
+def make_client(service: str = "dynamodb", **overrides):
+    """Low-level client from the shared session with the tuned config; overrides are botocore Config options."""
+    config = client_config.merge(Config(**overrides)) if overrides else client_config
+    return session.client(service, endpoint_url=endpoint_url, config=config)
+
+
+dynamodb = session.resource('dynamodb', endpoint_url=endpoint_url, config=client_config)
+# Same connection pool as the resource; for hot paths that skip the resource layer
+dynamodb_client = dynamodb.meta.client
+# Read by app/background/change_stream.py to follow other workers' writes
+dynamodb_streams = make_client('dynamodbstreams')
+
+_deserializer = TypeDeserializer()
+
+
+def plain_item(item: dict) -> dict:
+    """
+    Converts a low-level client item to plain Python values (numbers become
+    int/float directly instead of Decimal), for results that go straight to
+    the LLM or JSON.
+    """
+    plain = {}
+    for key, typed in item.items():
+        (kind, value), = typed.items()
+        if kind == "S" or kind == "BOOL":
+            plain[key] = value
+        elif kind == "N":
+            plain[key] = int(value) if value.lstrip("-").isdigit() else float(value)
+        elif kind == "NULL":
+            plain[key] = None
+        else:
+            plain[key] = _deserializer.deserialize(typed)
+    return plain
+
+
 #Initialize resources and clients using the session
-slots_table = dynamodb.Table("Slots") 
-appointments_table = dynamodb.Table("Appointments")
\ No newline at end of file
+slots_table = dynamodb.Table("Slots")
+appointments_table = dynamodb.Table("Appointments")
+waitlist_table = dynamodb.Table("Waitlist")
+reminders_table = dynamodb.Table("Reminders")
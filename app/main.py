@@ -3,8 +3,12 @@ from contextlib import asynccontextmanager
 import asyncio
 
 from app.api.routes import router as api_router
+from app.api.admin import router as admin_router
 from app.chat import router as chat_router
 from app.background.expiry import expire_held_slots
+from app.background.sms_replies import shutdown_sms_workers
+from app.background.change_stream import tail_change_stream, CHANGE_STREAM_ENABLED
+from app.background.reminders import run_reminder_scheduler, REMINDERS_ENABLED
 
 # The Lifespan handles startup and shutdown in one clean block
 @asynccontextmanager
@@ -12,14 +16,23 @@ async def lifespan(app: FastAPI):
     print("🚀 Starting Receptron")
     # This runs your background task for DynamoDB slot expiry
     bg_task = asyncio.create_task(expire_held_slots())
+    # Other workers' slot/appointment changes, republished on the local event bus
+    stream_task = asyncio.create_task(tail_change_stream()) if CHANGE_STREAM_ENABLED else None
+    reminder_task = asyncio.create_task(run_reminder_scheduler()) if REMINDERS_ENABLED else None
     
     yield  # The app is now running and "alive"
     
     print("🛑 Shutting down...")
     bg_task.cancel() # Cleanly stop the background worker
+    if stream_task:
+        stream_task.cancel()
+    if reminder_task:
+        reminder_task.cancel()
+    await shutdown_sms_workers()
 
 app = FastAPI(title="AI Receptionist", lifespan=lifespan)
 
 # Including routers with clear prefixes
 app.include_router(api_router, prefix="/api/v1")
+app.include_router(admin_router, prefix="/api/v1")
 #app.include_router(chat_router, prefix="/chat/v1")
\ No newline at end of file
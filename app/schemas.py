@@ -4,8 +4,10 @@ from typing import Optional, Literal
 class ChatRequest(BaseModel):
     message: str
 
+TimePreference = Literal["morning", "afternoon", "evening", "exact_time"]
+
 class IntentResponse(BaseModel):
     intent: Literal["BOOK", "CONFIRM", "CANCEL", "ASK_AVAILABILITY", "UNKNOWN"]
     date: Optional[str]
-    time_preference: Optional[Literal["morning", "afternoon", "evening", "exact_time"]]
+    time_preference: Optional[TimePreference]
     exact_time: Optional[str]
@@ -0,0 +1,240 @@
+import os
+import time
+import asyncio
+from collections import deque, OrderedDict
+from app.services.rate_limit import TokenBucket
+
+# Admission control for the two channels that hold expensive resources:
+# voice streams (a Gemini Live session plus real-time transcoding each) and
+# SMS/WhatsApp LLM turns.
+#
+# Each channel has a concurrency limit that adapts to measured latency
+# (AIMD): when the recent p90 (time to first model audio for voice, LLM turn
+# time for SMS) is above the channel's target the limit is cut by a quarter,
+# and while latency is healthy and the limit is actually reached it grows
+# back by one, up to the configured maximum. Work over the limit is turned
+# away early and cheaply (overflow TwiML for calls, a busy reply for texts)
+# so the sessions already admitted keep their latency.
+#
+# Voice capacity is reserved when Twilio hits the webhook and claimed when
+# the media stream connects; a reservation that is never claimed lapses.
+
+VOICE_MAX_CONCURRENT_CALLS = int(os.getenv("VOICE_MAX_CONCURRENT_CALLS", "20"))
+VOICE_TARGET_FIRST_AUDIO_MS = float(os.getenv("VOICE_TARGET_FIRST_AUDIO_MS", "2000"))
+SMS_MAX_CONCURRENT_TURNS = int(os.getenv("SMS_MAX_CONCURRENT_TURNS", "4"))
+SMS_TARGET_TURN_MS = float(os.getenv("SMS_TARGET_TURN_MS", "8000"))
+# "async" acks Twilio immediately and replies over the REST API; "sync" answers inline with TwiML
+SMS_REPLY_MODE = os.getenv("SMS_REPLY_MODE", "async").lower()
+# How long a text may wait for a turn before it gets the busy reply
+SMS_QUEUE_TIMEOUT_SECONDS = float(os.getenv("SMS_QUEUE_TIMEOUT_SECONDS", "20"))
+# Twilio gives up on a webhook after 15s. Inline (sync) replies must wait and
+# run the turn inside that, so the queue wait leaves room for a target-length turn.
+TWILIO_WEBHOOK_TIMEOUT_SECONDS = 15.0
+if SMS_REPLY_MODE == "sync":
+    SMS_QUEUE_TIMEOUT_SECONDS = min(SMS_QUEUE_TIMEOUT_SECONDS,
+                                    max(1.0, TWILIO_WEBHOOK_TIMEOUT_SECONDS - SMS_TARGET_TURN_MS / 1000))
+SMS_PER_PHONE_PER_MINUTE = float(os.getenv("SMS_PER_PHONE_PER_MINUTE", "10"))
+SMS_PER_PHONE_BURST = float(os.getenv("SMS_PER_PHONE_BURST", "5"))
+
+BUSY_REPLY = "We're handling a lot of messages right now. Please try again in a few minutes."
+RESERVATION_SECONDS = 15.0
+LATENCY_WINDOW = 50           # observations per adjustment decision
+MIN_OBSERVATIONS = 10
+MAX_TRACKED_PHONES = 10000
+
+
+class ChannelLimiter:
+    """
+    Adaptive concurrency limit for one channel. Used only from the event loop.
+    """
+
+    def __init__(self, name: str, max_limit: int, target_ms: float, min_limit: int = 1):
+        self.name = name
+        self.max_limit = max(1, max_limit)
+        self.min_limit = min(min_limit, self.max_limit)
+        self.limit = self.max_limit
+        self.target_ms = target_ms
+        self.active = 0
+        self._reservations = deque()     # expiry times (monotonic) of unclaimed reservations
+        self._waiters = deque()          # futures of acquire() calls waiting for capacity
+        self._latencies = deque(maxlen=LATENCY_WINDOW)
+        self._stats = {"admitted": 0, "rejected": 0, "timed_out": 0, "reservations_lapsed": 0,
+                       "limit_decreases": 0, "limit_increases": 0}
+
+    def in_flight(self) -> int:
+        now = time.monotonic()
+        while self._reservations and self._reservations[0] <= now:
+            self._reservations.popleft()
+            self._stats["reservations_lapsed"] += 1
+        return self.active + len(self._reservations)
+
+    def _admit(self) -> bool:
+        if self.in_flight() < self.limit:
+            self.active += 1
+            self._stats["admitted"] += 1
+            return True
+        return False
+
+    def try_acquire(self) -> bool:
+        if self._admit():
+            return True
+        self._stats["rejected"] += 1
+        return False
+
+    def reserve(self) -> bool:
+        """Holds capacity for a session that will claim() it shortly."""
+        if self.in_flight() < self.limit:
+            self._reservations.append(time.monotonic() + RESERVATION_SECONDS)
+            return True
+        self._stats["rejected"] += 1
+        return False
+
+    def claim(self) -> bool:
+        """Turns a reservation into an active session, or admits one directly."""
+        self.in_flight()    # drops lapsed reservations
+        if self._reservations:
+            self._reservations.popleft()
+            self.active += 1
+            self._stats["admitted"] += 1
+            return True
+        return self.try_acquire()
+
+    async def acquire(self, timeout: float) -> bool:
+        """Waits up to `timeout` seconds for capacity, first come first served."""
+        if not self._waiters and self._admit():
+            return True
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter), timeout)
+            return True
+        except asyncio.TimeoutError:
+            if waiter.done() and not waiter.cancelled():
+                # Capacity was handed over just as the wait ran out: keep it
+                return True
+            waiter.cancel()
+            self._stats["timed_out"] += 1
+            return False
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                self.release()
+            else:
+                waiter.cancel()
+            raise
+
+    def release(self):
+        self.active = max(0, self.active - 1)
+        self._wake()
+
+    def _wake(self):
+        while self._waiters and self.in_flight() < self.limit:
+            waiter = self._waiters.popleft()
+            if not waiter.done() and self._admit():
+                waiter.set_result(True)
+
+    def observe(self, latency_ms: float):
+        """Feeds one latency measurement into the AIMD loop."""
+        self._latencies.append(latency_ms)
+        if len(self._latencies) < MIN_OBSERVATIONS:
+            return
+        p90 = sorted(self._latencies)[int(len(self._latencies) * 0.9) - 1]
+        if p90 > self.target_ms and self.limit > self.min_limit:
+            self.limit = max(self.min_limit, int(self.limit * 0.75))
+            self._stats["limit_decreases"] += 1
+            # Judge the new limit on fresh measurements only
+            self._latencies.clear()
+            print(f"⚠️  Admission: {self.name} p90 {p90:.0f}ms > {self.target_ms:.0f}ms, limit -> {self.limit}")
+        elif p90 < self.target_ms * 0.8 and self.limit < self.max_limit and self.in_flight() >= self.limit:
+            self.limit += 1
+            self._stats["limit_increases"] += 1
+            self._latencies.clear()
+            self._wake()
+
+    def snapshot(self) -> dict:
+        recent = sorted(self._latencies)
+        return dict(
+            self._stats,
+            limit=self.limit,
+            max_limit=self.max_limit,
+            active=self.active,
+            reserved=self.in_flight() - self.active,
+            waiting=sum(1 for w in self._waiters if not w.done()),
+            recent_p90_ms=round(recent[int(len(recent) * 0.9) - 1], 1) if recent else None,
+        )
+
+
+class PhoneRateLimiter:
+    """Per-phone token buckets for inbound texts, so one sender can't flood the LLM."""
+
+    def __init__(self, per_minute: float, burst: float, max_phones: int = MAX_TRACKED_PHONES):
+        self.rate = per_minute / 60.0
+        self.burst = burst
+        self.max_phones = max_phones
+        self._buckets = OrderedDict()
+        self._notified = set()     # limited senders already sent the busy reply
+        self._stats = {"allowed": 0, "limited": 0}
+
+    def allow(self, phone_number: str) -> bool:
+        bucket = self._buckets.get(phone_number)
+        if bucket is None:
+            bucket = self._buckets[phone_number] = TokenBucket(self.rate, self.burst)
+            while len(self._buckets) > self.max_phones:
+                evicted, _ = self._buckets.popitem(last=False)
+                self._notified.discard(evicted)
+        else:
+            self._buckets.move_to_end(phone_number)
+        allowed = bucket.try_acquire()
+        self._stats["allowed" if allowed else "limited"] += 1
+        if allowed:
+            self._notified.discard(phone_number)
+        return allowed
+
+    def first_refusal(self, phone_number: str) -> bool:
+        """
+        True the first time a limited sender is turned away, so a flood gets
+        one busy reply rather than one per text (or none).
+        """
+        if phone_number in self._notified:
+            return False
+        self._notified.add(phone_number)
+        return True
+
+    def snapshot(self) -> dict:
+        return dict(self._stats, tracked_phones=len(self._buckets))
+
+
+class TurnTimer:
+    """Measures one call's end-of-speech -> first model audio latency for the voice limiter."""
+
+    def __init__(self, limiter: ChannelLimiter):
+        self.limiter = limiter
+        self._speech_end = None
+
+    def speech_ended(self):
+        self._speech_end = time.perf_counter()
+
+    def model_audio(self):
+        if self._speech_end is not None:
+            self.limiter.observe((time.perf_counter() - self._speech_end) * 1000)
+            self._speech_end = None
+
+
+voice = ChannelLimiter("voice", VOICE_MAX_CONCURRENT_CALLS, VOICE_TARGET_FIRST_AUDIO_MS)
+sms = ChannelLimiter("sms", SMS_MAX_CONCURRENT_TURNS, SMS_TARGET_TURN_MS)
+sms_senders = PhoneRateLimiter(SMS_PER_PHONE_PER_MINUTE, SMS_PER_PHONE_BURST)
+
+
+async def sms_turn(llm, prompt: str) -> str:
+    """Runs one LLM turn within the SMS limit, or returns the busy reply if no capacity frees up in time."""
+    if not await sms.acquire(SMS_QUEUE_TIMEOUT_SECONDS):
+        return BUSY_REPLY
+    started = time.perf_counter()
+    try:
+        return await llm.agenerate(prompt)
+    finally:
+        sms.observe((time.perf_counter() - started) * 1000)
+        sms.release()
+
+
+def snapshot() -> dict:
+    return {"voice": voice.snapshot(), "sms": sms.snapshot(), "sms_senders": sms_senders.snapshot()}
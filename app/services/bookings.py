@@ -4,6 +4,12 @@ from decimal import Decimal
 from datetime import datetime
 from botocore.exceptions import ClientError
 from app.db import slots_table, appointments_table
+from app.services.events import (
+    emit, SLOT_HELD, SLOT_BOOKED, SLOT_RELEASED, APPOINTMENT_CONFIRMED, APPOINTMENT_CANCELLED
+)
+from app.services.slot_versions import (
+    hold_token, new_hold_nonce, parse_token, record, versioned_update, is_conditional_failure, VersionConflict
+)
 from pydantic import BaseModel
 import os
 from twilio.rest import Client
@@ -16,9 +22,14 @@ account_sid = os.getenv('TWILIO_ACCOUNT_SID')
 auth_token = os.getenv('TWILIO_AUTH_TOKEN')
 twilio_number = os.getenv('TWILIO_PHONE_NUMBER')
 twilio_client = Client(account_sid, auth_token)
+# Log instead of sending (replay runs, load tests, local development)
+notifications_dry_run = os.getenv("NOTIFICATIONS_DRY_RUN", "").lower() in ("1", "true", "yes")
 
 def send_sms_notification(phone_number: str, message: str):
     """Sends an SMS notification via Twilio WhatsApp Sandbox."""
+    if notifications_dry_run:
+        print(f"DEBUG: [dry run] WhatsApp to {phone_number}: {message}")
+        return True
     try:
        # If the incoming phone_number doesn't already have the prefix, add it
         to_whatsapp = phone_number if phone_number.startswith("whatsapp:") else f"whatsapp:{phone_number}"
@@ -45,6 +56,7 @@ class HoldSlotRequest(BaseModel):
 class ConfirmAppointmentRequest(BaseModel):
     slot_id: str
     phone_number: str
+    hold_token: str
 
 def current_ts():
     """Returns current UTC timestamp as integer."""
@@ -86,34 +98,39 @@ def hold_slot(slot_id: str, phone_number: str, hold_seconds: int = 60):
     try:
         response = slots_table.update_item(
             Key={"slot_id": slot_id},
-            UpdateExpression="SET #s = :held, hold_expires_at = :ttl, version = version + :inc",
+            UpdateExpression="SET #s = :held, hold_expires_at = :ttl, hold_nonce = :nonce, version = version + :inc",
             ConditionExpression="#s = :avail",
             ExpressionAttributeNames={"#s": "status"},
             ExpressionAttributeValues={
                 ":avail": "AVAILABLE", 
                 ":held": "HELD", 
                 ":ttl": ttl, 
+                ":nonce": new_hold_nonce(),
                 ":inc": 1
             },
             ReturnValues="ALL_NEW"
         )
+        record("hold", attempts=1)
+        emit(SLOT_HELD, slot_id, "AVAILABLE", "HELD", phone_number=phone_number, hold_expires_at=ttl)
         
         # Sanitize result so Gemini doesn't crash on Decimals
         safe_attributes = sanitize_decimal(response.get("Attributes", {}))
         
         return {
             "success": True, 
-            "message": f"Slot {slot_id} is now on hold.",
+            "message": f"Slot {slot_id} is now on hold. Pass hold_token to confirm_appointment.",
+            "hold_token": hold_token(safe_attributes),
             "data": safe_attributes
         }
 
     except ClientError as e:
         error_code = e.response['Error']['Code']
         if error_code == 'ConditionalCheckFailedException':
+            record("hold", attempts=1, conflicts=1)
             return {"success": False, "message": "Slot is no longer available (already held or booked)."}
         return {"success": False, "message": f"Database error: {str(e)}"}
 
-def confirm_appointment(slot_id: str, phone_number: str):
+def confirm_appointment(slot_id: str, phone_number: str, hold_token: str):
     """
     Finalizes a booking that is currently being held.
     Call this ONLY after the user confirms they definitely want to book the appointment.
@@ -121,27 +138,42 @@ def confirm_appointment(slot_id: str, phone_number: str):
     Args:
         slot_id: The unique ID of the slot (e.g., '2026-01-22-10:00')
         phone_number: The user's contact number.
+        hold_token: The hold_token returned by hold_slot for this slot.
     """
     print(f"DEBUG: AI invoking confirm_appointment for {slot_id}")
+    return _confirm_appointment(slot_id, phone_number, hold_token)
+
+def _confirm_appointment(slot_id: str, phone_number: str, hold_token: str, notify: bool = True):
     now_ts = current_ts()
+    token = parse_token(hold_token)
+    if token is None:
+        return {"success": False, "message": "Missing or invalid hold_token. Call hold_slot first and pass its hold_token."}
+    version, nonce = token
     
+    appointment_id = str(uuid.uuid4())
     try:
-        #Update Slot status to BOOKED
+        #Update Slot status to BOOKED, only if it is still our hold (same version as hold_slot left it).
+        #The slot records which appointment holds it, so only that appointment can release it.
         slots_table.update_item(
             Key={"slot_id": slot_id},
-            UpdateExpression="SET #s = :booked, is_available = :false",
-            ConditionExpression="#s = :held AND hold_expires_at > :now",
+            UpdateExpression="SET #s = :booked, is_available = :false, appointment_id = :appt, version = version + :inc",
+            ConditionExpression="#s = :held AND version = :token AND hold_nonce = :nonce AND hold_expires_at > :now",
             ExpressionAttributeNames={"#s": "status"},
             ExpressionAttributeValues={
                 ":held": "HELD", 
                 ":booked": "BOOKED", 
                 ":now": now_ts,
-                ":false": False
+                ":false": False,
+                ":appt": appointment_id,
+                ":token": version,
+                ":nonce": nonce,
+                ":inc": 1
             }
         )
+        record("confirm", attempts=1)
+        emit(SLOT_BOOKED, slot_id, "HELD", "BOOKED", phone_number=phone_number)
         
         #Create the permanent Appointment record
-        appointment_id = str(uuid.uuid4())
         appointments_table.put_item(
             Item={
                 "appointment_id": appointment_id,
@@ -151,9 +183,11 @@ def confirm_appointment(slot_id: str, phone_number: str):
                 "created_at": current_iso()
             }
         )
+        emit(APPOINTMENT_CONFIRMED, appointment_id, None, "CONFIRMED", slot_id=slot_id, phone_number=phone_number)
         
-        sms_msg = f"Confirmed! Your appointment at the Clinic is set for {slot_id}. Booking ID: {appointment_id}"
-        send_sms_notification(phone_number, sms_msg)
+        if notify:
+            sms_msg = f"Confirmed! Your appointment at the Clinic is set for {slot_id}. Booking ID: {appointment_id}"
+            send_sms_notification(phone_number, sms_msg)
 
         return {
             "success": True, 
@@ -163,10 +197,38 @@ def confirm_appointment(slot_id: str, phone_number: str):
 
     except ClientError as e:
         if e.response['Error']['Code'] == 'ConditionalCheckFailedException':
+            record("confirm", attempts=1, conflicts=1)
             return {"success": False, "message": "Hold expired or slot was already booked. Please try again."}
         return {"success": False, "message": f"Database error: {str(e)}"}
 
 
+def release_hold(slot_id: str, hold_token: str, operation: str, reason: str) -> bool:
+    """
+    Frees a hold made with hold_slot, only if it is still that hold (not one
+    that lapsed and was taken by someone else). Returns True if released.
+    """
+    token = parse_token(hold_token)
+    if token is None:
+        return False
+    try:
+        slots_table.update_item(
+            Key={"slot_id": slot_id},
+            UpdateExpression="SET #s = :avail, hold_expires_at = :null, version = version + :inc",
+            ConditionExpression="#s = :held AND version = :token AND hold_nonce = :nonce",
+            ExpressionAttributeNames={"#s": "status"},
+            ExpressionAttributeValues={":avail": "AVAILABLE", ":held": "HELD", ":null": None,
+                                       ":token": token[0], ":nonce": token[1], ":inc": 1}
+        )
+        record(operation, attempts=1)
+        emit(SLOT_RELEASED, slot_id, "HELD", "AVAILABLE", reason=reason)
+        return True
+    except ClientError as e:
+        if is_conditional_failure(e):
+            record(operation, attempts=1, conflicts=1)
+        else:
+            print(f"ERROR: Failed to release hold on {slot_id}: {e}")
+        return False
+
 def resend_confirmation(phone_number: str):
     """
     Resend confirmation SMS for the patient's most recent appointment.
@@ -233,7 +295,9 @@ def cancel_appointment(appointment_id: str):
         appointment_id: The unique ID of the appointment to cancel.
     """
     print(f"DEBUG: AI invoking cancel_appointment for {appointment_id}")
-    
+    return _cancel_appointment(appointment_id)
+
+def _cancel_appointment(appointment_id: str, notify: bool = True):
     try:
         #Get the appointment to find the associated slot_id
         res = appointments_table.get_item(Key={"appointment_id": appointment_id})
@@ -244,21 +308,36 @@ def cancel_appointment(appointment_id: str):
         slot_id = item["slot_id"]
         phone_number = item.get("phone_number")
 
-        #Mark the slot as AVAILABLE again
-        slots_table.update_item(
-            Key={"slot_id": slot_id},
-            UpdateExpression="SET #s = :avail, is_available = :true",
-            ExpressionAttributeNames={"#s": "status"},
-            ExpressionAttributeValues={":avail": "AVAILABLE", ":true": True}
-        )
+        #Release the slot first, only while it still holds this booking (slots booked
+        #before appointment_id was stored on them have none). If this fails the
+        #appointment is kept, so the cancel can be retried and no slot is orphaned.
+        released = versioned_update(slot_id, "cancel", lambda slot: {
+            "set": "#s = :avail, is_available = :true, appointment_id = :none",
+            "names": {"#s": "status"},
+            "values": {":avail": "AVAILABLE", ":true": True, ":none": None}
+        } if slot and slot.get("status") == "BOOKED" and slot.get("appointment_id") in (None, appointment_id) else None)
+        if released is not None:
+            emit(SLOT_RELEASED, slot_id, "BOOKED", "AVAILABLE", appointment_id=appointment_id)
 
-        appointments_table.delete_item(Key={"appointment_id": appointment_id})
+        #Only one cancel deletes the appointment; a concurrent repeat stops here
+        try:
+            appointments_table.delete_item(
+                Key={"appointment_id": appointment_id},
+                ConditionExpression="attribute_exists(appointment_id)"
+            )
+        except ClientError as e:
+            if is_conditional_failure(e):
+                return {"success": False, "message": "This appointment has already been cancelled."}
+            raise
+        emit(APPOINTMENT_CANCELLED, appointment_id, "CONFIRMED", None, slot_id=slot_id, phone_number=phone_number)
 
-        if phone_number:
+        if phone_number and notify:
             sms_msg = f"Your appointment for {slot_id} has been cancelled."
             send_sms_notification(phone_number, sms_msg)
 
         return {"success": True, "message": "Appointment successfully cancelled."}
+    except VersionConflict as e:
+        return {"success": False, "message": f"{e} Please try again."}
     except Exception as e:
         return {"success": False, "message": str(e)}
 
@@ -267,27 +346,28 @@ def reschedule_appointment(appointment_id: str, new_slot_id: str):
     print(f"DEBUG: Executing Reschedule for {appointment_id} -> {new_slot_id}")
     
     res = appointments_table.get_item(Key={'appointment_id': appointment_id})
-    item = res.get("Item", {})
+    item = res.get("Item")
+    if not item:
+        return {"success": False, "error": "Appointment ID not found."}
     phone_number = item.get("phone_number")
 
-    cancel_res = cancel_appointment(appointment_id)
-    
-    try:
-        slots_table.update_item(
-            Key={"slot_id": new_slot_id},
-            UpdateExpression="SET #s = :booked, is_available = :false",
-            ConditionExpression="#s = :avail",
-            ExpressionAttributeNames={"#s": "status"},
-            ExpressionAttributeValues={":booked": "BOOKED", ":false": False, ":avail": "AVAILABLE"}
-        )
+    #Hold the new slot before giving up the old one, so a taken slot leaves the booking as it was
+    held = hold_slot(new_slot_id, phone_number)
+    if not held["success"]:
+        return {"success": False, "error": held["message"]}
 
-        if not cancel_res["success"]:
-            return cancel_res
-        
-        if phone_number:
-            sms_msg = f"Your appointment has been rescheduled to {new_slot_id}."
-            send_sms_notification(phone_number, sms_msg)
+    cancel_res = _cancel_appointment(appointment_id, notify=False)
+    if not cancel_res["success"]:
+        release_hold(new_slot_id, held["hold_token"], "reschedule", reason="reschedule_failed")
+        return cancel_res
 
-        return {"success": True, "message": f"Appointment moved to {new_slot_id}. Please confirm the new time."}
-    except Exception as e:
-        return {"success": False, "error": str(e)}
\ No newline at end of file
+    #Book through the confirm path: version-checked, appointment_id on the slot and an Appointments record
+    confirmed = _confirm_appointment(new_slot_id, phone_number, held["hold_token"], notify=False)
+    if not confirmed["success"]:
+        return {"success": False, "error": f"The old appointment was cancelled but {new_slot_id} could not be booked: {confirmed['message']}"}
+
+    if phone_number:
+        sms_msg = f"Your appointment has been rescheduled to {new_slot_id}. Booking ID: {confirmed['appointment_id']}"
+        send_sms_notification(phone_number, sms_msg)
+
+    return {"success": True, "appointment_id": confirmed["appointment_id"], "message": f"Appointment moved to {new_slot_id}."}
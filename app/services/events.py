@@ -0,0 +1,188 @@
+import os
+import time
+import uuid
+import asyncio
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, field, asdict
+
+# Change events for slot and appointment state transitions.
+#
+# Every mutation in bookings/slots/expiry/admin/waitlist emits one typed
+# ChangeEvent on the process-wide event_bus. Subscribers either run inline
+# (subscribe_sync: cheap bookkeeping such as the availability version, which
+# must be current before the writing request returns) or get their own
+# bounded asyncio queue (subscribe). A slow async subscriber loses its oldest
+# events rather than blocking writers.
+#
+# app/background/change_stream.py tails DynamoDB Streams and republishes other
+# workers' changes here with remote=True.
+
+# Identifies this process in events (and lets the stream tailer skip our own writes)
+WORKER_ID = os.getenv("WORKER_ID") or f"{os.uname().nodename}-{os.getpid()}"
+SUBSCRIBER_QUEUE_SIZE = int(os.getenv("EVENT_QUEUE_SIZE", "1000"))
+ECHO_WINDOW_SECONDS = 120
+ECHO_LIMIT = 10000
+
+SLOT_CREATED = "SLOT_CREATED"          # seeded or admin-created, AVAILABLE
+SLOT_HELD = "SLOT_HELD"                # AVAILABLE -> HELD
+SLOT_BOOKED = "SLOT_BOOKED"            # HELD -> BOOKED (or AVAILABLE -> BOOKED on reschedule)
+SLOT_RELEASED = "SLOT_RELEASED"        # BOOKED/HELD -> AVAILABLE (cancellation, declined offer)
+SLOT_EXPIRED = "SLOT_EXPIRED"          # HELD -> AVAILABLE after the hold ran out
+SLOT_BLOCKED = "SLOT_BLOCKED"          # AVAILABLE -> BLOCKED
+SLOT_UNBLOCKED = "SLOT_UNBLOCKED"      # BLOCKED -> AVAILABLE
+SLOT_DELETED = "SLOT_DELETED"
+APPOINTMENT_CONFIRMED = "APPOINTMENT_CONFIRMED"
+APPOINTMENT_CANCELLED = "APPOINTMENT_CANCELLED"
+APPOINTMENT_UPDATED = "APPOINTMENT_UPDATED"
+
+SLOT_TYPES = {SLOT_CREATED, SLOT_HELD, SLOT_BOOKED, SLOT_RELEASED, SLOT_EXPIRED, SLOT_BLOCKED, SLOT_UNBLOCKED, SLOT_DELETED}
+# Transitions that leave a slot bookable
+AVAILABLE_TYPES = {SLOT_CREATED, SLOT_RELEASED, SLOT_EXPIRED, SLOT_UNBLOCKED}
+
+
+@dataclass
+class ChangeEvent:
+    type: str
+    key: str                       # slot_id or appointment_id
+    old_status: str = None
+    new_status: str = None
+    data: dict = field(default_factory=dict)
+    source: str = WORKER_ID
+    remote: bool = False
+    ts: float = field(default_factory=time.time)
+    event_id: str = field(default_factory=lambda: str(uuid.uuid4()))
+
+    @property
+    def entity(self) -> str:
+        return "slot" if self.type.startswith("SLOT_") else "appointment"
+
+    def to_dict(self) -> dict:
+        d = asdict(self)
+        d["entity"] = self.entity
+        return d
+
+
+class Subscription:
+    """Bounded async queue of events for one consumer; iterate with `async for`."""
+
+    def __init__(self, bus, types, include_remote: bool, maxsize: int):
+        self._bus = bus
+        self.types = set(types) if types else None
+        self.include_remote = include_remote
+        self.queue = asyncio.Queue(maxsize=maxsize)
+        self.loop = asyncio.get_running_loop()
+        self.dropped = 0
+
+    def _deliver(self, event: ChangeEvent):
+        # Runs on the subscriber's loop
+        if self.queue.full():
+            self.queue.get_nowait()
+            self.dropped += 1
+        self.queue.put_nowait(event)
+
+    async def get(self) -> ChangeEvent:
+        return await self.queue.get()
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self) -> ChangeEvent:
+        return await self.queue.get()
+
+    def close(self):
+        self._bus.unsubscribe(self)
+
+
+class EventBus:
+    """In-process pub/sub for ChangeEvents. publish() is safe from any thread."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._sync = []               # (handler, types, include_remote)
+        self._subscriptions = []
+        self._published = {}          # type -> count
+        self._remote = 0
+        self._echo_skipped = 0
+        self._handler_errors = 0
+        self._recent_local = OrderedDict()   # (key, new_status) -> monotonic time
+
+    def subscribe_sync(self, handler, types=None, include_remote: bool = True):
+        """handler(event) runs inline in the publishing thread; keep it short."""
+        with self._lock:
+            self._sync.append((handler, set(types) if types else None, include_remote))
+
+    def subscribe(self, types=None, include_remote: bool = True, maxsize: int = SUBSCRIBER_QUEUE_SIZE) -> Subscription:
+        """Call from a coroutine; events are delivered on that coroutine's loop."""
+        sub = Subscription(self, types, include_remote, maxsize)
+        with self._lock:
+            self._subscriptions.append(sub)
+        return sub
+
+    def unsubscribe(self, sub: Subscription):
+        with self._lock:
+            if sub in self._subscriptions:
+                self._subscriptions.remove(sub)
+
+    def publish(self, event: ChangeEvent):
+        with self._lock:
+            self._published[event.type] = self._published.get(event.type, 0) + 1
+            if event.remote:
+                self._remote += 1
+            else:
+                self._recent_local[(event.key, event.new_status)] = time.monotonic()
+                self._recent_local.move_to_end((event.key, event.new_status))
+                while len(self._recent_local) > ECHO_LIMIT:
+                    self._recent_local.popitem(last=False)
+            handlers = [h for h, types, remote_ok in self._sync
+                        if (types is None or event.type in types) and (remote_ok or not event.remote)]
+            subs = [s for s in self._subscriptions
+                    if (s.types is None or event.type in s.types) and (s.include_remote or not event.remote)]
+
+        for handler in handlers:
+            try:
+                handler(event)
+            except Exception as e:
+                with self._lock:
+                    self._handler_errors += 1
+                print(f"ERROR in change event handler for {event.type} {event.key}: {e}")
+        for sub in subs:
+            try:
+                sub.loop.call_soon_threadsafe(sub._deliver, event)
+            except RuntimeError:
+                self.unsubscribe(sub)     # its loop has closed
+
+    def is_echo(self, key: str, new_status: str) -> bool:
+        """
+        True if this process recently published the same transition, i.e. a
+        stream record is our own write coming back. Each local publish
+        suppresses at most one record.
+        """
+        with self._lock:
+            seen = self._recent_local.pop((key, new_status), None)
+            if seen is not None and time.monotonic() - seen <= ECHO_WINDOW_SECONDS:
+                self._echo_skipped += 1
+                return True
+            return False
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "worker_id": WORKER_ID,
+                "published": dict(self._published),
+                "remote": self._remote,
+                "echoes_skipped": self._echo_skipped,
+                "handler_errors": self._handler_errors,
+                "subscribers": [
+                    {"types": sorted(s.types) if s.types else "*", "queued": s.queue.qsize(), "dropped": s.dropped}
+                    for s in self._subscriptions
+                ],
+            }
+
+
+event_bus = EventBus()
+
+
+def emit(type_: str, key: str, old_status: str = None, new_status: str = None, **data):
+    """Publishes a local state transition."""
+    event_bus.publish(ChangeEvent(type_, key, old_status, new_status, data))
@@ -1,18 +1,56 @@
 import os
 import google.genai as genai
+from google.genai import types
 from dotenv import load_dotenv
-from .llm_interface import LLMInterface
+from .llm_interface import ToolCall
+from .tool_loop import ToolLoopLLM
 from app.services.slots import get_available_slots
 from app.services.bookings import hold_slot, confirm_appointment, cancel_appointment, reschedule_appointment, get_appointments_by_phone     
+from app.services.waitlist import join_waitlist
 from datetime import datetime
 
 load_dotenv()
 
-class GeminiService(LLMInterface):
-    # It allows the AI to remember previous context.
-    _chat_history = []
+# Tools declared to Gemini; ToolLoopLLM runs the calls (de-duplicated per conversation)
+TOOL_FUNCTIONS = (
+    get_available_slots, hold_slot, confirm_appointment,
+    cancel_appointment, reschedule_appointment, get_appointments_by_phone,
+    join_waitlist
+)
+
+def sms_system_instruction() -> str:
+    today_date = datetime.now().strftime("%Y-%m-%d")
+    return (
+        f"You are a professional appointment scheduling assistant for The Tech Clinic and your name is Receptron. Let the user know your name. Today's date is {today_date}."
+        f"Always call get_available_slots at the start of a scheduling conversation so you have the correct slot_ids" 
+        f"in your memory. If the user doesn't specify a date, use today's date ({today_date}). When a user picks a time, map it to the corresponding slot_id and call hold_slot immediately."
+        "You MUST remember details provided by the user (like their name, phone number, and chosen date/time) "
+        "throughout the conversation. If they mention a time once, do not ask for it again.\n"
+        "get_available_slots only returns times that haven't passed yet. If the user asks for a part of the day "
+        "(morning, afternoon, evening) or an exact time, pass it as time_preference (and exact_time as HH:MM) so only those slots come back.\n"
+        "If the user provides a date and time, you must internalize it and" 
+        "map it to the available slot_id format (YYYY-MM-DD-HH:MM)." 
+        "Do not ask the user to use a specific format; translate their natural language (e.g., 'Tomorrow at 3') into the correct ID yourself.\n\n"
+        "Workflow:\n"
+        "1. Check availability with 'get_available_slots'.\n"
+        "2. When a time is picked, call 'hold_slot'.\n"
+        "3. Ask for final confirmation, then call 'confirm_appointment' with the hold_token hold_slot returned.\n"
+        "If a user wants to cancel or check an appointment but doesn't have an ID, "
+        "ask for their phone number and use 'get_appointments_by_phone' to find it. "
+        "Once found, confirm with the user before calling 'cancel_appointment'. "
+        "If none of the available times suit the user, offer to add them to the waitlist with 'join_waitlist'; "
+        "they'll get an SMS if a matching time opens up."
+    )
+
+class GeminiService(ToolLoopLLM):
+    """
+    Gemini provider for SMS/WhatsApp and /chat. History is kept per
+    conversation by ToolLoopLLM, so concurrent senders never share context;
+    generate_response() is the same tool loop run synchronously.
+    """
 
     def __init__(self):
+        super().__init__()
         api_key = os.getenv("GEMINI_API_KEY")
         if not api_key:
             raise ValueError("GEMINI_API_KEY not found in environment variables")
@@ -20,50 +58,53 @@ class GeminiService(LLMInterface):
         self.client = genai.Client(api_key=api_key)
         self.model_id = "gemini-2.5-flash"
 
-    def generate_response(self, prompt: str) -> str:
-        #Create a chat session using the persistent class history
-        # Using start_chat (or chats.create) is what enables "memory"
-        today_date = datetime.now().strftime("%Y-%m-%d")
-        chat = self.client.chats.create(
+    @staticmethod
+    def _to_contents(history: list) -> list:
+        """Converts the provider-neutral history kept by ToolLoopLLM into Gemini contents."""
+        contents = []
+        for entry in history:
+            if entry["role"] == "user":
+                contents.append(types.Content(role="user", parts=[types.Part.from_text(text=entry["text"])]))
+            elif entry["role"] == "model":
+                parts = [types.Part.from_text(text=entry["text"])] if entry["text"] else []
+                parts += [
+                    types.Part(function_call=types.FunctionCall(name=c.name, args=c.args, id=c.id))
+                    for c in entry["tool_calls"]
+                ]
+                if parts:
+                    contents.append(types.Content(role="model", parts=parts))
+            elif entry["role"] == "tool":
+                contents.append(types.Content(role="user", parts=[
+                    types.Part.from_function_response(name=call.name, response={"result": result})
+                    for call, result in entry["results"]
+                ]))
+        return contents
+
+    async def astream_turn(self, history: list):
+        """
+        One streamed Gemini round. Automatic function calling is disabled so the
+        model hands its tool calls back to ToolLoopLLM instead of running them.
+        """
+        config = types.GenerateContentConfig(
+            system_instruction=sms_system_instruction(),
+            tools=list(TOOL_FUNCTIONS),
+            automatic_function_calling=types.AutomaticFunctionCallingConfig(disable=True),
+        )
+        stream = await self.client.aio.models.generate_content_stream(
             model=self.model_id,
-            config={
-                'tools': [get_available_slots, hold_slot, confirm_appointment, cancel_appointment, reschedule_appointment, get_appointments_by_phone],
-                'system_instruction': (
-                    f"You are a professional appointment scheduling assistant for The Tech Clinic and your name is Receptron. Let the user know your name. Today's date is {today_date}."
-                    f"Always call get_available_slots at the start of a scheduling conversation so you have the correct slot_ids" 
-                    f"in your memory. If the user doesn't specify a date, use today's date ({today_date}). When a user picks a time, map it to the corresponding slot_id and call hold_slot immediately."
-                    "You MUST remember details provided by the user (like their name, phone number, and chosen date/time) "
-                    "throughout the conversation. If they mention a time once, do not ask for it again.\n"
-                    "If the user mention's a date, don't say the times/slots which are already done (e.g., if user calls in the afternoon for availability for today,"
-                    "then don't give the user the option to choose slots which are in the morning)"
-                    "If the user provides a date and time, you must internalize it and" 
-                    "map it to the available slot_id format (YYYY-MM-DD-HH:MM)." 
-                    "Do not ask the user to use a specific format; translate their natural language (e.g., 'Tomorrow at 3') into the correct ID yourself.\n\n"
-                    "Workflow:\n"
-                    "1. Check availability with 'get_available_slots'.\n"
-                    "2. When a time is picked, call 'hold_slot'.\n"
-                    "3. Ask for final confirmation, then call 'confirm_appointment'.\n"
-                    "If a user wants to cancel or check an appointment but doesn't have an ID, "
-                    "ask for their phone number and use 'get_appointments_by_phone' to find it. "
-                    "Once found, confirm with the user before calling 'cancel_appointment'"
-                )
-            },
-            history=GeminiService._chat_history
+            contents=self._to_contents(history),
+            config=config
         )
+        async for chunk in stream:
+            if not chunk.candidates or not chunk.candidates[0].content:
+                continue
+            for part in chunk.candidates[0].content.parts or []:
+                if part.function_call:
+                    fc = part.function_call
+                    yield ToolCall(name=fc.name, args=dict(fc.args or {}), id=fc.id)
+                elif part.text:
+                    yield part.text
 
-        #Send the message within the stateful chat session
-        response = chat.send_message(prompt)
-
-        #Update the class-level history so the NEXT request knows what happened in this one
-        GeminiService._chat_history = chat.get_history()
-
-        #Handle cases where the model might return a tool call result instead of plain text
-        if response.text:
-            return response.text
-        else:
-            return "I've processed that request for you. What else can I help with?"
-
-    @classmethod
-    def clear_history(cls):
+    def clear_history(self):
         """Helper method to reset the AI's memory (useful for testing)."""
-        cls._chat_history = []
\ No newline at end of file
+        self.reset_conversation()
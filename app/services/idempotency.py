@@ -0,0 +1,208 @@
+import os
+import json
+import time
+import asyncio
+import threading
+import contextvars
+from collections import OrderedDict
+from concurrent.futures import Future
+from app.services.events import event_bus
+
+# Identifies the conversation a tool call belongs to (phone number for SMS,
+# streamSid for voice). Set by the caller before the LLM turn runs.
+current_conversation = contextvars.ContextVar("current_conversation", default=None)
+# Optional list collecting the names of tools invoked during the current LLM turn
+current_turn_tools = contextvars.ContextVar("current_turn_tools", default=None)
+
+DEDUP_WINDOW_SECONDS = float(os.getenv("TOOL_DEDUP_WINDOW_SECONDS", "30"))
+DEDUP_MAX_ENTRIES = int(os.getenv("TOOL_DEDUP_MAX_ENTRIES", "2048"))
+
+# Tools that only read state. Any other tool is a mutation and, when it
+# actually runs, invalidates the conversation's earlier cached results.
+READ_ONLY_TOOLS = {"get_available_slots", "get_appointments_by_phone"}
+
+
+def _normalize(value):
+    if isinstance(value, str):
+        return value.strip().lower().replace("whatsapp:", "")
+    if isinstance(value, dict):
+        return {k: _normalize(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_normalize(v) for v in value]
+    return value
+
+
+def _is_cacheable(result) -> bool:
+    """Failed calls are never cached so the model can legitimately retry them."""
+    if isinstance(result, dict):
+        return result.get("success", True) is not False and "error" not in result
+    return True
+
+
+class ToolCallCache:
+    """
+    Bounded TTL cache of recent tool results keyed by
+    (conversation, tool, normalized args).
+
+    A repeated call inside the window returns the cached result instead of
+    touching DynamoDB/Twilio again. Running a mutating tool clears the
+    conversation's other entries, so e.g. hold -> cancel -> hold really holds twice,
+    and any slot or appointment change drops every cached read, so availability
+    is never served stale. Calls without a conversation are not de-duplicated.
+    """
+
+    def __init__(self, window_seconds: float = DEDUP_WINDOW_SECONDS, max_entries: int = DEDUP_MAX_ENTRIES):
+        self.window_seconds = window_seconds
+        self.max_entries = max_entries
+        self._entries = OrderedDict()      # key -> (expires_at, result)
+        self._by_conversation = {}         # conversation -> set(keys)
+        self._inflight = {}                # key -> Future resolved when that call finishes
+        self._lock = threading.Lock()
+        self._stats = {}                   # tool -> {"calls": n, "hits": n}
+
+    def make_key(self, conversation, tool_name: str, args: dict):
+        normalized = json.dumps(_normalize(args or {}), sort_keys=True, default=str)
+        return (conversation, tool_name, normalized)
+
+    def _count(self, tool_name: str, hit: bool):
+        stats = self._stats.setdefault(tool_name, {"calls": 0, "hits": 0})
+        stats["calls"] += 1
+        if hit:
+            stats["hits"] += 1
+
+    def _get(self, key, now: float):
+        entry = self._entries.get(key)
+        if entry is None:
+            return False, None
+        expires_at, result = entry
+        if expires_at <= now:
+            self._drop(key)
+            return False, None
+        return True, result
+
+    def _drop(self, key):
+        self._entries.pop(key, None)
+        keys = self._by_conversation.get(key[0])
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._by_conversation[key[0]]
+
+    def _store(self, key, result, now: float):
+        self._entries[key] = (now + self.window_seconds, result)
+        self._entries.move_to_end(key)
+        self._by_conversation.setdefault(key[0], set()).add(key)
+        while len(self._entries) > self.max_entries:
+            self._drop(next(iter(self._entries)))
+
+    def _invalidate_conversation(self, conversation, keep=None):
+        for key in list(self._by_conversation.get(conversation, ())):
+            if key != keep:
+                self._drop(key)
+
+    def _begin(self, key, tool_name: str):
+        """("hit", result), ("wait", future of the identical call in flight) or ("run", future to resolve)."""
+        with self._lock:
+            hit, result = self._get(key, time.monotonic())
+            if hit:
+                self._count(tool_name, hit=True)
+                print(f"♻️  Duplicate {tool_name} call served from cache")
+                return "hit", result
+            inflight = self._inflight.get(key)
+            if inflight is not None:
+                return "wait", inflight
+            inflight = self._inflight[key] = Future()
+            self._count(tool_name, hit=False)
+            return "run", inflight
+
+    def _run(self, key, tool_name: str, func, args: dict, inflight: Future):
+        try:
+            result = func(**(args or {}))
+        except Exception:
+            with self._lock:
+                self._inflight.pop(key, None)
+            inflight.set_result(None)
+            raise
+
+        with self._lock:
+            if tool_name not in READ_ONLY_TOOLS:
+                self._invalidate_conversation(key[0], keep=key)
+            if _is_cacheable(result):
+                self._store(key, result, time.monotonic())
+            self._inflight.pop(key, None)
+        inflight.set_result(None)
+        return result
+
+    def _direct(self, tool_name: str):
+        """Calls outside a conversation (e.g. /chat) share no key space, so they are never de-duplicated."""
+        turn_tools = current_turn_tools.get()
+        if turn_tools is not None:
+            turn_tools.append(tool_name)
+        with self._lock:
+            self._count(tool_name, hit=False)
+
+    def call(self, conversation, tool_name: str, func, args: dict):
+        """Runs func(**args) unless an identical call is cached or already in flight."""
+        if conversation is None:
+            self._direct(tool_name)
+            return func(**(args or {}))
+        key = self.make_key(conversation, tool_name, args)
+        turn_tools = current_turn_tools.get()
+        if turn_tools is not None:
+            turn_tools.append(tool_name)
+
+        while True:
+            state, value = self._begin(key, tool_name)
+            if state == "hit":
+                return value
+            if state == "run":
+                return self._run(key, tool_name, func, args, value)
+            # Same call already running (e.g. the model fired it twice in parallel)
+            value.result()
+
+    async def acall(self, conversation, tool_name: str, func, args: dict):
+        """
+        call() for the event loop: func runs in a worker thread and a duplicate
+        awaits the call in flight instead of blocking a thread on it.
+        """
+        if conversation is None:
+            self._direct(tool_name)
+            return await asyncio.to_thread(func, **(args or {}))
+        key = self.make_key(conversation, tool_name, args)
+        turn_tools = current_turn_tools.get()
+        if turn_tools is not None:
+            turn_tools.append(tool_name)
+
+        while True:
+            state, value = self._begin(key, tool_name)
+            if state == "hit":
+                return value
+            if state == "run":
+                # The bookkeeping runs in the thread, so it completes even if this caller times out
+                return await asyncio.to_thread(self._run, key, tool_name, func, args, value)
+            await asyncio.shield(asyncio.wrap_future(value))
+
+    def invalidate_reads(self, event=None):
+        """Drops cached read results once slots or appointments change, in any conversation."""
+        with self._lock:
+            for key in [k for k in self._entries if k[1] in READ_ONLY_TOOLS]:
+                self._drop(key)
+
+    def snapshot(self) -> dict:
+        """Per-tool call/hit counts, i.e. how much backend work was skipped."""
+        with self._lock:
+            tools = {name: dict(s) for name, s in self._stats.items()}
+            calls = sum(s["calls"] for s in tools.values())
+            hits = sum(s["hits"] for s in tools.values())
+            return {
+                "calls": calls,
+                "hits": hits,
+                "hit_rate": round(hits / calls, 4) if calls else 0.0,
+                "entries": len(self._entries),
+                "tools": tools,
+            }
+
+
+tool_cache = ToolCallCache()
+# Reads (availability, a patient's bookings) go stale on any change, whoever made it
+event_bus.subscribe_sync(tool_cache.invalidate_reads)
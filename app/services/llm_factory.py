@@ -0,0 +1,16 @@
+import os
+from .llm_interface import LLMInterface
+
+def create_llm_service() -> LLMInterface:
+    """
+    Builds the LLM provider selected by LLM_PROVIDER ("gemini" by default, or
+    "mock" for offline runs). Routes only ever see the LLMInterface.
+    """
+    provider = os.getenv("LLM_PROVIDER", "gemini").lower()
+    if provider == "mock":
+        from .mock_service import MockService
+        return MockService()
+    if provider == "gemini":
+        from .gemini_service import GeminiService
+        return GeminiService()
+    raise ValueError(f"Unknown LLM_PROVIDER '{provider}'")
@@ -1,15 +1,55 @@
+import asyncio
 from abc import ABC, abstractmethod
+from dataclasses import dataclass, field
+
+# Returned when a turn ends with tool calls but no text for the user
+DEFAULT_REPLY = "I've processed that request for you. What else can I help with?"
+
+@dataclass
+class ToolCall:
+    """A tool invocation requested by the model, in provider-neutral form."""
+    name: str
+    args: dict = field(default_factory=dict)
+    id: str = None
 
 class LLMInterface(ABC):
     """
     Abstract Base Class for LLM providers.
-    Ensures that any LLM service used in this project implements 
+    Ensures that any LLM service used in this project implements
     the 'generate_response' method.
     """
-    
+
     @abstractmethod
     def generate_response(self, prompt: str) -> str:
         """
         Takes a user string and returns a text response from the LLM.
         """
-        pass
\ No newline at end of file
+        pass
+
+    async def agenerate(self, prompt: str) -> str:
+        """
+        Async version of generate_response. The default runs the synchronous
+        implementation in a worker thread so it never blocks the event loop.
+        """
+        return await asyncio.to_thread(self.generate_response, prompt)
+
+    async def astream(self, prompt: str):
+        """
+        Yields the reply as text chunks while it is generated.
+        The default yields the whole reply as a single chunk.
+        """
+        yield await self.agenerate(prompt)
+
+    def add_exchange(self, prompt: str, reply: str):
+        """
+        Appends a turn answered without the model (e.g. from a cache) to the
+        current conversation's history. Providers without history ignore it.
+        """
+        pass
+
+    def has_context(self) -> bool:
+        """
+        Whether the current conversation already has turns the next reply could
+        depend on. Providers without history never do.
+        """
+        return False
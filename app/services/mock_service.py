@@ -1,4 +1,113 @@
-from llm_interface import LLMInterface
-class MockService(LLMInterface):
-    def generate_response(self, prompt: str) -> str:
-        return "I am a fake AI for testing. I don't use any API credits!"
\ No newline at end of file
+import os
+import re
+import asyncio
+from datetime import datetime, timedelta
+from .llm_interface import ToolCall
+from .tool_loop import ToolLoopLLM
+
+# Simulated model latency per round, for offline load tests
+MOCK_LATENCY_MS = float(os.getenv("MOCK_LLM_LATENCY_MS", "0"))
+
+PHONE_RE = re.compile(r"\[User Phone: ([^\]]+)\]")
+ISO_DATE_RE = re.compile(r"\b(\d{4}-\d{2}-\d{2})\b")
+TIME_RE = re.compile(r"\b(\d{1,2})(?::(\d{2}))?\s*(am|pm)?\b")
+
+class MockService(ToolLoopLLM):
+    """
+    Deterministic, rule-based stand-in for an LLM provider. It drives the real
+    tool loop (availability -> hold -> confirm, lookups, cancellations) from
+    keywords, so the whole stack can be exercised and load-tested offline
+    without API credits.
+    """
+
+    def _pick_date(self, text: str) -> str:
+        match = ISO_DATE_RE.search(text)
+        if match:
+            return match.group(1)
+        offset = 1 if "tomorrow" in text else 0
+        return (datetime.now() + timedelta(days=offset)).strftime("%Y-%m-%d")
+
+    def _pick_time(self, text: str):
+        for hour, minute, meridiem in TIME_RE.findall(text):
+            hour = int(hour)
+            if meridiem == "pm" and hour < 12:
+                hour += 12
+            if meridiem or minute:
+                return f"{hour:02d}:{minute or '00'}"
+        return None
+
+    @staticmethod
+    def _last_call(history: list, name: str):
+        for entry in reversed(history):
+            if entry["role"] == "tool":
+                for call, result in entry["results"]:
+                    if call.name == name and (isinstance(result, list) or (isinstance(result, dict) and result.get("success"))):
+                        return call
+        return None
+
+    @staticmethod
+    def _last_result(history: list, name: str) -> dict:
+        for entry in reversed(history):
+            if entry["role"] == "tool":
+                for call, result in entry["results"]:
+                    if call.name == name and isinstance(result, dict) and result.get("success"):
+                        return result
+        return {}
+
+    def _plan(self, text: str, history: list):
+        phone = PHONE_RE.search(text)
+        phone = phone.group(1) if phone else None
+        lowered = text.lower()
+
+        if "waitlist" in lowered and phone:
+            return [ToolCall("join_waitlist", {"phone_number": phone, "start_date": self._pick_date(lowered)})]
+        if "cancel" in lowered and phone:
+            return [ToolCall("get_appointments_by_phone", {"phone_number": phone})]
+        if any(w in lowered for w in ("confirm", "yes", "book it")):
+            held = self._last_call(history, "hold_slot")
+            if held:
+                return [ToolCall("confirm_appointment", dict(held.args, hold_token=self._last_result(history, "hold_slot").get("hold_token")))]
+        time_str = self._pick_time(lowered)
+        if time_str and phone:
+            # Without an explicit day, assume the day the patient just looked at
+            looked_up = self._last_call(history, "get_available_slots")
+            explicit = ISO_DATE_RE.search(lowered) or any(w in lowered for w in ("today", "tomorrow"))
+            day = looked_up.args.get("date") if looked_up and not explicit else self._pick_date(lowered)
+            slot_id = f"{day}-{time_str}"
+            return [ToolCall("hold_slot", {"slot_id": slot_id, "phone_number": phone})]
+        if any(w in lowered for w in ("available", "availability", "times", "slots", "open")):
+            args = {"date": self._pick_date(lowered)}
+            preference = next((w for w in ("morning", "afternoon", "evening") if w in lowered), None)
+            if preference:
+                args["time_preference"] = preference
+            return [ToolCall("get_available_slots", args)]
+        return []
+
+    @staticmethod
+    def _summarize(results: list) -> str:
+        lines = []
+        for call, result in results:
+            if call.name == "get_available_slots" and isinstance(result, list):
+                times = ", ".join(s.get("start_time") or s.get("time", "") for s in result) or "none"
+                lines.append(f"Available times on {call.args.get('date')}: {times}.")
+            elif isinstance(result, dict):
+                lines.append(result.get("message") or result.get("error") or str(result))
+            else:
+                lines.append(str(result))
+        return " ".join(lines)
+
+    async def astream_turn(self, history: list):
+        if MOCK_LATENCY_MS:
+            await asyncio.sleep(MOCK_LATENCY_MS / 1000)
+
+        last = history[-1]
+        if last["role"] == "tool":
+            yield self._summarize(last["results"])
+            return
+
+        calls = self._plan(last["text"], history)
+        if calls:
+            for call in calls:
+                yield call
+        else:
+            yield "I am a fake AI for testing. I don't use any API credits!"
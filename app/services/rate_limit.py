@@ -0,0 +1,52 @@
+import time
+import asyncio
+import threading
+
+
+class TokenBucket:
+    """
+    Token bucket: refills `rate` tokens per second up to `capacity`.
+    try_acquire() never blocks; acquire() waits on the event loop until a
+    token is free; spend() charges after the fact. Safe to share between threads.
+    """
+
+    def __init__(self, rate: float, capacity: float = None):
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(1.0, rate)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def try_acquire(self, tokens: float = 1.0) -> bool:
+        with self._lock:
+            self._refill()
+            if self.tokens >= tokens:
+                self.tokens -= tokens
+                return True
+            return False
+
+    def spend(self, tokens: float) -> float:
+        """
+        Deducts a cost only known after the fact (e.g. consumed capacity),
+        going into debt if needed. Returns how many seconds the caller should
+        wait for the bucket to be back in credit.
+        """
+        with self._lock:
+            self._refill()
+            self.tokens -= tokens
+            return max(0.0, -self.tokens / self.rate)
+
+    async def acquire(self, tokens: float = 1.0):
+        while True:
+            with self._lock:
+                self._refill()
+                if self.tokens >= tokens:
+                    self.tokens -= tokens
+                    return
+                wait = (tokens - self.tokens) / self.rate
+            await asyncio.sleep(wait)
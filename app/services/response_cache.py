@@ -0,0 +1,228 @@
+import os
+import re
+import time
+import threading
+from datetime import datetime
+from collections import OrderedDict
+from .llm_interface import LLMInterface, DEFAULT_REPLY
+from app.services.idempotency import current_turn_tools, current_conversation
+from app.services.slots import availability_version
+
+CACHE_TTL_SECONDS = float(os.getenv("LLM_CACHE_TTL_SECONDS", "300"))
+CACHE_MAX_ENTRIES = int(os.getenv("LLM_CACHE_MAX_ENTRIES", "512"))
+
+# Only availability / FAQ style questions are cached. Anything else (e.g. "yes",
+# "book it", a phone number) depends on the conversation so far.
+AVAILABILITY_TOPICS = {"available", "availability", "times", "time", "slots", "slot", "openings", "open"}
+CACHEABLE_TOPICS = AVAILABILITY_TOPICS | {"hours", "located", "location", "address", "where", "parking", "directions"}
+# Messages that ask for an action are never cached, even if they mention a time
+ACTION_WORDS = {"book", "cancel", "reschedule", "confirm", "hold", "change", "move", "yes", "no", "resend", "waitlist"}
+# A reply is only reused if producing it touched nothing but these tools
+CACHEABLE_TOOLS = {"get_available_slots"}
+STOPWORDS = {
+    "a", "an", "the", "is", "are", "do", "does", "you", "your", "have", "any", "there",
+    "what", "which", "please", "hi", "hello", "hey", "can", "i", "me", "for", "on", "at",
+    "to", "of", "we", "us", "got", "get", "ok", "okay", "thanks", "thank",
+}
+# Words that point back into the conversation: the answer depends on what came before
+CONTEXT_WORDS = {"other", "else", "another", "instead", "that", "those", "then", "same", "also", "more", "again"}
+PHONE_CONTEXT_RE = re.compile(r"^\[User Phone: ([^\]]*)\]\s*")
+DIGITS_RE = re.compile(r"\D")
+WORD_RE = re.compile(r"[a-z0-9:]+")
+# A reply quoting times or slots is about availability even if the question wasn't
+AVAILABILITY_REPLY_RE = re.compile(r"\b(available|availability|slots?|openings?)\b|\b\d{1,2}(:\d{2})?\s*(am|pm)\b|\b\d{1,2}:\d{2}\b", re.I)
+
+
+def normalize_prompt(prompt: str):
+    """
+    Reduces a prompt to an order-insensitive token key, or None when the
+    message isn't an availability/FAQ question.
+    "What times tomorrow?" and "any times available tomorrow please" share a key.
+    """
+    text = PHONE_CONTEXT_RE.sub("", prompt).lower()
+    tokens = {t for t in WORD_RE.findall(text) if t not in STOPWORDS}
+    if not tokens & CACHEABLE_TOPICS or tokens & ACTION_WORDS:
+        return None
+    return " ".join(sorted(tokens))
+
+
+def _mentions_sender(prompt: str, reply: str) -> bool:
+    """True if the reply quotes the phone number from the prompt's [User Phone: ...] prefix."""
+    match = PHONE_CONTEXT_RE.match(prompt)
+    digits = DIGITS_RE.sub("", match.group(1)) if match else ""
+    return len(digits) >= 7 and digits[-7:] in DIGITS_RE.sub("", reply)
+
+
+class CachedLLM(LLMInterface):
+    """
+    Wraps any LLMInterface with a bounded LRU + TTL cache of replies.
+
+    Keys combine the normalized prompt with the current date and hour (so
+    "tomorrow" stays correct and passed slots drop out). A standalone
+    question asked with no conversation history behind it is answered the
+    same way for every patient, so its reply is stored in a shared entry
+    (conversation None) that any sender's identical question can hit, unless
+    it quotes the sender's phone number. Replies that may depend on the
+    conversation so far are stored for that conversation only. A hit is
+    added to the asking conversation's history as if the model had answered.
+
+    Replies that consulted get_available_slots remember the availability
+    version they saw and are dropped once any slot changes; an availability
+    answer given without that tool (e.g. from history) can't be invalidated,
+    so it isn't cached.
+    """
+
+    def __init__(self, inner: LLMInterface, ttl_seconds: float = CACHE_TTL_SECONDS, max_entries: int = CACHE_MAX_ENTRIES):
+        self.inner = inner
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._entries = OrderedDict()   # key -> (expires_at, availability_version or None, reply)
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.uncacheable = 0
+        self.invalidations = 0
+        self._miss_seconds = 0.0
+
+    def __getattr__(self, name):
+        # Provider-specific helpers (e.g. GeminiService.clear_history) pass through
+        return getattr(self.inner, name)
+
+    def add_exchange(self, prompt: str, reply: str):
+        self.inner.add_exchange(prompt, reply)
+
+    def has_context(self) -> bool:
+        return self.inner.has_context()
+
+    def _lookup(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, version, reply = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                return None
+            if version is not None and version != availability_version():
+                del self._entries[key]
+                self.invalidations += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return reply
+
+    def _store(self, key, reply: str, version):
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl_seconds, version, reply)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def _keys(self, prompt: str):
+        """(shared key or None, this conversation's key or None), or None if uncacheable."""
+        normalized = normalize_prompt(prompt)
+        if normalized is None:
+            with self._lock:
+                self.uncacheable += 1
+            return None
+        # The hour too: availability leaves out slots that have already started
+        hour = datetime.now().strftime("%Y-%m-%dT%H")
+        conversation = current_conversation.get()
+        shared = (None, hour, normalized) if not CONTEXT_WORDS & set(normalized.split()) else None
+        own = (conversation, hour, normalized) if conversation is not None else None
+        return shared, own
+
+    def _find(self, keys):
+        for key in keys:
+            if key is not None:
+                reply = self._lookup(key)
+                if reply is not None:
+                    return key, reply
+        return None, None
+
+    def _record_miss(self, keys, prompt: str, reply: str, version, tools_used: list, fresh: bool, elapsed: float):
+        with self._lock:
+            self.misses += 1
+            self._miss_seconds += elapsed
+        shared, own = keys
+        normalized = (shared or own)[2]
+        if not reply or not set(tools_used) <= CACHEABLE_TOOLS:
+            return
+        if not tools_used and (AVAILABILITY_TOPICS & set(normalized.split()) or AVAILABILITY_REPLY_RE.search(reply)):
+            return
+        version = version if tools_used else None
+        if shared is not None and fresh and not _mentions_sender(prompt, reply):
+            self._store(shared, reply, version)
+        elif own is not None:
+            self._store(own, reply, version)
+
+    def _hit(self, key, prompt: str, reply: str):
+        print(f"♻️  LLM reply served from cache for '{key[2]}'")
+        # Keep the conversation's history complete for the next model turn
+        self.inner.add_exchange(prompt, reply)
+
+    def generate_response(self, prompt: str) -> str:
+        keys = self._keys(prompt)
+        if keys is None:
+            return self.inner.generate_response(prompt)
+        key, reply = self._find(keys)
+        if reply is not None:
+            self._hit(key, prompt, reply)
+            return reply
+
+        # Captured before the call so a slot change mid-turn makes the entry stale
+        version = availability_version()
+        fresh = not self.inner.has_context()
+        tools_used = []
+        token = current_turn_tools.set(tools_used)
+        started = time.perf_counter()
+        try:
+            reply = self.inner.generate_response(prompt)
+        finally:
+            current_turn_tools.reset(token)
+        self._record_miss(keys, prompt, reply, version, tools_used, fresh, time.perf_counter() - started)
+        return reply
+
+    async def astream(self, prompt: str):
+        keys = self._keys(prompt)
+        if keys is None:
+            async for chunk in self.inner.astream(prompt):
+                yield chunk
+            return
+        key, reply = self._find(keys)
+        if reply is not None:
+            self._hit(key, prompt, reply)
+            yield reply
+            return
+
+        version = availability_version()
+        fresh = not self.inner.has_context()
+        tools_used = []
+        token = current_turn_tools.set(tools_used)
+        started = time.perf_counter()
+        parts = []
+        try:
+            async for chunk in self.inner.astream(prompt):
+                parts.append(chunk)
+                yield chunk
+        finally:
+            current_turn_tools.reset(token)
+        self._record_miss(keys, prompt, "".join(parts), version, tools_used, fresh, time.perf_counter() - started)
+
+    async def agenerate(self, prompt: str) -> str:
+        return "".join([chunk async for chunk in self.astream(prompt)]) or DEFAULT_REPLY
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            avg_miss_ms = self._miss_seconds / self.misses * 1000 if self.misses else 0.0
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "uncacheable": self.uncacheable,
+                "invalidations": self.invalidations,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "avg_miss_latency_ms": round(avg_miss_ms, 1),
+                "latency_saved_ms": round(self.hits * avg_miss_ms, 1),
+                "entries": len(self._entries),
+            }
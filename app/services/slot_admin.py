@@ -0,0 +1,247 @@
+import os
+import time
+import uuid
+import threading
+from datetime import datetime, timedelta
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, List
+from botocore.exceptions import ClientError
+from pydantic import BaseModel
+from app.db import dynamodb_client, slots_table
+from app.services.slots import existing_slot_ids, MAX_BATCH_RETRIES
+from app.services.events import emit, SLOT_CREATED, SLOT_BLOCKED, SLOT_UNBLOCKED, SLOT_DELETED
+
+# Bulk inventory management: create/block/unblock/delete slots over date and
+# time ranges. Creation skips slots a BatchGetItem finds, then writes the rest
+# with chunked TransactWriteItems (100 puts per call), each put conditional
+# on the slot not existing, so a slot held or booked in between is never
+# overwritten. Block/unblock/delete must never touch booked or held slots,
+# so they use conditional per-item writes fanned out over a thread pool.
+
+TRANSACT_WRITE_SIZE = 100      # DynamoDB TransactWriteItems limit
+ADMIN_WRITE_CONCURRENCY = int(os.getenv("ADMIN_WRITE_CONCURRENCY", "8"))
+MAX_SLOTS_PER_JOB = int(os.getenv("ADMIN_MAX_SLOTS_PER_JOB", "50000"))
+MAX_JOBS_KEPT = 100
+
+OPERATIONS = ("create", "block", "unblock", "delete")
+# Change event emitted per slot a conditional operation actually changed
+CONDITIONAL_EVENTS = {
+    "block": (SLOT_BLOCKED, "AVAILABLE", "BLOCKED"),
+    "unblock": (SLOT_UNBLOCKED, "BLOCKED", "AVAILABLE"),
+    "delete": (SLOT_DELETED, None, None),
+}
+
+
+class BulkSlotRequest(BaseModel):
+    start_date: str                          # YYYY-MM-DD, inclusive
+    end_date: str                            # YYYY-MM-DD, inclusive
+    start_time: str = "09:00"                # HH:MM, inclusive
+    end_time: str = "17:00"                  # HH:MM, exclusive
+    interval_minutes: int = 60
+    weekdays: Optional[List[int]] = None     # 0=Monday .. 6=Sunday; None = every day
+
+
+def expand_slots(request: BulkSlotRequest) -> list:
+    """Returns [(slot_id, date, start_time), ...] covered by the request."""
+    if request.interval_minutes <= 0:
+        raise ValueError("interval_minutes must be positive")
+    day = datetime.strptime(request.start_date, "%Y-%m-%d")
+    last_day = datetime.strptime(request.end_date, "%Y-%m-%d")
+    first = datetime.strptime(request.start_time, "%H:%M")
+    end = datetime.strptime(request.end_time, "%H:%M")
+    if last_day < day or end <= first:
+        raise ValueError("Empty date or time range")
+
+    slots = []
+    while day <= last_day:
+        if request.weekdays is None or day.weekday() in request.weekdays:
+            date_str = day.strftime("%Y-%m-%d")
+            t = first
+            while t < end:
+                hhmm = t.strftime("%H:%M")
+                slots.append((f"{date_str}-{hhmm}", date_str, hhmm))
+                t += timedelta(minutes=request.interval_minutes)
+        day += timedelta(days=1)
+        if len(slots) > MAX_SLOTS_PER_JOB:
+            raise ValueError(f"Request covers more than {MAX_SLOTS_PER_JOB} slots")
+    return slots
+
+
+class SlotJob:
+    """Progress of one bulk operation; counters are updated from worker threads."""
+
+    def __init__(self, operation: str, total: int):
+        self.job_id = str(uuid.uuid4())
+        self.operation = operation
+        self.status = "PENDING"
+        self.total = total
+        self.processed = 0
+        self.succeeded = 0
+        self.skipped = 0        # already existed (create) / booked, held or in the wrong state
+        self.failed = 0
+        self.retries = 0
+        self.errors = []
+        self.started_at = None
+        self.finished_at = None
+        self._lock = threading.Lock()
+
+    def add(self, succeeded=0, skipped=0, failed=0, retries=0, error=None):
+        with self._lock:
+            self.succeeded += succeeded
+            self.skipped += skipped
+            self.failed += failed
+            self.retries += retries
+            self.processed += succeeded + skipped + failed
+            if error and len(self.errors) < 20:
+                self.errors.append(error)
+
+    def to_dict(self) -> dict:
+        elapsed = (self.finished_at or time.time()) - self.started_at if self.started_at else 0.0
+        return {
+            "job_id": self.job_id,
+            "operation": self.operation,
+            "status": self.status,
+            "total": self.total,
+            "processed": self.processed,
+            "progress": round(self.processed / self.total, 4) if self.total else 1.0,
+            "succeeded": self.succeeded,
+            "skipped": self.skipped,
+            "failed": self.failed,
+            "retries": self.retries,
+            "elapsed_seconds": round(elapsed, 2),
+            "slots_per_second": round(self.processed / elapsed, 1) if elapsed else 0.0,
+            "errors": list(self.errors),
+        }
+
+
+_jobs = OrderedDict()
+
+
+def create_job(operation: str, total: int) -> SlotJob:
+    job = SlotJob(operation, total)
+    _jobs[job.job_id] = job
+    while len(_jobs) > MAX_JOBS_KEPT:
+        _jobs.popitem(last=False)
+    return job
+
+
+def get_job(job_id: str):
+    return _jobs.get(job_id)
+
+
+def list_jobs() -> list:
+    return [job.to_dict() for job in reversed(_jobs.values())]
+
+
+def _chunks(items: list, size: int):
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+
+def _transact_create(job: SlotJob, slots: list):
+    """
+    Creates one chunk (<= 100 slots) in a single TransactWriteItems call. Each
+    put requires the slot not to exist; if one appeared since the existence
+    check, the transaction is cancelled, that slot is skipped and the rest retried.
+    """
+    pending = list(slots)
+    retries = 0
+    for attempt in range(MAX_BATCH_RETRIES):
+        try:
+            dynamodb_client.transact_write_items(TransactItems=[
+                {"Put": {
+                    "TableName": slots_table.name,
+                    "Item": {"slot_id": {"S": sid}, "date": {"S": d}, "start_time": {"S": t},
+                             "status": {"S": "AVAILABLE"}, "is_available": {"BOOL": True}, "version": {"N": "0"}},
+                    "ConditionExpression": "attribute_not_exists(slot_id)",
+                }}
+                for sid, d, t in pending
+            ])
+        except ClientError as e:
+            if e.response["Error"]["Code"] != "TransactionCanceledException":
+                job.add(failed=len(pending), retries=retries, error=str(e))
+                return
+            reasons = e.response.get("CancellationReasons") or []
+            taken = {i for i, reason in enumerate(reasons) if reason.get("Code") == "ConditionalCheckFailed"}
+            if taken:
+                job.add(skipped=len(taken))
+                pending = [slot for i, slot in enumerate(pending) if i not in taken]
+                if not pending:
+                    return
+            else:
+                # Transaction conflict or throttling: back off and retry the same chunk
+                retries += 1
+                time.sleep(min(1.0, 0.05 * 2 ** attempt))
+            continue
+        job.add(succeeded=len(pending), retries=retries)
+        for sid, _, _ in pending:
+            emit(SLOT_CREATED, sid, None, "AVAILABLE", reason="admin")
+        return
+    job.add(failed=len(pending), retries=retries, error="TransactWriteItems retries exhausted")
+
+
+def _create(job: SlotJob, slots: list, pool: ThreadPoolExecutor):
+    existing = existing_slot_ids([sid for sid, _, _ in slots])
+    if existing:
+        job.add(skipped=len(existing))
+    missing = [slot for slot in slots if slot[0] not in existing]
+    list(pool.map(lambda chunk: _transact_create(job, chunk), _chunks(missing, TRANSACT_WRITE_SIZE)))
+
+
+def _conditional_write(job: SlotJob, operation: str, slot_id: str):
+    names = {"#s": "status"}
+    try:
+        if operation == "block":
+            slots_table.update_item(
+                Key={"slot_id": slot_id},
+                UpdateExpression="SET #s = :blocked, is_available = :false, version = version + :inc",
+                ConditionExpression="#s = :avail",
+                ExpressionAttributeNames=names,
+                ExpressionAttributeValues={":blocked": "BLOCKED", ":avail": "AVAILABLE", ":false": False, ":inc": 1}
+            )
+        elif operation == "unblock":
+            slots_table.update_item(
+                Key={"slot_id": slot_id},
+                UpdateExpression="SET #s = :avail, is_available = :true, version = version + :inc",
+                ConditionExpression="#s = :blocked",
+                ExpressionAttributeNames=names,
+                ExpressionAttributeValues={":blocked": "BLOCKED", ":avail": "AVAILABLE", ":true": True, ":inc": 1}
+            )
+        elif operation == "delete":
+            # Booked and held slots are never deleted
+            slots_table.delete_item(
+                Key={"slot_id": slot_id},
+                ConditionExpression="#s IN (:avail, :blocked)",
+                ExpressionAttributeNames=names,
+                ExpressionAttributeValues={":blocked": "BLOCKED", ":avail": "AVAILABLE"}
+            )
+        job.add(succeeded=1)
+        event_type, old_status, new_status = CONDITIONAL_EVENTS[operation]
+        emit(event_type, slot_id, old_status, new_status, reason="admin")
+    except ClientError as e:
+        if e.response["Error"]["Code"] == "ConditionalCheckFailedException":
+            job.add(skipped=1)
+        else:
+            job.add(failed=1, error=f"{slot_id}: {e}")
+
+
+def run_job(job: SlotJob, slots: list):
+    """Executes a bulk job synchronously (call from a worker thread)."""
+    job.status = "RUNNING"
+    job.started_at = time.time()
+    print(f"DEBUG: Admin {job.operation} job {job.job_id} over {len(slots)} slots")
+    try:
+        with ThreadPoolExecutor(max_workers=ADMIN_WRITE_CONCURRENCY) as pool:
+            if job.operation == "create":
+                _create(job, slots, pool)
+            else:
+                list(pool.map(lambda s: _conditional_write(job, job.operation, s[0]), slots))
+        job.status = "COMPLETED" if not job.failed else "COMPLETED_WITH_ERRORS"
+    except Exception as e:
+        job.status = "FAILED"
+        job.errors.append(str(e))
+        print(f"ERROR in admin slot job {job.job_id}: {e}")
+    finally:
+        job.finished_at = time.time()
+    return job
@@ -0,0 +1,114 @@
+import os
+import time
+import random
+import secrets
+import threading
+from botocore.exceptions import ClientError
+from app.db import slots_table
+
+# Optimistic concurrency for Slot rows.
+#
+# Every slot mutation bumps the row's `version`, and writes made from an
+# earlier read (expiry sweep, cancellation, releasing a declined offer) are
+# conditional on the version they read, so they can't undo a change that
+# happened in between. hold_slot stores a random nonce on the slot and returns
+# it with the new version as the hold token; confirm_appointment only books
+# the slot if it still carries both, so a hold can't be confirmed by anyone
+# who merely guesses the version.
+#
+# versioned_update() is the read-check-write loop with retry: on a version
+# conflict it backs off (jittered, exponential), re-reads the slot and lets
+# the caller decide again whether the write still applies.
+
+MAX_ATTEMPTS = int(os.getenv("SLOT_CONFLICT_MAX_ATTEMPTS", "4"))
+BACKOFF_SECONDS = float(os.getenv("SLOT_CONFLICT_BACKOFF_SECONDS", "0.05"))
+
+_lock = threading.Lock()
+_stats = {}     # operation -> {"attempts": n, "conflicts": n, "retries": n, "exhausted": n}
+
+
+class VersionConflict(Exception):
+    """Raised when a slot kept changing underneath versioned_update()."""
+
+
+def is_conditional_failure(e: Exception) -> bool:
+    return isinstance(e, ClientError) and e.response['Error']['Code'] == 'ConditionalCheckFailedException'
+
+
+def record(operation: str, attempts: int = 0, conflicts: int = 0, retries: int = 0, exhausted: int = 0):
+    """Counts conditional slot writes and how many of them lost a race."""
+    with _lock:
+        stats = _stats.setdefault(operation, {"attempts": 0, "conflicts": 0, "retries": 0, "exhausted": 0})
+        stats["attempts"] += attempts
+        stats["conflicts"] += conflicts
+        stats["retries"] += retries
+        stats["exhausted"] += exhausted
+
+
+def new_hold_nonce() -> str:
+    return secrets.token_hex(8)
+
+
+def hold_token(attributes: dict) -> str:
+    """The token confirm_appointment needs: the slot version the hold produced and the hold's nonce."""
+    return f"{int(attributes['version'])}.{attributes['hold_nonce']}"
+
+
+def parse_token(token):
+    """Hold tokens travel through the LLM as strings; returns (version, nonce), or None if unusable."""
+    try:
+        version, nonce = str(token).strip().split(".", 1)
+        return int(version), nonce
+    except (TypeError, ValueError):
+        return None
+
+
+def backoff(attempt: int):
+    time.sleep(BACKOFF_SECONDS * (2 ** attempt) * random.uniform(0.5, 1.5))
+
+
+def versioned_update(slot_id: str, operation: str, mutate, attempts: int = MAX_ATTEMPTS):
+    """
+    Reads the slot, asks mutate(item) for the change and writes it only if the
+    version is still the one read, bumping it.
+
+    mutate gets the current item (None if the slot is gone) and returns None to
+    skip the write, or a dict with "set" (SET clauses, without the keyword) and
+    optionally "names"/"values" for them. Returns the updated attributes, or
+    None if mutate skipped. Raises VersionConflict after `attempts` conflicts.
+    """
+    for attempt in range(attempts):
+        if attempt:
+            record(operation, retries=1)
+            backoff(attempt - 1)
+        item = slots_table.get_item(Key={"slot_id": slot_id}, ConsistentRead=True).get("Item")
+        change = mutate(item)
+        if change is None:
+            return None
+        kwargs = {
+            "Key": {"slot_id": slot_id},
+            "UpdateExpression": f"SET {change['set']}, version = :seen + :one",
+            "ConditionExpression": "version = :seen",
+            "ExpressionAttributeValues": {**change.get("values", {}), ":seen": item["version"], ":one": 1},
+            "ReturnValues": "ALL_NEW",
+        }
+        if change.get("names"):
+            kwargs["ExpressionAttributeNames"] = change["names"]
+        try:
+            response = slots_table.update_item(**kwargs)
+            record(operation, attempts=1)
+            return response.get("Attributes", {})
+        except ClientError as e:
+            if not is_conditional_failure(e):
+                raise
+            record(operation, attempts=1, conflicts=1)
+    record(operation, exhausted=1)
+    raise VersionConflict(f"Slot {slot_id} changed {attempts} times while {operation} was updating it.")
+
+
+def snapshot() -> dict:
+    with _lock:
+        stats = {op: dict(s) for op, s in _stats.items()}
+    for s in stats.values():
+        s["conflict_rate"] = round(s["conflicts"] / s["attempts"], 4) if s["attempts"] else 0.0
+    return stats
@@ -1,32 +1,165 @@
-from boto3.dynamodb.conditions import Attr
+import time
 from datetime import datetime, timedelta
-from app.db import slots_table
-from decimal import Decimal
+from botocore.exceptions import ClientError
+from app.db import slots_table, dynamodb_client, plain_item
+from app.services.events import event_bus, emit, SLOT_TYPES, SLOT_CREATED, SLOT_DELETED
 
-def get_available_slots(date: str = None):
+# Bumped on every slot change event, local or from another worker. Cached LLM
+# answers that looked at availability are only valid for the version they
+# were produced under.
+_availability_version = 0
+
+def availability_version() -> int:
+    return _availability_version
+
+def bump_availability_version(event=None):
+    global _availability_version
+    _availability_version += 1
+
+event_bus.subscribe_sync(bump_availability_version, types=SLOT_TYPES)
+
+# Start-time windows ("HH:MM", end exclusive) for IntentResponse.time_preference
+TIME_WINDOWS = {
+    "morning": ("00:00", "12:00"),
+    "afternoon": ("12:00", "17:00"),
+    "evening": ("17:00", "24:00"),
+}
+
+def get_available_slots(date: str = None, time_preference: str = None, exact_time: str = None):
+    """
+    Lists the open appointment slots for a date, as slot_id and time only.
+    Times that have already passed today are left out.
+
+    Args:
+        date: The date to check, YYYY-MM-DD. Defaults to today.
+        time_preference: Optional 'morning', 'afternoon', 'evening' or 'exact_time' to narrow the list.
+        exact_time: The HH:MM (24h) time the patient asked for, with time_preference 'exact_time'.
+    """
     now = datetime.now()
     today_str = now.strftime("%Y-%m-%d")
-    target_date = date if date else today_str
 
     # Run maintenance before searching
     cleanup_and_seed_slots(today_str)
 
-    print(f"DEBUG: AI searching for date={target_date}")
-    
-    response = slots_table.scan(
-        FilterExpression=Attr('date').eq(target_date) & Attr('is_available').eq(True)
-    )
+    return find_available_slots(date or today_str, now, time_preference, exact_time)
+
+def list_available_slots(date: str = None) -> list:
+    """
+    Full items (status, date, start_time, version, ...) of the open slots for
+    a date, for the REST API. The tool uses the compact find_available_slots.
+    """
+    today_str = datetime.now().strftime("%Y-%m-%d")
+    cleanup_and_seed_slots(today_str)
 
-    items = response.get("Items", [])
-    
-    for item in items:
-        for key, value in item.items():
-            if isinstance(value, Decimal):
-                item[key] = int(value) if value % 1 == 0 else float(value)
+    items, kwargs = [], {
+        "TableName": slots_table.name,
+        "FilterExpression": "#d = :date AND is_available = :true",
+        "ExpressionAttributeNames": {"#d": "date"},
+        "ExpressionAttributeValues": {":date": {"S": date or today_str}, ":true": {"BOOL": True}},
+    }
+    while True:
+        response = dynamodb_client.scan(**kwargs)
+        items.extend(plain_item(item) for item in response.get("Items", []))
+        if "LastEvaluatedKey" not in response:
+            break
+        kwargs["ExclusiveStartKey"] = response["LastEvaluatedKey"]
 
     items.sort(key=lambda x: x.get('slot_id', ''))
     return items
 
+def slot_time_range(target_date: str, now: datetime, time_preference: str = None, exact_time: str = None):
+    """
+    The (earliest, latest] start_time bounds worth returning for a date, or
+    None if nothing can match (a past date, or a window that has already gone by).
+    """
+    today_str = now.strftime("%Y-%m-%d")
+    if target_date < today_str:
+        return None
+    # Exclusive lower bound: slots starting at or before now are gone
+    earliest = now.strftime("%H:%M") if target_date == today_str else ""
+    latest = "24:00"
+    exact = _parse_hhmm(exact_time) if time_preference == "exact_time" else None
+    if exact:
+        earliest, latest = max(earliest, _minute_before(exact)), exact
+    elif time_preference in TIME_WINDOWS:
+        start, end = TIME_WINDOWS[time_preference]
+        earliest, latest = max(earliest, _minute_before(start)), _minute_before(end)
+    return (earliest, latest) if earliest < latest else None
+
+def _parse_hhmm(value: str):
+    try:
+        return datetime.strptime((value or "").strip(), "%H:%M").strftime("%H:%M")
+    except ValueError:
+        return None
+
+def _minute_before(hhmm: str) -> str:
+    if hhmm == "00:00":
+        return ""
+    hours, minutes = divmod(int(hhmm[:2]) * 60 + int(hhmm[3:5]) - 1, 60)
+    return f"{hours:02d}:{minutes:02d}"
+
+def find_available_slots(target_date: str, now: datetime, time_preference: str = None, exact_time: str = None) -> list:
+    """The tool payload: open slots for the date within the time bounds, filtered by DynamoDB."""
+    print(f"DEBUG: AI searching for date={target_date} preference={time_preference} {exact_time or ''}")
+    bounds = slot_time_range(target_date, now, time_preference, exact_time)
+    if bounds is None:
+        return []
+    earliest, latest = bounds
+
+    # Low-level client: items come back as plain values, without the
+    # resource layer's Decimal conversion. Only slot_id and start_time are
+    # read back, and past/out-of-window times are filtered server side, so
+    # the model reads as few tokens as possible.
+    condition = "#d = :date AND is_available = :true AND start_time <= :latest"
+    values = {":date": {"S": target_date}, ":true": {"BOOL": True}, ":latest": {"S": latest}}
+    if earliest:
+        condition += " AND start_time > :earliest"
+        values[":earliest"] = {"S": earliest}
+    items, kwargs = [], {
+        "TableName": slots_table.name,
+        "FilterExpression": condition,
+        "ProjectionExpression": "slot_id, start_time",
+        "ExpressionAttributeNames": {"#d": "date"},
+        "ExpressionAttributeValues": values,
+    }
+    while True:
+        response = dynamodb_client.scan(**kwargs)
+        items.extend(
+            {"slot_id": item["slot_id"]["S"], "time": item["start_time"]["S"]}
+            for item in response.get("Items", [])
+        )
+        if "LastEvaluatedKey" not in response:
+            break
+        kwargs["ExclusiveStartKey"] = response["LastEvaluatedKey"]
+
+    items.sort(key=lambda x: x['slot_id'])
+    return items
+
+BATCH_GET_SIZE = 100           # DynamoDB BatchGetItem limit
+MAX_BATCH_RETRIES = 8
+
+def existing_slot_ids(slot_ids: list) -> set:
+    """
+    Which of the slot ids exist: BatchGetItem (keys only) in chunks of 100
+    instead of a get_item per slot, retrying UnprocessedKeys with backoff.
+    Raises if keys are still unprocessed after the retries: they can't be
+    treated as missing.
+    """
+    found = set()
+    for i in range(0, len(slot_ids), BATCH_GET_SIZE):
+        request = {slots_table.name: {"Keys": [{"slot_id": {"S": sid}} for sid in slot_ids[i:i + BATCH_GET_SIZE]],
+                                      "ProjectionExpression": "slot_id"}}
+        for attempt in range(MAX_BATCH_RETRIES):
+            response = dynamodb_client.batch_get_item(RequestItems=request)
+            found.update(item["slot_id"]["S"] for item in response["Responses"].get(slots_table.name, []))
+            request = response.get("UnprocessedKeys") or {}
+            if not request:
+                break
+            time.sleep(min(1.0, 0.05 * 2 ** attempt))
+        if request:
+            raise RuntimeError("BatchGetItem retries exhausted while checking for existing slots")
+    return found
+
 def cleanup_and_seed_slots(today_str: str):
     """Deletes old data and ensures a full week of slots exists."""
     try:
@@ -39,6 +172,7 @@ def cleanup_and_seed_slots(today_str: str):
             sdate = item.get('date')
             if sid and (sdate is None or sdate < today_str):
                 slots_table.delete_item(Key={'slot_id': sid})
+                emit(SLOT_DELETED, sid, reason="past")
 
         #Ensure the next 7 days are populated
         print(f"DEBUG: Ensuring 7-day slot availability starting from {today_str}...")
@@ -46,26 +180,32 @@ def cleanup_and_seed_slots(today_str: str):
         # Define the hours you want available every day
         business_hours = ["09:00", "10:00", "11:00", "12:00", "13:00", "14:00", "15:00", "16:00"]
         start_date = datetime.strptime(today_str, "%Y-%m-%d")
+        week = [(start_date + timedelta(days=i)).strftime("%Y-%m-%d") for i in range(7)]
+        existing = existing_slot_ids([f"{d}-{hr}" for d in week for hr in business_hours])
 
-        for i in range(7):
-            current_date_obj = start_date + timedelta(days=i)
-            current_date_str = current_date_obj.strftime("%Y-%m-%d")
-
+        for current_date_str in week:
             for hr in business_hours:
                 slot_id = f"{current_date_str}-{hr}"
-                existing = slots_table.get_item(Key={'slot_id': slot_id})
-                if not existing.get('Item'):
+                if slot_id not in existing:
                     print(f"DEBUG: Seeding missing slot {slot_id}...")
-                    slots_table.put_item(
-                        Item={
-                            'slot_id': slot_id,
-                            'date': current_date_str,
-                            'start_time': hr,
-                            'status': 'AVAILABLE',
-                            'is_available': True,
-                            'version': 0
-                        }
-                    )
+                    try:
+                        # Conditional: a slot created (and maybe held) since the check is left alone
+                        slots_table.put_item(
+                            Item={
+                                'slot_id': slot_id,
+                                'date': current_date_str,
+                                'start_time': hr,
+                                'status': 'AVAILABLE',
+                                'is_available': True,
+                                'version': 0
+                            },
+                            ConditionExpression="attribute_not_exists(slot_id)"
+                        )
+                    except ClientError as e:
+                        if e.response["Error"]["Code"] == "ConditionalCheckFailedException":
+                            continue
+                        raise
+                    emit(SLOT_CREATED, slot_id, None, "AVAILABLE", reason="seed")
         print("DEBUG: 7-Day Seeding Complete.")
 
     except Exception as e:
@@ -0,0 +1,191 @@
+import os
+import time
+import asyncio
+import threading
+from abc import abstractmethod
+from collections import OrderedDict
+from .llm_interface import LLMInterface, ToolCall, DEFAULT_REPLY
+from app.services.tools import FUNCTIONS
+from app.services.idempotency import tool_cache, current_conversation, READ_ONLY_TOOLS
+
+TOOL_TIMEOUT_SECONDS = float(os.getenv("TOOL_TIMEOUT_SECONDS", "10"))
+MAX_TOOL_ROUNDS = int(os.getenv("LLM_MAX_TOOL_ROUNDS", "6"))
+MAX_CONVERSATIONS = 1000
+MAX_HISTORY_ENTRIES = 40
+
+
+class ToolExecutor:
+    """
+    Runs model-requested tool calls for any provider: each in a worker thread,
+    under a timeout, through the idempotency cache, and with per-tool
+    latency/error metrics. A batch of reads runs concurrently; a batch with a
+    write runs in the model's order, one call at a time.
+
+    A timed-out call returns an error to the model straight away; the worker
+    thread itself can't be interrupted and finishes in the background.
+    """
+
+    def __init__(self, functions: dict = FUNCTIONS, timeout: float = TOOL_TIMEOUT_SECONDS):
+        self.functions = functions
+        self.timeout = timeout
+        self._lock = threading.Lock()
+        self._stats = {}   # tool -> {"calls", "errors", "timeouts", "total_ms", "max_ms"}
+
+    def _record(self, name: str, elapsed_ms: float, outcome: str = None):
+        with self._lock:
+            s = self._stats.setdefault(name, {"calls": 0, "errors": 0, "timeouts": 0, "total_ms": 0.0, "max_ms": 0.0})
+            s["calls"] += 1
+            s["total_ms"] += elapsed_ms
+            s["max_ms"] = max(s["max_ms"], elapsed_ms)
+            if outcome:
+                s[outcome] += 1
+
+    async def run(self, call: ToolCall, conversation=None):
+        func = self.functions.get(call.name)
+        if func is None:
+            return {"error": f"Function {call.name} not found"}
+
+        started = time.perf_counter()
+        outcome = None
+        try:
+            result = await asyncio.wait_for(
+                tool_cache.acall(conversation, call.name, func, dict(call.args or {})),
+                timeout=self.timeout
+            )
+        except asyncio.TimeoutError:
+            outcome = "timeouts"
+            print(f"⏱️  Tool {call.name} timed out after {self.timeout}s")
+            result = {"error": f"{call.name} timed out, please try again."}
+        except Exception as e:
+            outcome = "errors"
+            print(f"❌ Tool error in {call.name}: {e}")
+            result = {"error": str(e)}
+        self._record(call.name, (time.perf_counter() - started) * 1000, outcome)
+        return result
+
+    async def run_all(self, calls: list, conversation=None, run=None) -> list:
+        """
+        Executes a batch of calls; results keep the calls' order. `run` replaces
+        self.run for callers that wrap each call (e.g. in a trace span).
+        """
+        run = run or (lambda call: self.run(call, conversation))
+        if all(call.name in READ_ONLY_TOOLS for call in calls):
+            return await asyncio.gather(*(run(call) for call in calls))
+        # e.g. hold_slot and confirm_appointment from one turn must not race
+        return [await run(call) for call in calls]
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                name: {
+                    "calls": s["calls"],
+                    "errors": s["errors"],
+                    "timeouts": s["timeouts"],
+                    "avg_ms": round(s["total_ms"] / s["calls"], 1) if s["calls"] else 0.0,
+                    "max_ms": round(s["max_ms"], 1),
+                }
+                for name, s in self._stats.items()
+            }
+
+
+tool_executor = ToolExecutor()
+
+
+class ToolLoopLLM(LLMInterface):
+    """
+    Base class for providers whose tool calls are executed by our code rather
+    than by the SDK. A provider only implements astream_turn(); the loop here
+    streams text to the caller, runs any requested tools via the shared
+    ToolExecutor, feeds the results back and repeats until the model answers.
+
+    History is kept per conversation (current_conversation) as plain dicts;
+    a call without a conversation (e.g. /chat) starts from an empty history
+    and keeps none:
+        {"role": "user", "text": ...}
+        {"role": "model", "text": ..., "tool_calls": [ToolCall, ...]}
+        {"role": "tool", "results": [(ToolCall, result), ...]}
+    """
+
+    def __init__(self, executor: ToolExecutor = None):
+        self.executor = executor or tool_executor
+        self._histories = OrderedDict()
+        self._history_lock = threading.Lock()
+
+    @abstractmethod
+    def astream_turn(self, history: list):
+        """
+        One model round over the history. Async generator yielding text chunks
+        (str) and/or ToolCall objects.
+        """
+        pass
+
+    def _history(self, conversation) -> list:
+        if conversation is None:
+            return []
+        with self._history_lock:
+            history = self._histories.pop(conversation, None) or []
+            self._histories[conversation] = history
+            while len(self._histories) > MAX_CONVERSATIONS:
+                self._histories.popitem(last=False)
+            return history
+
+    @staticmethod
+    def _trim(history: list):
+        # Drop whole exchanges from the front so a tool result never loses its call
+        while len(history) > MAX_HISTORY_ENTRIES:
+            del history[0]
+            while history and history[0]["role"] != "user":
+                del history[0]
+
+    def reset_conversation(self, conversation=None):
+        with self._history_lock:
+            if conversation is None:
+                self._histories.clear()
+            else:
+                self._histories.pop(conversation, None)
+
+    async def astream(self, prompt: str):
+        conversation = current_conversation.get()
+        history = self._history(conversation)
+        history.append({"role": "user", "text": prompt})
+
+        for _ in range(MAX_TOOL_ROUNDS):
+            text_parts, calls = [], []
+            async for item in self.astream_turn(history):
+                if isinstance(item, ToolCall):
+                    calls.append(item)
+                elif item:
+                    text_parts.append(item)
+                    yield item
+            history.append({"role": "model", "text": "".join(text_parts), "tool_calls": calls})
+
+            if not calls:
+                break
+            print(f"🛠️  Executing {len(calls)} tool call(s): {[c.name for c in calls]}")
+            results = await self.executor.run_all(calls, conversation)
+            history.append({"role": "tool", "results": list(zip(calls, results))})
+        else:
+            yield "Sorry, that took longer than expected. Could you repeat your request?"
+
+        self._trim(history)
+
+    def add_exchange(self, prompt: str, reply: str):
+        conversation = current_conversation.get()
+        if conversation is None:
+            return
+        history = self._history(conversation)
+        history.append({"role": "user", "text": prompt})
+        history.append({"role": "model", "text": reply, "tool_calls": []})
+        self._trim(history)
+
+    def has_context(self) -> bool:
+        with self._history_lock:
+            return bool(self._histories.get(current_conversation.get()))
+
+    async def agenerate(self, prompt: str) -> str:
+        parts = [chunk async for chunk in self.astream(prompt)]
+        return "".join(parts) or DEFAULT_REPLY
+
+    def generate_response(self, prompt: str) -> str:
+        """Synchronous entry point for scripts and worker threads (not for use inside a running loop)."""
+        return asyncio.run(self.agenerate(prompt))
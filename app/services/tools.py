@@ -0,0 +1,20 @@
+from app.services.slots import get_available_slots
+from app.services.bookings import (
+    hold_slot, confirm_appointment, get_appointments_by_phone,
+    cancel_appointment, reschedule_appointment, resend_confirmation
+)
+from app.services.waitlist import join_waitlist
+
+# Registry of the functions the LLMs may call, by tool name.
+# Used for explicit dispatch (voice tool calls, replays, the SMS tool loop); the
+# SMS Gemini declarations are built from the same signatures and docstrings.
+FUNCTIONS = {
+    "get_available_slots": get_available_slots,
+    "hold_slot": hold_slot,
+    "confirm_appointment": confirm_appointment,
+    "get_appointments_by_phone": get_appointments_by_phone,
+    "cancel_appointment": cancel_appointment,
+    "reschedule_appointment": reschedule_appointment,
+    "resend_confirmation": resend_confirmation,
+    "join_waitlist": join_waitlist,
+}
@@ -0,0 +1,426 @@
+import os
+import re
+import time
+import uuid
+import heapq
+import queue
+import threading
+from datetime import datetime, timedelta
+from botocore.exceptions import ClientError
+from app.db import waitlist_table
+from app.services import bookings
+from app.services.events import event_bus, AVAILABLE_TYPES
+from app.services.slot_versions import is_conditional_failure
+
+# Waitlist: patients ask for a date range and time window; when a matching slot
+# is released (cancellation, hold expiry, admin unblock) it is held for the
+# longest-waiting eligible patient and offered to them by SMS.
+#
+# Entries are persisted in the Waitlist table and indexed in memory by
+# (date, hour). Each bucket is a heap ordered by join time, so a release only
+# looks at the one bucket its slot falls in: O(log n) per match instead of a
+# scan of the waitlist. Entries that leave the waitlist, or go on offer, are
+# dropped lazily when they reach the top of a heap; an offer that falls
+# through puts the entry back with its original place in the queue.
+#
+# The Waitlist table is the source of truth shared by all workers: the index
+# is rebuilt from it before matching or answering an offer reply (at most once
+# per WAITLIST_REFRESH_SECONDS), so a slot released on one worker is offered
+# to patients who joined through any worker. An entry goes on offer through a
+# conditional write (status still WAITING), so two workers never offer it at once.
+
+OFFER_HOLD_SECONDS = int(os.getenv("WAITLIST_OFFER_SECONDS", "900"))
+MAX_WAITLIST_DAYS = int(os.getenv("WAITLIST_MAX_DAYS", "30"))
+REFRESH_SECONDS = float(os.getenv("WAITLIST_REFRESH_SECONDS", "1"))
+
+WAITING, OFFERED = "WAITING", "OFFERED"
+ACTIVE = (WAITING, OFFERED)
+YES_WORDS = {"yes", "y", "yeah", "yep", "sure", "ok", "okay", "confirm", "book it"}
+NO_WORDS = {"no", "n", "nope", "pass", "decline", "no thanks"}
+PHONE_CONTEXT_RE = re.compile(r"^\[User Phone: [^\]]*\]\s*")
+
+
+def _minutes(hhmm: str) -> int:
+    hours, minutes = hhmm.split(":")
+    return int(hours) * 60 + int(minutes)
+
+
+class WaitlistIndex:
+    """In-memory (date, hour) -> heap of (joined_at, seq, entry_id) over WAITING entries."""
+
+    def __init__(self):
+        self.entries = {}           # entry_id -> entry dict
+        self.offers_by_phone = {}   # phone -> entry with an outstanding offer
+        self.offers_by_slot = {}    # slot_id -> entry with an outstanding offer
+        self._buckets = {}
+        self._live = {}             # entry_id -> seq of its current heap items; older items are stale
+        self._parked = {}           # phone -> [(bucket key, item)] popped while that phone holds an offer
+        self._seq = 0
+
+    def _buckets_for(self, entry: dict):
+        day = datetime.strptime(entry["start_date"], "%Y-%m-%d")
+        last_day = datetime.strptime(entry["end_date"], "%Y-%m-%d")
+        first_hour = _minutes(entry["earliest_time"]) // 60
+        last_hour = _minutes(entry["latest_time"]) // 60
+        while day <= last_day:
+            date_str = day.strftime("%Y-%m-%d")
+            for hour in range(first_hour, last_hour + 1):
+                yield (date_str, hour)
+            day += timedelta(days=1)
+
+    def _push(self, entry: dict):
+        self._seq += 1
+        self._live[entry["entry_id"]] = self._seq
+        item = (entry["joined_at"], self._seq, entry["entry_id"])
+        for key in self._buckets_for(entry):
+            heapq.heappush(self._buckets.setdefault(key, []), item)
+
+    def add(self, entry: dict):
+        self.entries[entry["entry_id"]] = entry
+        if entry["status"] == OFFERED:
+            self.offers_by_phone[entry["phone_number"]] = entry
+            self.offers_by_slot[entry["offered_slot_id"]] = entry
+        else:
+            self._push(entry)
+
+    def requeue(self, entry: dict):
+        """An offer fell through: the entry is WAITING again, at its original join time."""
+        self._push(entry)
+
+    def end_offer(self, entry: dict):
+        """Clears the entry's offer and returns the phone's other entries to their buckets."""
+        self.offers_by_phone.pop(entry["phone_number"], None)
+        self.offers_by_slot.pop(entry.get("offered_slot_id"), None)
+        for key, item in self._parked.pop(entry["phone_number"], ()):
+            if self._live.get(item[2]) == item[1]:
+                heapq.heappush(self._buckets.setdefault(key, []), item)
+
+    def pop_candidate(self, slot_id: str):
+        """Returns the longest-waiting WAITING entry whose window covers this slot, if any."""
+        date_str, hhmm = slot_id[:10], slot_id[11:]
+        key = (date_str, _minutes(hhmm) // 60)
+        heap = self._buckets.get(key)
+        if not heap:
+            return None
+
+        slot_minutes = _minutes(hhmm)
+        skipped = []
+        found = None
+        while heap:
+            item = heapq.heappop(heap)
+            entry = self.entries.get(item[2])
+            if entry is None or entry["status"] != WAITING or self._live.get(item[2]) != item[1]:
+                continue                                  # left the waitlist, on offer, or superseded
+            if entry["phone_number"] in self.offers_by_phone:
+                # Patient already holding an offer through another entry: set aside until it resolves
+                self._parked.setdefault(entry["phone_number"], []).append((key, item))
+                continue
+            if _minutes(entry["earliest_time"]) <= slot_minutes <= _minutes(entry["latest_time"]):
+                found = entry                             # goes on offer: leaves the heaps
+                break
+            skipped.append(item)                          # window starts or ends inside this hour
+        for item in skipped:
+            heapq.heappush(heap, item)
+        if not heap:
+            del self._buckets[key]
+        return found
+
+    def prune(self, today_str: str):
+        for key in [k for k in self._buckets if k[0] < today_str]:
+            del self._buckets[key]
+        finished = [e["entry_id"] for e in self.entries.values()
+                    if e["status"] not in ACTIVE or (e["end_date"] < today_str and e["status"] == WAITING)]
+        for entry_id in finished:
+            del self.entries[entry_id]
+            self._live.pop(entry_id, None)
+
+    def size(self) -> int:
+        return sum(1 for e in self.entries.values() if e["status"] in ACTIVE)
+
+
+_index = WaitlistIndex()
+_lock = threading.Lock()
+_refresh_lock = threading.Lock()
+_refreshed_at = None
+_recent_joins = []      # entries joined here since the last rebuild started, which its scan may miss
+_releases = queue.Queue()
+_matcher = None
+_stats = {"joined": 0, "releases": 0, "matches": 0, "offers": 0, "accepted": 0, "declined": 0,
+          "expired": 0, "hold_conflicts": 0, "claim_conflicts": 0, "refreshes": 0, "match_ms_total": 0.0}
+
+
+def _save(entry: dict):
+    try:
+        waitlist_table.put_item(Item={k: v for k, v in entry.items() if v is not None})
+    except Exception as e:
+        print(f"ERROR: Failed to persist waitlist entry {entry['entry_id']}: {e}")
+
+
+def _scan_active(today_str: str) -> list:
+    items, kwargs = [], {
+        "FilterExpression": "#s IN (:waiting, :offered) AND end_date >= :today",
+        "ExpressionAttributeNames": {"#s": "status"},
+        "ExpressionAttributeValues": {":waiting": WAITING, ":offered": OFFERED, ":today": today_str},
+    }
+    while True:
+        response = waitlist_table.scan(**kwargs)
+        for item in response.get("Items", []):
+            item["joined_at"] = int(item["joined_at"])
+            items.append(item)
+        if "LastEvaluatedKey" not in response:
+            return items
+        kwargs["ExclusiveStartKey"] = response["LastEvaluatedKey"]
+
+
+def _refresh():
+    """
+    Rebuilds the in-memory index from the Waitlist table, so it includes
+    entries joined and offers made through other workers. Skipped if the
+    index was rebuilt less than REFRESH_SECONDS ago.
+    """
+    global _index, _refreshed_at, _recent_joins
+    if _refreshed_at is not None and time.monotonic() - _refreshed_at < REFRESH_SECONDS:
+        return
+    with _refresh_lock:
+        if _refreshed_at is not None and time.monotonic() - _refreshed_at < REFRESH_SECONDS:
+            return
+        with _lock:
+            joined_before, _recent_joins = _recent_joins, []
+        try:
+            items = _scan_active(datetime.now().strftime("%Y-%m-%d"))
+        except Exception as e:
+            print(f"ERROR: Failed to load waitlist: {e}")
+            with _lock:
+                _recent_joins = joined_before + _recent_joins
+        else:
+            index = WaitlistIndex()
+            for item in items:
+                index.add(item)
+            with _lock:
+                # Joined here while the scan ran: saved, but maybe after the scan read past them
+                for entry in joined_before + _recent_joins:
+                    if entry["entry_id"] not in index.entries and entry["status"] == WAITING:
+                        index.add(entry)
+                if _refreshed_at is None:
+                    print(f"DEBUG: Waitlist index loaded with {index.size()} active entries")
+                _index = index
+                _stats["refreshes"] += 1
+        _refreshed_at = time.monotonic()
+
+
+def join_waitlist(phone_number: str, start_date: str, end_date: str = None,
+                  earliest_time: str = "09:00", latest_time: str = "17:00"):
+    """
+    Adds the patient to the waitlist for a date range and time window.
+    Use this when none of the available slots suit the patient. If a matching
+    slot frees up, it is held for them and they get an SMS offer to reply YES to.
+    Args:
+        phone_number: The user's contact number.
+        start_date: First acceptable date (YYYY-MM-DD).
+        end_date: Last acceptable date (YYYY-MM-DD); defaults to start_date.
+        earliest_time: Earliest acceptable start time (HH:MM, 24h).
+        latest_time: Latest acceptable start time (HH:MM, 24h).
+    """
+    end_date = end_date or start_date
+    print(f"DEBUG: AI invoking join_waitlist for {phone_number} {start_date}..{end_date} {earliest_time}-{latest_time}")
+    try:
+        first_day = datetime.strptime(start_date, "%Y-%m-%d")
+        last_day = datetime.strptime(end_date, "%Y-%m-%d")
+        if _minutes(latest_time) < _minutes(earliest_time):
+            raise ValueError("latest_time is before earliest_time")
+    except ValueError as e:
+        return {"success": False, "message": f"Invalid waitlist request: {e}"}
+    if last_day < first_day or (last_day - first_day).days >= MAX_WAITLIST_DAYS:
+        return {"success": False, "message": f"The date range must cover 1 to {MAX_WAITLIST_DAYS} days."}
+
+    _refresh()
+    entry = {
+        "entry_id": str(uuid.uuid4()),
+        "phone_number": phone_number.replace("whatsapp:", ""),
+        "start_date": start_date,
+        "end_date": end_date,
+        "earliest_time": earliest_time,
+        "latest_time": latest_time,
+        "status": WAITING,
+        "joined_at": int(time.time() * 1000),
+        "offered_slot_id": None,
+    }
+    _save(entry)
+    with _lock:
+        _index.prune(datetime.now().strftime("%Y-%m-%d"))
+        _index.add(entry)
+        _recent_joins.append(entry)
+        _stats["joined"] += 1
+
+    return {
+        "success": True,
+        "entry_id": entry["entry_id"],
+        "message": f"Added to the waitlist for {start_date} to {end_date}, {earliest_time}-{latest_time}. We'll text if a slot opens up."
+    }
+
+
+def _set_status(entry: dict, status: str):
+    with _lock:
+        entry["status"] = status
+        _index.end_offer(entry)
+    _save(entry)
+
+
+def _claim(entry: dict, slot_id: str) -> bool:
+    """Marks the entry OFFERED in the table, only if no other worker has offered or closed it."""
+    try:
+        waitlist_table.update_item(
+            Key={"entry_id": entry["entry_id"]},
+            UpdateExpression="SET #s = :offered, offered_slot_id = :slot",
+            ConditionExpression="#s = :waiting",
+            ExpressionAttributeNames={"#s": "status"},
+            ExpressionAttributeValues={":offered": OFFERED, ":waiting": WAITING, ":slot": slot_id}
+        )
+        return True
+    except ClientError as e:
+        if not is_conditional_failure(e):
+            print(f"ERROR: Failed to claim waitlist entry {entry['entry_id']}: {e}")
+        return False
+
+
+def _match(slot_id: str):
+    """Offers a released slot to the next eligible waitlister."""
+    started = time.perf_counter()
+    with _lock:
+        _stats["releases"] += 1
+        # A released slot that was on offer means the offer hold ran out
+        lapsed = _index.offers_by_slot.get(slot_id)
+    if lapsed is not None:
+        _set_status(lapsed, "EXPIRED")
+        with _lock:
+            _stats["expired"] += 1
+
+    while True:
+        with _lock:
+            entry = _index.pop_candidate(slot_id)
+            if entry is not None:
+                # Reserve the patient before the hold goes out so a concurrent release can't pick them too
+                entry["status"] = OFFERED
+                entry["offered_slot_id"] = slot_id
+                _index.offers_by_phone[entry["phone_number"]] = entry
+                _index.offers_by_slot[slot_id] = entry
+        if entry is None or _claim(entry, slot_id):
+            break
+        # Offered or closed through another worker since the last refresh; the next refresh shows it
+        with _lock:
+            _index.end_offer(entry)
+            _stats["claim_conflicts"] += 1
+
+    with _lock:
+        if entry is not None:
+            _stats["matches"] += 1
+        _stats["match_ms_total"] += (time.perf_counter() - started) * 1000
+    if entry is None:
+        return
+
+    result = bookings.hold_slot(slot_id, entry["phone_number"], hold_seconds=OFFER_HOLD_SECONDS)
+    if not result.get("success"):
+        # Someone else took the slot first; the patient keeps their place
+        with _lock:
+            entry["status"] = WAITING
+            _index.end_offer(entry)
+            entry["offered_slot_id"] = None
+            _index.requeue(entry)
+            _stats["hold_conflicts"] += 1
+        _save(entry)
+        return
+
+    entry["hold_token"] = result["hold_token"]
+    _save(entry)
+    minutes = OFFER_HOLD_SECONDS // 60
+    bookings.send_sms_notification(
+        entry["phone_number"],
+        f"Good news! {slot_id} just opened up at the Clinic and we're holding it for you for {minutes} minutes. "
+        "Reply YES to book it or NO to pass."
+    )
+    with _lock:
+        _stats["offers"] += 1
+    print(f"DEBUG: Waitlist offered {slot_id} to {entry['phone_number']}")
+
+
+def _matcher_loop():
+    while True:
+        slot_id = _releases.get()
+        try:
+            _refresh()
+            _match(slot_id)
+        except Exception as e:
+            print(f"ERROR in waitlist matcher for {slot_id}: {e}")
+
+
+def _on_release(event):
+    # Runs inside the releasing request or job; matching happens on the matcher thread
+    global _matcher
+    if _matcher is None:
+        with _lock:
+            if _matcher is None:
+                _matcher = threading.Thread(target=_matcher_loop, name="waitlist-matcher", daemon=True)
+                _matcher.start()
+    _releases.put(event.key)
+
+
+# Only this worker's releases: the worker that frees a slot offers it, to any worker's waitlisters
+event_bus.subscribe_sync(_on_release, types=AVAILABLE_TYPES, include_remote=False)
+
+
+def _reply_word(message: str) -> str:
+    return PHONE_CONTEXT_RE.sub("", message).strip().lower().strip(".!")
+
+
+def is_offer_reply(phone_number: str, message: str) -> bool:
+    """True if the message is a YES/NO answer to an offer this phone has outstanding."""
+    _refresh()
+    with _lock:
+        offered = phone_number.replace("whatsapp:", "") in _index.offers_by_phone
+    return offered and _reply_word(message) in YES_WORDS | NO_WORDS
+
+
+def handle_offer_reply(phone_number: str, message: str):
+    """
+    Answers YES/NO replies to an outstanding waitlist offer without a model
+    round trip. Returns the reply text, or None if the message isn't one.
+    """
+    phone_number = phone_number.replace("whatsapp:", "")
+    _refresh()
+    with _lock:
+        entry = _index.offers_by_phone.get(phone_number)
+    if entry is None:
+        return None
+
+    word = _reply_word(message)
+    slot_id = entry["offered_slot_id"]
+    if word in YES_WORDS:
+        result = bookings.confirm_appointment(slot_id, phone_number, entry.get("hold_token"))
+        if result.get("success"):
+            _set_status(entry, "FULFILLED")
+            with _lock:
+                _stats["accepted"] += 1
+            return f"You're booked for {slot_id}. Your confirmation is on its way."
+        _set_status(entry, "EXPIRED")
+        with _lock:
+            _stats["expired"] += 1
+        return "Sorry, that offer has expired. Let me know if you'd like to look at other times."
+
+    if word in NO_WORDS:
+        _set_status(entry, "DECLINED")
+        with _lock:
+            _stats["declined"] += 1
+        # Only our own offer hold: not one that lapsed and was re-held by someone else
+        bookings.release_hold(slot_id, entry.get("hold_token"), "waitlist_decline", reason="waitlist_declined")
+        return "No problem, we've released that time. You've been taken off the waitlist."
+    return None
+
+
+def snapshot() -> dict:
+    with _lock:
+        stats = dict(_stats)
+        stats["active_entries"] = _index.size()
+        stats["outstanding_offers"] = len(_index.offers_by_phone)
+    stats["pending_releases"] = _releases.qsize()
+    stats["avg_match_ms"] = round(stats.pop("match_ms_total") / stats["releases"], 3) if stats["releases"] else 0.0
+    return stats
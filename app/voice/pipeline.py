@@ -0,0 +1,191 @@
+import os
+import time
+import asyncio
+import base64
+from collections import deque, OrderedDict
+
+# Bounded buffers for the two audio legs of a call.
+# Inbound (Twilio -> Gemini) drops the oldest audio when Gemini stalls.
+# Outbound (Gemini -> Twilio) is paced to real time and re-synced from the
+# `mark` events Twilio echoes back once audio has actually played.
+
+INBOUND_MAX_BYTES = int(os.getenv("VOICE_INBOUND_MAX_BYTES", str(16000 * 2 * 5)))    # ~5s of 16kHz PCM
+OUTBOUND_MAX_BYTES = int(os.getenv("VOICE_OUTBOUND_MAX_BYTES", str(8000 * 30)))      # ~30s of 8kHz mu-law
+OUTBOUND_LEAD_MS = int(os.getenv("VOICE_OUTBOUND_LEAD_MS", "400"))                   # audio allowed ahead of playback
+OUTBOUND_CHUNK_BYTES = 800   # 100ms of 8kHz mu-law per media message
+MULAW_BYTES_PER_MS = 8
+
+# Process-wide totals across calls, reported on /metrics
+pipeline_totals = {
+    "calls": 0,
+    "inbound_dropped_bytes": 0,
+    "outbound_dropped_bytes": 0,
+    "outbound_sent_bytes": 0,
+    "clears": 0,
+}
+
+
+class InboundAudioQueue:
+    """
+    Byte-capped queue between the Twilio receive loop and send_to_gemini.
+    Over the cap the oldest audio chunks are dropped; control items
+    (sentinels such as FLUSH / None) are never dropped.
+    """
+
+    def __init__(self, max_bytes: int = INBOUND_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self._items = deque()
+        self._bytes = 0
+        self._ready = asyncio.Event()
+        self.dropped_bytes = 0
+        self.dropped_chunks = 0
+        self.peak_bytes = 0
+
+    def put_nowait(self, item):
+        self._items.append(item)
+        if isinstance(item, (bytes, bytearray)):
+            self._bytes += len(item)
+            while self._bytes > self.max_bytes and self._drop_oldest_audio():
+                pass
+            self.peak_bytes = max(self.peak_bytes, self._bytes)
+        self._ready.set()
+
+    def _drop_oldest_audio(self) -> bool:
+        for i, item in enumerate(self._items):
+            if isinstance(item, (bytes, bytearray)):
+                del self._items[i]
+                self._bytes -= len(item)
+                self.dropped_bytes += len(item)
+                self.dropped_chunks += 1
+                return True
+        return False
+
+    async def get(self):
+        while not self._items:
+            self._ready.clear()
+            await self._ready.wait()
+        item = self._items.popleft()
+        if isinstance(item, (bytes, bytearray)):
+            self._bytes -= len(item)
+        return item
+
+    def drain_audio(self) -> int:
+        """Discards queued audio (keeps control items); returns the number of chunks dropped."""
+        kept = deque(i for i in self._items if not isinstance(i, (bytes, bytearray)))
+        drained = len(self._items) - len(kept)
+        self._items = kept
+        self._bytes = 0
+        return drained
+
+    def stats(self) -> dict:
+        return {
+            "queued_bytes": self._bytes,
+            "peak_bytes": self.peak_bytes,
+            "dropped_bytes": self.dropped_bytes,
+            "dropped_chunks": self.dropped_chunks,
+        }
+
+
+class OutboundAudioPacer:
+    """
+    Buffers Gemini's converted mu-law audio and sends it to Twilio no more
+    than OUTBOUND_LEAD_MS ahead of real-time playback. Each media message is
+    followed by a `mark`; when Twilio echoes the mark back we know how much
+    has really played and re-anchor the playback clock.
+    """
+
+    def __init__(self, websocket, max_bytes: int = OUTBOUND_MAX_BYTES, lead_ms: int = OUTBOUND_LEAD_MS):
+        self.websocket = websocket
+        self.max_bytes = max_bytes
+        self.lead_ms = lead_ms
+        self.stream_sid = None
+        self._buffer = bytearray()
+        self._ready = asyncio.Event()
+        self._playback_done_at = time.monotonic()
+        self._sent_ms = 0.0
+        self._marks = OrderedDict()   # mark name -> cumulative ms sent when the mark was queued
+        self._mark_seq = 0
+        self.sent_bytes = 0
+        self.dropped_bytes = 0
+        self.clears = 0
+        self.peak_bytes = 0
+
+    def push(self, mulaw: bytes):
+        self._buffer.extend(mulaw)
+        overflow = len(self._buffer) - self.max_bytes
+        if overflow > 0:
+            del self._buffer[:overflow]
+            self.dropped_bytes += overflow
+        self.peak_bytes = max(self.peak_bytes, len(self._buffer))
+        self._ready.set()
+
+    def on_mark(self, name: str):
+        """Twilio finished playing everything up to this mark."""
+        played_ms = self._marks.get(name)
+        if played_ms is None:
+            return
+        while self._marks:
+            key, _ = self._marks.popitem(last=False)
+            if key == name:
+                break
+        self._playback_done_at = time.monotonic() + (self._sent_ms - played_ms) / 1000
+
+    async def clear(self):
+        """Barge-in: purge our own buffer as well as Twilio's."""
+        self._buffer.clear()
+        self._marks.clear()
+        self._playback_done_at = time.monotonic()
+        self.clears += 1
+        if self.stream_sid:
+            await self.websocket.send_json({"event": "clear", "streamSid": self.stream_sid})
+
+    async def run(self):
+        """Pacing loop; runs as its own task for the life of the call."""
+        while True:
+            while not self._buffer or not self.stream_sid:
+                self._ready.clear()
+                await self._ready.wait()
+
+            ahead_ms = (self._playback_done_at - time.monotonic()) * 1000
+            if ahead_ms > self.lead_ms:
+                await asyncio.sleep((ahead_ms - self.lead_ms) / 1000)
+                continue
+
+            chunk = bytes(self._buffer[:OUTBOUND_CHUNK_BYTES])
+            del self._buffer[:len(chunk)]
+            chunk_ms = len(chunk) / MULAW_BYTES_PER_MS
+
+            await self.websocket.send_json({
+                "event": "media",
+                "streamSid": self.stream_sid,
+                "media": {"payload": base64.b64encode(chunk).decode("utf-8")}
+            })
+            self._sent_ms += chunk_ms
+            self._mark_seq += 1
+            mark_name = f"m{self._mark_seq}"
+            self._marks[mark_name] = self._sent_ms
+            await self.websocket.send_json({
+                "event": "mark",
+                "streamSid": self.stream_sid,
+                "mark": {"name": mark_name}
+            })
+            self.sent_bytes += len(chunk)
+            self._playback_done_at = max(self._playback_done_at, time.monotonic()) + chunk_ms / 1000
+
+    def stats(self) -> dict:
+        return {
+            "buffered_bytes": len(self._buffer),
+            "peak_bytes": self.peak_bytes,
+            "sent_bytes": self.sent_bytes,
+            "dropped_bytes": self.dropped_bytes,
+            "pending_marks": len(self._marks),
+            "clears": self.clears,
+        }
+
+
+def record_call_totals(inbound: InboundAudioQueue, outbound: OutboundAudioPacer):
+    pipeline_totals["calls"] += 1
+    pipeline_totals["inbound_dropped_bytes"] += inbound.dropped_bytes
+    pipeline_totals["outbound_dropped_bytes"] += outbound.dropped_bytes
+    pipeline_totals["outbound_sent_bytes"] += outbound.sent_bytes
+    pipeline_totals["clears"] += outbound.clears
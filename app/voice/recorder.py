@@ -0,0 +1,140 @@
+import os
+import json
+import time
+import wave
+import threading
+from collections import deque
+
+# Per-call audio + tool-call capture for QA, kept off the real-time path.
+# The voice loop only appends to deques (atomic in CPython, no locks taken);
+# a writer thread drains them in bulk into segmented WAV files and a compact
+# JSON-lines event log.
+#
+# Layout: <CALL_RECORDING_DIR>/<streamSid>/{inbound,outbound}-0001.wav, events.jsonl
+
+RECORDING_DIR = os.getenv("CALL_RECORDING_DIR")   # unset = recording disabled
+SEGMENT_SECONDS = int(os.getenv("CALL_RECORDING_SEGMENT_SECONDS", "300"))
+FLUSH_INTERVAL = 0.5
+SAMPLE_RATE = 8000     # both tracks are stored as 8kHz 16-bit mono PCM
+WRITE_BUFFER = 1 << 16
+
+
+class _SegmentedWav:
+    """Writes one audio track as fixed-length WAV segments."""
+
+    def __init__(self, directory: str, track: str, segment_seconds: int):
+        self.directory = directory
+        self.track = track
+        self.segment_bytes = segment_seconds * SAMPLE_RATE * 2
+        self.index = 0
+        self.written = 0
+        self._file = None
+        self._wav = None
+
+    def _rotate(self):
+        self.close()
+        self.index += 1
+        path = os.path.join(self.directory, f"{self.track}-{self.index:04d}.wav")
+        self._file = open(path, "wb", buffering=WRITE_BUFFER)
+        self._wav = wave.open(self._file, "wb")
+        self._wav.setnchannels(1)
+        self._wav.setsampwidth(2)
+        self._wav.setframerate(SAMPLE_RATE)
+        self.written = 0
+
+    def write(self, pcm: bytes):
+        while pcm:
+            if self._wav is None or self.written >= self.segment_bytes:
+                self._rotate()
+            room = self.segment_bytes - self.written
+            part, pcm = pcm[:room], pcm[room:]
+            # writeframesraw skips the per-call header patch; close() fixes the header
+            self._wav.writeframesraw(part)
+            self.written += len(part)
+
+    def close(self):
+        if self._wav is not None:
+            self._wav.close()
+            self._file.close()
+            self._wav = None
+            self._file = None
+
+
+class CallRecorder:
+    """Side-channel recorder for one call. All public methods are safe to call from the event loop."""
+
+    def __init__(self, call_id: str, base_dir: str, segment_seconds: int = SEGMENT_SECONDS):
+        self.directory = os.path.join(base_dir, call_id)
+        os.makedirs(self.directory, exist_ok=True)
+        self.segment_seconds = segment_seconds
+        self._started = time.monotonic()
+        self._audio = deque()     # (track, pcm)
+        self._events = deque()    # already-serialized JSON lines
+        self._closing = False
+        # Opened here so an unwritable directory fails open(), not the writer thread
+        self._log = open(os.path.join(self.directory, "events.jsonl"), "a", buffering=WRITE_BUFFER)
+        self._thread = threading.Thread(target=self._run, name=f"recorder-{call_id}", daemon=True)
+        self._thread.start()
+        # Lets replays shift recorded dates/slot ids to the day they run
+        self.event("start", call_id=call_id, date=time.strftime("%Y-%m-%d"))
+
+    @classmethod
+    def open(cls, call_id: str):
+        """
+        Returns a recorder for the call, or None when recording is disabled or
+        can't start (e.g. the directory isn't writable): the call goes on unrecorded.
+        """
+        if not RECORDING_DIR or not call_id:
+            return None
+        try:
+            return cls(call_id, RECORDING_DIR)
+        except Exception as e:
+            print(f"❌ Call recording unavailable for {call_id}, continuing without it: {e}")
+            return None
+
+    def inbound(self, pcm_8k: bytes):
+        self._audio.append(("inbound", pcm_8k))
+
+    def outbound(self, pcm_8k: bytes):
+        self._audio.append(("outbound", pcm_8k))
+
+    def event(self, kind: str, **fields):
+        fields["t"] = round((time.monotonic() - self._started) * 1000)
+        fields["type"] = kind
+        self._events.append(json.dumps(fields, separators=(",", ":"), default=str))
+
+    def close(self):
+        """Stops the writer after it has drained everything still queued."""
+        self._closing = True
+        self._thread.join(timeout=5)
+
+    def _drain(self, tracks: dict, log):
+        pending = {}
+        while self._audio:
+            track, pcm = self._audio.popleft()
+            pending.setdefault(track, []).append(pcm)
+        for track, frames in pending.items():
+            if track not in tracks:
+                tracks[track] = _SegmentedWav(self.directory, track, self.segment_seconds)
+            tracks[track].write(b"".join(frames))
+
+        lines = []
+        while self._events:
+            lines.append(self._events.popleft())
+        if lines:
+            log.write("\n".join(lines) + "\n")
+            log.flush()
+
+    def _run(self):
+        tracks = {}
+        with self._log as log:
+            try:
+                while not self._closing:
+                    time.sleep(FLUSH_INTERVAL)
+                    self._drain(tracks, log)
+                self._drain(tracks, log)
+            except Exception as e:
+                print(f"❌ Call recorder failed: {e}")
+            finally:
+                for writer in tracks.values():
+                    writer.close()
@@ -0,0 +1,270 @@
+import os
+import json
+import time
+import random
+import threading
+import urllib.request
+from collections import deque
+from contextlib import contextmanager, nullcontext
+
+# Per-call latency traces for the voice stream, exported as OpenTelemetry
+# (OTLP/JSON) to a collector and/or a JSON-lines file.
+#
+# One trace per call (root span "voice_call", tagged with the Twilio
+# streamSid). Each caller turn is a "turn" span from end of speech to
+# turn_complete, with children for the inbound queue wait, sending the audio
+# tail to Gemini, speech end -> first model audio byte, every tool call and
+# Twilio's playback acknowledgement. Per-frame work (mu-law/PCM transcoding,
+# resampling, VAD) is too frequent for spans, so it is summed per turn into
+# attributes instead.
+#
+# Sampling: a call is traced with probability VOICE_TRACE_SAMPLE_RATE. With
+# VOICE_TRACE_SLOW_TURN_MS set, every call records cheaply in memory and is
+# exported anyway if one of its turns was that slow, so laggy calls are kept
+# at a low base rate. With neither set, calls get a no-op tracer.
+
+SAMPLE_RATE = float(os.getenv("VOICE_TRACE_SAMPLE_RATE", "0"))
+SLOW_TURN_MS = float(os.getenv("VOICE_TRACE_SLOW_TURN_MS", "0"))
+TRACE_FILE = os.getenv("VOICE_TRACE_FILE")                 # e.g. traces.jsonl
+OTLP_ENDPOINT = os.getenv("VOICE_TRACE_OTLP_ENDPOINT")     # e.g. http://localhost:4318/v1/traces
+SERVICE_NAME = os.getenv("OTEL_SERVICE_NAME", "ai-receptionist")
+EXPORT_INTERVAL = 1.0
+MAX_PENDING_TRACES = 1000
+
+_stats = {"calls": 0, "sampled": 0, "kept_slow": 0, "exported": 0, "export_errors": 0, "dropped": 0}
+
+
+def _attr(key: str, value) -> dict:
+    if isinstance(value, bool):
+        return {"key": key, "value": {"boolValue": value}}
+    if isinstance(value, int):
+        return {"key": key, "value": {"intValue": str(value)}}
+    if isinstance(value, float):
+        return {"key": key, "value": {"doubleValue": value}}
+    return {"key": key, "value": {"stringValue": str(value)}}
+
+
+class CallTrace:
+    """Spans for one call. Only touched from the call's event loop."""
+
+    def __init__(self, sampled: bool):
+        self.sampled = sampled
+        self.keep = sampled
+        self.trace_id = os.urandom(16).hex()
+        self.spans = []
+        self.call_start = time.time_ns()
+        self.root = self._open("voice_call", None, self.call_start)
+        self.turn = None
+        self.turns = 0
+        self._reset_turn_state()
+
+    def _reset_turn_state(self):
+        self._speech_end = None
+        self._flush_enqueued = None
+        self._first_audio = None
+        self._playback_acked = False
+        self._transcode_ns = {"inbound": 0, "outbound": 0, "vad": 0}
+        self._max_twilio_lag_ms = 0
+
+    def _open(self, name: str, parent, start_ns: int, attrs: dict = None) -> dict:
+        span = {
+            "spanId": os.urandom(8).hex(),
+            "parentSpanId": parent["spanId"] if parent else "",
+            "name": name,
+            "start": start_ns,
+            "end": None,
+            "attributes": dict(attrs or {}),
+        }
+        self.spans.append(span)
+        return span
+
+    def _record(self, name: str, start_ns: int, end_ns: int = None, attrs: dict = None):
+        span = self._open(name, self.turn or self.root, start_ns, attrs)
+        span["end"] = end_ns or time.time_ns()
+        return span
+
+    @contextmanager
+    def span(self, name: str, attrs: dict = None):
+        span = self._open(name, self.turn or self.root, time.time_ns(), attrs)
+        try:
+            yield span
+        finally:
+            span["end"] = time.time_ns()
+
+    def set_stream_sid(self, stream_sid: str):
+        self.root["attributes"]["twilio.stream_sid"] = stream_sid
+
+    def start_turn(self, kind: str = "caller"):
+        if self.turn is None:
+            self.turns += 1
+            self.turn = self._open("turn", self.root, time.time_ns(), {"turn.index": self.turns, "turn.kind": kind})
+
+    # --- inbound path ---
+    def twilio_media(self, media_timestamp_ms):
+        # Twilio stamps media with ms since stream start; arrival later than that is network/Twilio lag
+        if media_timestamp_ms is not None:
+            lag = (time.time_ns() - self.call_start) // 1_000_000 - int(media_timestamp_ms)
+            self._max_twilio_lag_ms = max(self._max_twilio_lag_ms, lag)
+
+    def transcode(self, stage: str, elapsed_ns: int):
+        self._transcode_ns[stage] += elapsed_ns
+
+    def speech_ended(self):
+        self.start_turn()
+        self._speech_end = self._flush_enqueued = time.time_ns()
+
+    def flush_dequeued(self):
+        if self._flush_enqueued is not None:
+            self._record("inbound_queue_wait", self._flush_enqueued)
+            self._flush_enqueued = None
+
+    # --- outbound path ---
+    def model_audio(self):
+        if self.turn is not None and self._first_audio is None:
+            self._first_audio = time.time_ns()
+            start = self._speech_end or self.turn["start"]
+            latency_ms = (self._first_audio - start) / 1e6
+            self._record("speech_end_to_first_audio", start, self._first_audio)
+            self.turn["attributes"]["latency.first_audio_ms"] = round(latency_ms, 1)
+            if SLOW_TURN_MS and latency_ms >= SLOW_TURN_MS:
+                self.keep = True
+
+    def playback_acked(self):
+        if self._first_audio is not None and not self._playback_acked:
+            self._playback_acked = True
+            self._record("twilio.playback_ack", self._first_audio)
+
+    def end_turn(self, interrupted: bool = False):
+        if self.turn is None:
+            return
+        attrs = self.turn["attributes"]
+        attrs["turn.interrupted"] = interrupted
+        attrs["transcode.inbound_ms"] = round(self._transcode_ns["inbound"] / 1e6, 2)
+        attrs["transcode.outbound_ms"] = round(self._transcode_ns["outbound"] / 1e6, 2)
+        attrs["vad_ms"] = round(self._transcode_ns["vad"] / 1e6, 2)
+        attrs["twilio.max_inbound_lag_ms"] = self._max_twilio_lag_ms
+        self.turn["end"] = time.time_ns()
+        self.turn = None
+        self._reset_turn_state()
+
+    def finish(self, attrs: dict = None):
+        self.end_turn()
+        self.root["end"] = time.time_ns()
+        self.root["attributes"].update(attrs or {})
+        self.root["attributes"]["call.turns"] = self.turns
+        for span in self.spans:
+            if span["end"] is None:
+                span["end"] = self.root["end"]
+        if self.keep:
+            if not self.sampled:
+                _stats["kept_slow"] += 1
+            exporter.submit(self)
+
+    def to_otlp_spans(self) -> list:
+        return [
+            {
+                "traceId": self.trace_id,
+                "spanId": s["spanId"],
+                "parentSpanId": s["parentSpanId"],
+                "name": s["name"],
+                "kind": 1,   # SPAN_KIND_INTERNAL
+                "startTimeUnixNano": str(s["start"]),
+                "endTimeUnixNano": str(s["end"]),
+                "attributes": [_attr(k, v) for k, v in s["attributes"].items()],
+            }
+            for s in self.spans
+        ]
+
+
+class _NoopTrace:
+    """Stand-in when tracing is off: every hook is a no-op (real methods, so per-frame calls stay cheap)."""
+    sampled = keep = False
+    _null = nullcontext()
+
+    def span(self, name, attrs=None):
+        return self._null
+
+    def set_stream_sid(self, stream_sid): pass
+    def start_turn(self, kind="caller"): pass
+    def twilio_media(self, media_timestamp_ms): pass
+    def transcode(self, stage, elapsed_ns): pass
+    def speech_ended(self): pass
+    def flush_dequeued(self): pass
+    def model_audio(self): pass
+    def playback_acked(self): pass
+    def end_turn(self, interrupted=False): pass
+    def finish(self, attrs=None): pass
+
+
+NOOP_TRACE = _NoopTrace()
+
+
+def start_call_trace():
+    _stats["calls"] += 1
+    sampled = SAMPLE_RATE > 0 and random.random() < SAMPLE_RATE
+    if not sampled and not SLOW_TURN_MS:
+        return NOOP_TRACE
+    if sampled:
+        _stats["sampled"] += 1
+    return CallTrace(sampled)
+
+
+class TraceExporter:
+    """Batches finished traces and writes them from a background thread."""
+
+    def __init__(self):
+        self._pending = deque()
+        self._wake = threading.Event()
+        self._thread = None
+
+    def submit(self, trace: CallTrace):
+        if not (TRACE_FILE or OTLP_ENDPOINT):
+            return
+        if len(self._pending) >= MAX_PENDING_TRACES:
+            _stats["dropped"] += 1
+            return
+        self._pending.append(trace)
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="trace-exporter", daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while True:
+            self._wake.wait(EXPORT_INTERVAL)
+            batch = []
+            while self._pending:
+                batch.append(self._pending.popleft())
+            if batch:
+                self.export(batch)
+
+    def export(self, traces: list):
+        request = {
+            "resourceSpans": [{
+                "resource": {"attributes": [_attr("service.name", SERVICE_NAME)]},
+                "scopeSpans": [{
+                    "scope": {"name": "app.voice.tracing"},
+                    "spans": [span for trace in traces for span in trace.to_otlp_spans()],
+                }],
+            }]
+        }
+        body = json.dumps(request, separators=(",", ":"))
+        try:
+            if TRACE_FILE:
+                with open(TRACE_FILE, "a") as f:
+                    f.write(body + "\n")
+            if OTLP_ENDPOINT:
+                http_request = urllib.request.Request(
+                    OTLP_ENDPOINT, data=body.encode(), headers={"Content-Type": "application/json"}, method="POST"
+                )
+                urllib.request.urlopen(http_request, timeout=5).close()
+            _stats["exported"] += len(traces)
+        except Exception as e:
+            _stats["export_errors"] += 1
+            print(f"ERROR: Failed to export {len(traces)} voice trace(s): {e}")
+
+
+exporter = TraceExporter()
+
+
+def tracing_stats() -> dict:
+    return dict(_stats, pending=len(exporter._pending))
@@ -0,0 +1,112 @@
+import os
+from collections import deque
+import numpy as np
+
+# Energy / zero-crossing voice activity detection for the Twilio -> Gemini leg.
+# Runs on Twilio's 8kHz PCM (20ms frames) before upsampling, so suppressed
+# silence is never resampled or sent upstream.
+
+FRAME_MS = 20
+HANGOVER_MS = int(os.getenv("VAD_HANGOVER_MS", "600"))   # trailing silence still forwarded so Gemini sees end-of-turn
+PREROLL_MS = int(os.getenv("VAD_PREROLL_MS", "200"))     # audio kept from before onset so first syllables aren't clipped
+SPEECH_SNR = float(os.getenv("VAD_SPEECH_SNR", "3.0"))   # frame RMS must exceed noise floor by this factor
+MIN_SPEECH_RMS = 150.0
+MAX_SPEECH_ZCR = 0.45     # fraction of sign changes per sample; hiss/static sits above this
+TARGET_RMS = 3000.0
+# Steady noise loud enough to pass as speech would never reach the non-speech
+# update below, so the floor also creeps toward a low percentile of recent
+# frames: pauses between words keep that percentile low during real speech.
+FLOOR_WINDOW_FRAMES = 500     # 10s of frame RMS values
+FLOOR_UPDATE_FRAMES = 50      # re-estimate once a second
+FLOOR_PERCENTILE = 10
+MIN_GAIN, MAX_GAIN = 1.0, 4.0
+
+
+class VoiceActivityDetector:
+    """
+    Stateful, per-call VAD with adaptive gain.
+
+    process() takes one 8kHz 16-bit PCM frame and returns (audio, end_of_speech):
+    audio is the gain-normalized PCM to forward (b"" while suppressing silence),
+    end_of_speech is True once the hangover after an utterance has elapsed and
+    the caller should flush whatever it has buffered.
+    """
+
+    def __init__(self):
+        self.noise_floor = 200.0
+        self.gain = 1.5
+        self.speaking = False
+        self.silence_ms = 0
+        self.preroll = deque(maxlen=max(1, PREROLL_MS // FRAME_MS))
+        self._recent_rms = deque(maxlen=FLOOR_WINDOW_FRAMES)
+        self._frames = 0
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.utterances = 0
+
+    def _is_voice(self, samples: np.ndarray, rms: float) -> bool:
+        if rms < max(self.noise_floor * SPEECH_SNR, MIN_SPEECH_RMS):
+            return False
+        signs = np.signbit(samples)
+        zcr = np.count_nonzero(signs[1:] != signs[:-1]) / max(1, len(samples) - 1)
+        return zcr < MAX_SPEECH_ZCR
+
+    def _amplify(self, samples: np.ndarray) -> bytes:
+        return np.clip(samples * self.gain, -32768, 32767).astype(np.int16).tobytes()
+
+    def process(self, pcm: bytes):
+        self.bytes_in += len(pcm)
+        samples = np.frombuffer(pcm, dtype=np.int16).astype(np.float32)
+        if samples.size == 0:
+            return b"", False
+        rms = float(np.sqrt(np.mean(samples * samples)))
+        self._recent_rms.append(rms)
+        self._frames += 1
+        if self._frames % FLOOR_UPDATE_FRAMES == 0 and len(self._recent_rms) >= 2 * FLOOR_UPDATE_FRAMES:
+            low = float(np.percentile(self._recent_rms, FLOOR_PERCENTILE))
+            if low > self.noise_floor:
+                self.noise_floor += 0.25 * (low - self.noise_floor)
+        voiced = self._is_voice(samples, rms)
+
+        if voiced:
+            # Adaptive gain: move slowly toward the gain that brings speech to TARGET_RMS
+            desired = min(MAX_GAIN, max(MIN_GAIN, TARGET_RMS / max(rms, 1.0)))
+            self.gain += 0.1 * (desired - self.gain)
+        else:
+            # Track background level from non-speech frames (see FLOOR_PERCENTILE for the rest)
+            self.noise_floor += 0.05 * (rms - self.noise_floor)
+            self.noise_floor = max(self.noise_floor, 1.0)
+
+        end_of_speech = False
+        if voiced:
+            if not self.speaking:
+                self.speaking = True
+                self.utterances += 1
+                out = b"".join(self._amplify(f) for f in self.preroll) + self._amplify(samples)
+                self.preroll.clear()
+            else:
+                out = self._amplify(samples)
+            self.silence_ms = 0
+        elif self.speaking:
+            self.silence_ms += FRAME_MS
+            out = self._amplify(samples)
+            if self.silence_ms >= HANGOVER_MS:
+                self.speaking = False
+                end_of_speech = True
+        else:
+            self.preroll.append(samples)
+            out = b""
+
+        self.bytes_out += len(out)
+        return out, end_of_speech
+
+    def stats(self) -> dict:
+        saved = 1 - self.bytes_out / self.bytes_in if self.bytes_in else 0.0
+        return {
+            "bytes_in": self.bytes_in,
+            "bytes_forwarded": self.bytes_out,
+            "suppressed_ratio": round(saved, 3),
+            "utterances": self.utterances,
+            "gain": round(self.gain, 2),
+            "noise_floor": round(self.noise_floor, 1),
+        }
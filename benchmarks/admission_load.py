@@ -0,0 +1,92 @@
+"""
+Overload test for SMS admission control. No database or API keys needed.
+
+Simulates an LLM backend that can only run --capacity turns at once (extra
+turns queue inside it, like a saturated model endpoint or CPU) and offers it
+--overload times the traffic it can serve for --seconds. Runs twice:
+  * unlimited: every text goes straight to the backend;
+  * admission: texts go through app.services.admission.sms_turn, whose
+    limit starts at --max-limit and adapts to measured latency.
+Reports p50/p99 end-to-end latency of texts that got a real answer, how
+many got the busy reply, and the final adaptive limit.
+
+Usage:
+    python -m benchmarks.admission_load [--capacity 8 --service-ms 100 --overload 2 --seconds 10]
+"""
+import time
+import random
+import asyncio
+import argparse
+from app.services import admission
+
+
+class SaturatedBackend:
+    def __init__(self, capacity: int, service_ms: float):
+        self.slots = asyncio.Semaphore(capacity)
+        self.service_ms = service_ms
+
+    async def agenerate(self, prompt: str) -> str:
+        async with self.slots:
+            await asyncio.sleep(self.service_ms * random.uniform(0.8, 1.2) / 1000)
+        return "ok"
+
+
+async def offer_load(handler, rate: float, seconds: float) -> list:
+    """Sends texts at a steady rate; returns (latency_s, reply) per text."""
+    results = []
+
+    async def one():
+        started = time.perf_counter()
+        reply = await handler()
+        results.append((time.perf_counter() - started, reply))
+
+    tasks = []
+    started = time.perf_counter()
+    for i in range(int(rate * seconds)):
+        delay = started + i / rate - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        tasks.append(asyncio.create_task(one()))
+    await asyncio.gather(*tasks)
+    return results
+
+
+def summarize(name: str, results: list):
+    served = sorted(latency for latency, reply in results if reply != admission.BUSY_REPLY)
+    shed = len(results) - len(served)
+    p50 = served[len(served) // 2] * 1000 if served else 0
+    p99 = served[int(len(served) * 0.99) - 1] * 1000 if served else 0
+    print(f"{name:<10} {len(results):>6} {len(served):>7} {shed:>6} {p50:>9.0f} {p99:>9.0f}")
+
+
+async def main_async(args):
+    backend = SaturatedBackend(args.capacity, args.service_ms)
+    rate = args.capacity * 1000 / args.service_ms * args.overload
+    print(f"Backend capacity {args.capacity * 1000 / args.service_ms:.0f} turns/s, offered {rate:.0f} texts/s for {args.seconds}s")
+    print(f"\n{'mode':<10} {'texts':>6} {'served':>7} {'shed':>6} {'p50 ms':>9} {'p99 ms':>9}")
+
+    unlimited = await offer_load(lambda: backend.agenerate("hi"), rate, args.seconds)
+    summarize("unlimited", unlimited)
+
+    admission.sms = admission.ChannelLimiter("sms", args.max_limit, target_ms=args.service_ms * 3)
+    admission.SMS_QUEUE_TIMEOUT_SECONDS = args.queue_timeout
+    limited = await offer_load(lambda: admission.sms_turn(backend, "hi"), rate, args.seconds)
+    summarize("admission", limited)
+    stats = admission.sms.snapshot()
+    print(f"\nAdaptive limit: {args.max_limit} -> {stats['limit']} "
+          f"({stats['limit_decreases']} decreases, {stats['limit_increases']} increases)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--capacity", type=int, default=8, help="turns the backend runs at once")
+    parser.add_argument("--service-ms", type=float, default=100)
+    parser.add_argument("--overload", type=float, default=2.0, help="offered load / backend capacity")
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--max-limit", type=int, default=32, help="configured SMS_MAX_CONCURRENT_TURNS")
+    parser.add_argument("--queue-timeout", type=float, default=0.5, help="SMS_QUEUE_TIMEOUT_SECONDS for the run")
+    asyncio.run(main_async(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+"""
+DynamoDB client throughput at high concurrency: botocore defaults vs the
+tuned client from app.db.
+
+Seeds --slots test slots in 2099, then for each concurrency level runs
+--ops operations (80% consistent GetItem, 20% conditional UpdateItem, like
+the hold/confirm path) from that many threads, with:
+  * a client with botocore defaults (10 pooled connections, legacy retries);
+  * make_client() (sized pool, adaptive retries, timeouts, keepalive).
+Reports ops/s, p50/p99 latency and how many connections urllib3 had to
+discard because the pool was full. Also times decoding a day of slots
+through the resource layer vs the low-level client + plain_item().
+
+Runs against DynamoDB Local only.
+
+Usage:
+    DYNAMODB_ENDPOINT_URL=http://localhost:8000 python -m benchmarks.dynamodb_pool [--concurrency 10 50 100]
+"""
+import sys
+import time
+import random
+import logging
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+
+from app.db import session, endpoint_url, make_client, plain_item, slots_table, dynamodb_client
+from setup_slots import create_receptionist_tables
+
+DAY = "2099-03-01"
+
+
+class PoolFullCounter(logging.Handler):
+    """Counts urllib3's 'Connection pool is full, discarding connection' warnings."""
+
+    def __init__(self):
+        super().__init__(logging.WARNING)
+        self.count = 0
+
+    def emit(self, record):
+        if "pool is full" in record.getMessage():
+            self.count += 1
+
+
+def slot_ids(count: int) -> list:
+    # One slot per minute, starting on DAY
+    return [f"2099-03-{1 + i // 1440:02d}-{i % 1440 // 60:02d}:{i % 60:02d}" for i in range(count)]
+
+
+def seed(ids: list):
+    with slots_table.batch_writer(overwrite_by_pkeys=["slot_id"]) as batch:
+        for sid in ids:
+            batch.put_item(Item={"slot_id": sid, "date": sid[:10], "start_time": sid[-5:], "status": "AVAILABLE",
+                                 "is_available": True, "version": 0})
+
+
+def cleanup(ids: list):
+    with slots_table.batch_writer() as batch:
+        for sid in ids:
+            batch.delete_item(Key={"slot_id": sid})
+
+
+def operation(client, ids: list) -> float:
+    sid = random.choice(ids)
+    started = time.perf_counter()
+    if random.random() < 0.8:
+        client.get_item(TableName=slots_table.name, Key={"slot_id": {"S": sid}}, ConsistentRead=True)
+    else:
+        client.update_item(
+            TableName=slots_table.name,
+            Key={"slot_id": {"S": sid}},
+            UpdateExpression="SET version = version + :one",
+            ConditionExpression="attribute_exists(slot_id)",
+            ExpressionAttributeValues={":one": {"N": "1"}}
+        )
+    return time.perf_counter() - started
+
+
+def run(client, ids: list, concurrency: int, ops: int) -> dict:
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        # Warm up: open connections before timing
+        list(pool.map(lambda _: operation(client, ids), range(concurrency)))
+        started = time.perf_counter()
+        latencies = sorted(pool.map(lambda _: operation(client, ids), range(ops)))
+        elapsed = time.perf_counter() - started
+    return {
+        "ops_per_s": ops / elapsed,
+        "p50_ms": latencies[len(latencies) // 2] * 1000,
+        "p99_ms": latencies[int(len(latencies) * 0.99) - 1] * 1000,
+    }
+
+
+def decode_comparison(repeat: int = 20) -> tuple:
+    kwargs = {"FilterExpression": "#d = :date", "ExpressionAttributeNames": {"#d": "date"}}
+    started = time.perf_counter()
+    for _ in range(repeat):
+        slots_table.scan(ExpressionAttributeValues={":date": DAY}, **kwargs)
+    resource_ms = (time.perf_counter() - started) * 1000 / repeat
+    started = time.perf_counter()
+    for _ in range(repeat):
+        response = dynamodb_client.scan(TableName=slots_table.name, ExpressionAttributeValues={":date": {"S": DAY}}, **kwargs)
+        [plain_item(item) for item in response.get("Items", [])]
+    client_ms = (time.perf_counter() - started) * 1000 / repeat
+    return resource_ms, client_ms
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--slots", type=int, default=2000)
+    parser.add_argument("--ops", type=int, default=5000, help="operations per run")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[10, 50, 100])
+    args = parser.parse_args()
+
+    if not endpoint_url:
+        sys.exit("Refusing to benchmark against a real AWS table: set DYNAMODB_ENDPOINT_URL to DynamoDB Local.")
+    create_receptionist_tables()
+
+    ids = slot_ids(args.slots)
+    print(f"Seeding {len(ids)} slots...")
+    seed(ids)
+    pool_full = PoolFullCounter()
+    logging.getLogger("urllib3.connectionpool").addHandler(pool_full)
+
+    clients = {
+        "botocore defaults": session.client("dynamodb", endpoint_url=endpoint_url),
+        "app.db make_client": make_client(),
+    }
+    try:
+        print(f"\n{'client':<20} {'threads':>7} {'ops/s':>9} {'p50 ms':>8} {'p99 ms':>8} {'pool full':>10}")
+        for concurrency in args.concurrency:
+            for name, client in clients.items():
+                pool_full.count = 0
+                result = run(client, ids, concurrency, args.ops)
+                print(f"{name:<20} {concurrency:>7} {result['ops_per_s']:>9.0f} {result['p50_ms']:>8.1f} "
+                      f"{result['p99_ms']:>8.1f} {pool_full.count:>10}")
+
+        resource_ms, client_ms = decode_comparison()
+        print(f"\nScan of one day ({min(len(ids), 1440)} slots): resource layer {resource_ms:.1f} ms, "
+              f"low-level client + plain_item {client_ms:.1f} ms")
+    finally:
+        cleanup(ids)
+
+
+if __name__ == "__main__":
+    main()
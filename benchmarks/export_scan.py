@@ -0,0 +1,107 @@
+"""
+Parallel segmented export throughput and resume correctness.
+
+Creates a throwaway table (ExportBench) with --rows rows shaped like
+Appointments, then:
+  * exports it with export_data.export_table at each --segments value and
+    reports rows/s and consumed RCU;
+  * interrupts an export part way through (the same stop event Ctrl-C sets),
+    resumes it, and checks the files hold every row exactly once.
+The table is deleted afterwards. The RCU budget is lifted for the
+throughput runs (--rcu to cap them like production).
+
+Runs against DynamoDB Local only.
+
+Usage:
+    DYNAMODB_ENDPOINT_URL=http://localhost:8000 python -m benchmarks.export_scan [--rows 50000] [--segments 1 4 8 16]
+"""
+import os
+import sys
+import glob
+import gzip
+import json
+import shutil
+import tempfile
+import argparse
+import threading
+
+from app.db import endpoint_url, dynamodb, dynamodb_client
+from export_data import export_table
+
+TABLE = "ExportBench"
+
+
+def create_table(rows: int):
+    if TABLE in dynamodb_client.list_tables()["TableNames"]:
+        dynamodb_client.delete_table(TableName=TABLE)
+        dynamodb_client.get_waiter("table_not_exists").wait(TableName=TABLE)
+    dynamodb.create_table(
+        TableName=TABLE,
+        KeySchema=[{"AttributeName": "appointment_id", "KeyType": "HASH"}],
+        AttributeDefinitions=[{"AttributeName": "appointment_id", "AttributeType": "S"}],
+        BillingMode="PAY_PER_REQUEST",
+    ).wait_until_exists()
+    with dynamodb.Table(TABLE).batch_writer() as batch:
+        for i in range(rows):
+            batch.put_item(Item={
+                "appointment_id": f"appt-{i:07d}",
+                "phone_number": f"+1555{i % 10000000:07d}",
+                "slot_id": f"2099-03-{1 + i % 28:02d}-{9 + i % 8:02d}:00",
+                "status": "CONFIRMED" if i % 5 else "CANCELLED",
+                "created_at": 4070908800 + i,
+            })
+
+
+def exported_ids(out: str) -> list:
+    ids = []
+    for path in sorted(glob.glob(os.path.join(out, TABLE, "segment-*.jsonl.gz"))):
+        with gzip.open(path, "rt") as f:
+            ids.extend(json.loads(line)["appointment_id"] for line in f)
+    return ids
+
+
+def resume_check(rows: int, segments: int) -> str:
+    out = tempfile.mkdtemp(prefix="export-bench-")
+    try:
+        stop = threading.Event()
+        threading.Timer(0.5, stop.set).start()
+        first = export_table(TABLE, out, segments=segments, rcu_per_second=1e9, page_size=200, stop=stop)
+        second = export_table(TABLE, out, segments=segments, rcu_per_second=1e9, page_size=200, resume=True)
+        ids = exported_ids(out)
+        ok = second["complete"] and len(ids) == rows and len(set(ids)) == rows
+        return (f"interrupted after {first['rows']} rows, resumed for {second['rows_this_run']}: "
+                f"{len(ids)} rows on disk, {len(ids) - len(set(ids))} duplicates -> {'OK' if ok else 'FAILED'}")
+    finally:
+        shutil.rmtree(out, ignore_errors=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rows", type=int, default=50000)
+    parser.add_argument("--segments", type=int, nargs="+", default=[1, 4, 8, 16])
+    parser.add_argument("--rcu", type=float, default=1e9, help="RCU/s budget for the throughput runs")
+    args = parser.parse_args()
+
+    if not endpoint_url:
+        sys.exit("Refusing to benchmark against a real AWS table: set DYNAMODB_ENDPOINT_URL to DynamoDB Local.")
+
+    print(f"Seeding {args.rows} rows into {TABLE}...")
+    create_table(args.rows)
+    try:
+        print(f"\n{'segments':>8} {'rows':>8} {'seconds':>8} {'rows/s':>9} {'RCU':>9}")
+        for segments in args.segments:
+            out = tempfile.mkdtemp(prefix="export-bench-")
+            try:
+                summary = export_table(TABLE, out, segments=segments, rcu_per_second=args.rcu)
+            finally:
+                shutil.rmtree(out, ignore_errors=True)
+            print(f"{segments:>8} {summary['rows']:>8} {summary['seconds']:>8.2f} "
+                  f"{summary['rows_per_second']:>9.0f} {summary['consumed_rcu']:>9.1f}")
+
+        print(f"\nResume: {resume_check(args.rows, max(args.segments))}")
+    finally:
+        dynamodb_client.delete_table(TableName=TABLE)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+"""
+Measures the CPU cost of CallRecorder relative to call duration.
+
+Feeds a synthetic call (20ms inbound frames from Twilio, 100ms outbound
+chunks from Gemini, a tool call every few seconds) through the recorder as
+fast as possible, then reports recorder CPU time as a share of the audio's
+real-time length. The target is < 1% of one core per call.
+
+Usage:
+    python -m benchmarks.recorder_overhead [--seconds 600]
+"""
+import os
+import time
+import random
+import argparse
+import tempfile
+from app.voice.recorder import CallRecorder
+
+
+def run(call_seconds: int):
+    inbound_frame = bytes(random.getrandbits(8) for _ in range(320))     # 20ms @ 8kHz, 16-bit
+    outbound_chunk = bytes(random.getrandbits(8) for _ in range(1600))   # 100ms @ 8kHz, 16-bit
+
+    with tempfile.TemporaryDirectory() as tmp:
+        cpu_start = time.process_time()
+        wall_start = time.perf_counter()
+
+        recorder = CallRecorder("bench-call", tmp, segment_seconds=60)
+        for i in range(call_seconds * 50):
+            recorder.inbound(inbound_frame)
+            if i % 5 == 0:
+                recorder.outbound(outbound_chunk)
+            if i % 250 == 0:
+                recorder.event("tool_call", name="get_available_slots", args={"date": "2026-01-22"})
+                recorder.event("tool_result", name="get_available_slots", result=[{"slot_id": "2026-01-22-10:00"}])
+        enqueue_wall = time.perf_counter() - wall_start
+        recorder.close()
+
+        cpu = time.process_time() - cpu_start
+        files = os.listdir(recorder.directory)
+        size = sum(os.path.getsize(os.path.join(recorder.directory, f)) for f in files)
+
+    print(f"Simulated call length : {call_seconds}s")
+    print(f"Hot-path enqueue time : {enqueue_wall * 1000:.1f} ms total "
+          f"({enqueue_wall / (call_seconds * 50) * 1e6:.2f} µs per frame)")
+    print(f"Recorder CPU time     : {cpu * 1000:.1f} ms")
+    print(f"CPU share per call    : {cpu / call_seconds * 100:.3f}% of one core")
+    print(f"Files written         : {len(files)} ({size / 1e6:.1f} MB)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--seconds", type=int, default=600)
+    run(parser.parse_args().seconds)
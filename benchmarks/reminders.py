@@ -0,0 +1,107 @@
+"""
+Cost of a reminder scheduler tick at tens of thousands of daily appointments.
+
+Indexes --appointments synthetic bookings spread over the next 24 hours (and
+writes the matching Appointments rows), then compares:
+  * one scheduler tick: Queries only the due hour buckets and sends through
+    the rate limiter (Twilio in dry-run mode);
+  * the scan a naive job would need: a full Appointments scan per tick.
+
+Runs against DynamoDB Local only.
+
+Usage:
+    DYNAMODB_ENDPOINT_URL=http://localhost:8000 python -m benchmarks.reminders [--appointments 30000]
+"""
+import os
+import sys
+import time
+import asyncio
+import argparse
+from datetime import datetime, timedelta
+
+os.environ.setdefault("NOTIFICATIONS_DRY_RUN", "true")
+
+from app.db import dynamodb, appointments_table, reminders_table
+from app.background.reminders import index_item, send_due_reminders, bucket_for, slot_start
+from app.services.rate_limit import TokenBucket
+from setup_slots import create_receptionist_tables
+
+
+class CallCounter:
+    def __init__(self):
+        self.calls = {}
+        dynamodb.meta.client.meta.events.register("before-call.dynamodb", self._on_call)
+
+    def _on_call(self, model, **kwargs):
+        self.calls[model.name] = self.calls.get(model.name, 0) + 1
+
+    def reset(self):
+        self.calls = {}
+
+
+def bookings(count: int, now: datetime):
+    for i in range(count):
+        start = (now + timedelta(hours=1 + i * 23 // count)).replace(minute=0)
+        yield f"bench-{i}", start.strftime("%Y-%m-%d-%H:%M"), f"+1555{i:07d}"
+
+
+def seed(count: int, now: datetime):
+    with appointments_table.batch_writer() as appointments, reminders_table.batch_writer() as index:
+        for appointment_id, slot_id, phone in bookings(count, now):
+            appointments.put_item(Item={"appointment_id": appointment_id, "slot_id": slot_id,
+                                        "phone_number": phone, "status": "CONFIRMED"})
+            # Same item the APPOINTMENT_CONFIRMED subscriber writes
+            index.put_item(Item=index_item(appointment_id, slot_id, phone))
+
+
+def cleanup(count: int, now: datetime):
+    with appointments_table.batch_writer() as appointments, reminders_table.batch_writer() as index:
+        for appointment_id, slot_id, _ in bookings(count, now):
+            appointments.delete_item(Key={"appointment_id": appointment_id})
+            index.delete_item(Key={"bucket": bucket_for(slot_start(slot_id)), "appointment_id": appointment_id})
+
+
+def full_scan() -> int:
+    count, kwargs = 0, {}
+    while True:
+        response = appointments_table.scan(**kwargs)
+        count += len(response.get("Items", []))
+        if "LastEvaluatedKey" not in response:
+            return count
+        kwargs["ExclusiveStartKey"] = response["LastEvaluatedKey"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--appointments", type=int, default=30000)
+    parser.add_argument("--sends-per-second", type=float, default=1000, help="rate limit for the benchmark tick")
+    args = parser.parse_args()
+
+    if not os.getenv("DYNAMODB_ENDPOINT_URL"):
+        sys.exit("Refusing to benchmark against a real AWS table: set DYNAMODB_ENDPOINT_URL to DynamoDB Local.")
+    create_receptionist_tables()
+
+    now = datetime.now().replace(second=0, microsecond=0)
+    print(f"Seeding {args.appointments} appointments over the next 24h...")
+    seed(args.appointments, now)
+    counter = CallCounter()
+
+    counter.reset()
+    started = time.perf_counter()
+    tick = asyncio.run(send_due_reminders(TokenBucket(args.sends_per_second), now))
+    tick_seconds = time.perf_counter() - started
+    tick_calls = dict(counter.calls)
+
+    counter.reset()
+    started = time.perf_counter()
+    scanned = full_scan()
+    scan_seconds = time.perf_counter() - started
+
+    print(f"\nScheduler tick   : {tick_seconds:.2f}s, {tick}")
+    print(f"  DynamoDB calls : {tick_calls}")
+    print(f"Full scan        : {scan_seconds:.2f}s, {scanned} items read, {counter.calls.get('Scan', 0)} Scan pages")
+    cleanup(args.appointments, now)
+
+
+if __name__ == "__main__":
+    main()
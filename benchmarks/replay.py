@@ -0,0 +1,349 @@
+"""
+Replay recorded conversations and report round-trip efficiency.
+
+Inputs (any mix):
+  * SMS conversations as JSON (see benchmarks/conversations/*.json):
+        {"name": ..., "channel": "sms", "recorded_on": "YYYY-MM-DD", "phone": "+1...",
+         "turns": [{"user": "...", "tool_calls": [{"name": ..., "args": {...}, "result": ...}]}]}
+  * Voice call recordings: a CALL_RECORDING_DIR/<streamSid> directory (or its
+    events.jsonl) written by app/voice/recorder.py.
+
+Modes:
+  --llm recorded (default) re-executes every turn's recorded tool calls
+                 against the real booking functions, through the idempotency
+                 cache. Deterministic, so it is the mode to gate on with
+                 --baseline: it measures the backend cost of the tool
+                 implementations.
+  --llm stub     every SMS user message goes through MockService's
+                 rule-based planner and the production tool loop
+                 (agenerate -> ToolExecutor -> idempotency cache -> booking
+                 functions). A smoke test of the loop: the planner only knows
+                 a few phrasings, so routing mismatches against the recorded
+                 tools mostly measure the planner, not the loop. Voice
+                 recordings carry no user text, so their recorded tool calls
+                 are re-executed instead.
+  --llm live     SMS only: the same path with GeminiService, so prompt changes
+                 show up as different tool-call counts and routing.
+
+Always runs against DynamoDB Local (DYNAMODB_ENDPOINT_URL) with Twilio sends
+in dry-run mode. Recorded dates are shifted to today so slot ids line up with
+freshly seeded inventory; appointment ids returned live replace the recorded
+ones in later calls.
+
+Usage:
+    DYNAMODB_ENDPOINT_URL=http://localhost:8000 python -m benchmarks.replay \\
+        benchmarks/conversations --json replay.json [--baseline previous.json]
+"""
+import os
+import re
+import sys
+import json
+import time
+import asyncio
+import argparse
+from datetime import date, datetime
+
+os.environ.setdefault("NOTIFICATIONS_DRY_RUN", "true")
+
+from boto3.dynamodb.conditions import Attr
+from app.db import dynamodb, slots_table, appointments_table
+from app.services import bookings
+from app.services.slots import cleanup_and_seed_slots
+from app.services.tools import FUNCTIONS
+from app.services.idempotency import tool_cache, current_conversation, current_turn_tools
+from setup_slots import create_receptionist_tables
+
+DATE_RE = re.compile(r"\d{4}-\d{2}-\d{2}")
+# Result fields whose recorded values must be swapped for the live ones in later calls
+LIVE_ID_FIELDS = ("appointment_id", "hold_token")
+
+
+class BackendCounter:
+    """Counts DynamoDB API calls and outbound SMS sends."""
+
+    def __init__(self):
+        self.dynamodb = 0
+        self.sms = 0
+        self.by_operation = {}
+        dynamodb.meta.client.meta.events.register("before-call.dynamodb", self._on_call)
+        original_send = bookings.send_sms_notification
+
+        def counting_send(phone_number, message):
+            self.sms += 1
+            return original_send(phone_number, message)
+        bookings.send_sms_notification = counting_send
+
+    def _on_call(self, event_name=None, **kwargs):
+        op = event_name.rsplit(".", 1)[-1]
+        self.by_operation[op] = self.by_operation.get(op, 0) + 1
+        self.dynamodb += 1
+
+    def total(self) -> int:
+        return self.dynamodb + self.sms
+
+
+def load_conversations(paths):
+    conversations = []
+    for path in paths:
+        if os.path.isdir(path) and os.path.exists(os.path.join(path, "events.jsonl")):
+            conversations.append(load_voice_trace(os.path.join(path, "events.jsonl")))
+        elif os.path.isdir(path):
+            for name in sorted(os.listdir(path)):
+                conversations.extend(load_conversations([os.path.join(path, name)]))
+        elif path.endswith("events.jsonl"):
+            conversations.append(load_voice_trace(path))
+        elif path.endswith(".json"):
+            with open(path) as f:
+                conversations.append(json.load(f))
+    return conversations
+
+
+def load_voice_trace(path: str) -> dict:
+    """Turns a recorder events.jsonl into turns of tool calls split on turn_complete."""
+    turns, current, recorded_on = [], [], None
+    call_id = os.path.basename(os.path.dirname(path))
+    with open(path) as f:
+        for line in f:
+            event = json.loads(line)
+            kind = event.get("type")
+            if kind == "start":
+                recorded_on = event.get("date")
+                call_id = event.get("call_id", call_id)
+            elif kind == "tool_call":
+                current.append({"name": event["name"], "args": event.get("args") or {}})
+            elif kind == "tool_result" and current and current[-1]["name"] == event["name"]:
+                current[-1]["result"] = event.get("result")
+            elif kind == "turn_complete":
+                turns.append({"tool_calls": current})
+                current = []
+    if current:
+        turns.append({"tool_calls": current})
+    return {"name": f"voice-{call_id}", "channel": "voice", "recorded_on": recorded_on, "turns": turns}
+
+
+def shift_dates(value, days: int):
+    if not days:
+        return value
+    if isinstance(value, str):
+        def _shift(match):
+            shifted = date.fromordinal(date.fromisoformat(match.group(0)).toordinal() + days)
+            return shifted.isoformat()
+        return DATE_RE.sub(_shift, value)
+    if isinstance(value, dict):
+        return {k: shift_dates(v, days) for k, v in value.items()}
+    if isinstance(value, list):
+        return [shift_dates(v, days) for v in value]
+    return value
+
+
+def reset_tables():
+    """Empties the local Slots/Appointments tables so every run starts from the same state."""
+    create_receptionist_tables()
+    for table, key in ((slots_table, "slot_id"), (appointments_table, "appointment_id")):
+        scan_kwargs = {"ProjectionExpression": key}
+        with table.batch_writer() as batch:
+            while True:
+                page = table.scan(**scan_kwargs)
+                for item in page.get("Items", []):
+                    batch.delete_item(Key={key: item[key]})
+                if "LastEvaluatedKey" not in page:
+                    break
+                scan_kwargs["ExclusiveStartKey"] = page["LastEvaluatedKey"]
+
+
+def replay_recorded(conversation: dict, counter: BackendCounter) -> list:
+    """Re-executes each recorded tool call; returns per-turn measurements."""
+    recorded_on = conversation.get("recorded_on")
+    days = (date.today() - date.fromisoformat(recorded_on)).days if recorded_on else 0
+    conversation_id = f"replay-{conversation['name']}"
+    live_ids = {}      # recorded value -> live value
+    last_live = {}     # field -> most recent live value
+    booked = set()     # live appointment ids, so de-duplicated confirms aren't counted twice
+    turns = []
+
+    for turn in conversation["turns"]:
+        before_rt, before_hits = counter.total(), tool_cache.snapshot()["hits"]
+        bookings_made = 0
+        started = time.perf_counter()
+
+        for call in turn.get("tool_calls", []):
+            args = dict(shift_dates(call.get("args") or {}, days))
+            for field in LIVE_ID_FIELDS:
+                if field in args:
+                    args[field] = live_ids.get(args[field], last_live.get(field, args[field]))
+            func = FUNCTIONS.get(call["name"])
+            if func is None:
+                continue
+            result = tool_cache.call(conversation_id, call["name"], func, args)
+
+            if isinstance(result, dict):
+                recorded = call.get("result") if isinstance(call.get("result"), dict) else {}
+                for field in LIVE_ID_FIELDS:
+                    if result.get(field):
+                        last_live[field] = result[field]
+                        if recorded.get(field):
+                            live_ids[recorded[field]] = result[field]
+                if call["name"] == "confirm_appointment" and result.get("success") \
+                        and result.get("appointment_id") not in booked:
+                    booked.add(result.get("appointment_id"))
+                    bookings_made += 1
+
+        turns.append({
+            "tool_calls": len(turn.get("tool_calls", [])),
+            "round_trips": counter.total() - before_rt,
+            "dedup_hits": tool_cache.snapshot()["hits"] - before_hits,
+            "routing_mismatches": 0,
+            "bookings": bookings_made,
+            "wall_ms": (time.perf_counter() - started) * 1000,
+        })
+    return turns
+
+
+def count_appointments(phone: str) -> int:
+    response = appointments_table.scan(Select="COUNT", FilterExpression=Attr("phone_number").eq(phone))
+    return response.get("Count", 0)
+
+
+async def replay_llm(conversation: dict, counter: BackendCounter, llm) -> list:
+    """Sends each recorded user message through llm.agenerate(), as the SMS worker does."""
+    phone = conversation.get("phone", "+15550100")
+    turns = []
+    llm.reset_conversation(phone)
+    current_conversation.set(phone)
+    for turn in conversation["turns"]:
+        if "user" not in turn:
+            continue
+        # Counted outside the measured window so the check itself isn't billed to the turn
+        appointments_before = count_appointments(phone)
+        before_rt = counter.total()
+        before = tool_cache.snapshot()
+        tools_used = []
+        token = current_turn_tools.set(tools_used)
+        started = time.perf_counter()
+        try:
+            await llm.agenerate(f"[User Phone: {phone}] {turn['user']}")
+        finally:
+            current_turn_tools.reset(token)
+
+        wall_ms = (time.perf_counter() - started) * 1000
+        after = tool_cache.snapshot()
+        recorded = {call["name"] for call in turn.get("tool_calls", [])}
+        turns.append({
+            "tool_calls": after["calls"] - before["calls"],
+            "round_trips": counter.total() - before_rt,
+            "dedup_hits": after["hits"] - before["hits"],
+            "routing_mismatches": int(set(tools_used) != recorded),
+            "bookings": max(0, count_appointments(phone) - appointments_before),
+            "wall_ms": wall_ms,
+        })
+    return turns
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+def summarize(turns: list) -> dict:
+    tool_calls = sum(t["tool_calls"] for t in turns)
+    bookings_made = sum(t["bookings"] for t in turns)
+    walls = [t["wall_ms"] for t in turns]
+    return {
+        "turns": len(turns),
+        "tool_calls": tool_calls,
+        "bookings": bookings_made,
+        "tool_calls_per_booking": round(tool_calls / bookings_made, 2) if bookings_made else None,
+        "round_trips": sum(t["round_trips"] for t in turns),
+        "round_trips_per_turn": round(sum(t["round_trips"] for t in turns) / len(turns), 2) if turns else 0,
+        "dedup_hits": sum(t["dedup_hits"] for t in turns),
+        "routing_mismatches": sum(t["routing_mismatches"] for t in turns),
+        "wall_ms_p50": round(percentile(walls, 50), 1),
+        "wall_ms_p95": round(percentile(walls, 95), 1),
+        "wall_ms_max": round(max(walls), 1) if walls else 0.0,
+    }
+
+
+def compare(report: dict, baseline: dict, tolerance: float) -> list:
+    """Returns human-readable regressions vs. a previous --json report."""
+    regressions = []
+    if baseline.get("mode") != report.get("mode"):
+        return [f"mode: baseline ran --llm {baseline.get('mode')}, this run --llm {report.get('mode')}"]
+    for key in ("tool_calls_per_booking", "round_trips_per_turn", "wall_ms_p95"):
+        old, new = baseline["total"].get(key), report["total"].get(key)
+        if old and new and new > old * (1 + tolerance):
+            regressions.append(f"{key}: {old} -> {new} (+{(new / old - 1) * 100:.0f}%)")
+    # Same planner and fixtures, so any new mismatch is a routing change
+    old, new = baseline["total"].get("routing_mismatches"), report["total"].get("routing_mismatches")
+    if old is not None and new is not None and new > old:
+        regressions.append(f"routing_mismatches: {old} -> {new}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("paths", nargs="+")
+    parser.add_argument("--llm", choices=["recorded", "stub", "live"], default="recorded")
+    parser.add_argument("--json", help="write the report to this file")
+    parser.add_argument("--baseline", help="previous --json report to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.10, help="allowed regression ratio (default 0.10)")
+    parser.add_argument("--no-reset", action="store_true", help="keep existing local table contents")
+    args = parser.parse_args()
+
+    if not os.getenv("DYNAMODB_ENDPOINT_URL"):
+        sys.exit("Refusing to replay against a real AWS table: set DYNAMODB_ENDPOINT_URL to DynamoDB Local.")
+
+    if not args.no_reset:
+        reset_tables()
+        cleanup_and_seed_slots(date.today().isoformat())
+
+    counter = BackendCounter()
+    llm = None
+    if args.llm == "live":
+        from app.services.gemini_service import GeminiService
+        llm = GeminiService()
+    elif args.llm == "stub":
+        from app.services.mock_service import MockService
+        llm = MockService()
+    # One loop for the whole run, so the provider's async client isn't tied to a closed loop
+    loop = asyncio.new_event_loop()
+
+    report = {"generated_at": datetime.now().isoformat(), "mode": args.llm, "conversations": {}}
+    all_turns = []
+    for conversation in load_conversations(args.paths):
+        if llm is not None and conversation.get("channel") == "sms":
+            turns = loop.run_until_complete(replay_llm(conversation, counter, llm))
+        elif args.llm == "live":
+            print(f"Skipping {conversation['name']}: live mode replays SMS text only")
+            continue
+        else:
+            turns = replay_recorded(conversation, counter)
+        report["conversations"][conversation["name"]] = summarize(turns)
+        all_turns.extend(turns)
+    loop.close()
+
+    report["total"] = summarize(all_turns)
+    report["dynamodb_operations"] = counter.by_operation
+
+    print(f"{'conversation':<36}{'turns':>6}{'tools':>7}{'tools/bk':>10}{'rt/turn':>9}{'routing':>9}{'p50 ms':>9}{'p95 ms':>9}")
+    for name, s in list(report["conversations"].items()) + [("TOTAL", report["total"])]:
+        print(f"{name[:35]:<36}{s['turns']:>6}{s['tool_calls']:>7}{str(s['tool_calls_per_booking']):>10}"
+              f"{s['round_trips_per_turn']:>9}{s['routing_mismatches']:>9}{s['wall_ms_p50']:>9}{s['wall_ms_p95']:>9}")
+    print(f"DynamoDB operations: {counter.by_operation}")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(report, json.load(f), args.tolerance)
+        if regressions:
+            print("❌ Regressions vs baseline:\n  " + "\n  ".join(regressions))
+            sys.exit(1)
+        print("✅ No regressions vs baseline")
+
+
+if __name__ == "__main__":
+    main()
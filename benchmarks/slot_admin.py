@@ -0,0 +1,89 @@
+"""
+Throughput of bulk slot administration on a 10k-slot range.
+
+Compares the old approach (one put_item per slot, as setup_slots.py used to
+do) with the admin job runner: batched conditional create, then conditional block,
+unblock and delete. A handful of slots in the range are marked BOOKED first
+to check they survive block/delete untouched.
+
+Runs against DynamoDB Local only, on dates far in the future so the range
+never overlaps the automatically seeded week.
+
+Usage:
+    DYNAMODB_ENDPOINT_URL=http://localhost:8000 python -m benchmarks.slot_admin [--days 357]
+"""
+import os
+import sys
+import time
+import argparse
+
+from app.db import slots_table
+from app.services.slot_admin import BulkSlotRequest, expand_slots, create_job, run_job
+from setup_slots import create_receptionist_tables
+
+BOOKED_SAMPLE = 10
+
+
+def naive_create(slots: list) -> float:
+    started = time.perf_counter()
+    for sid, d, t in slots:
+        slots_table.put_item(Item={"slot_id": sid, "date": d, "start_time": t,
+                                   "status": "AVAILABLE", "is_available": True, "version": 0})
+    return time.perf_counter() - started
+
+
+def naive_delete(slots: list):
+    for sid, _, _ in slots:
+        slots_table.delete_item(Key={"slot_id": sid})
+
+
+def run(operation: str, slots: list) -> dict:
+    job = run_job(create_job(operation, len(slots)), slots)
+    report = job.to_dict()
+    print(f"{operation:<8} {report['succeeded']:>7} ok {report['skipped']:>6} skipped "
+          f"{report['failed']:>4} failed {report['retries']:>4} retries "
+          f"{report['elapsed_seconds']:>7.2f}s  {report['slots_per_second']:>8.1f} slots/s")
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--days", type=int, default=357, help="days in the range (28 slots/day; default ~10k slots)")
+    parser.add_argument("--skip-naive", action="store_true", help="skip the per-item baseline")
+    args = parser.parse_args()
+
+    if not os.getenv("DYNAMODB_ENDPOINT_URL"):
+        sys.exit("Refusing to benchmark against a real AWS table: set DYNAMODB_ENDPOINT_URL to DynamoDB Local.")
+    create_receptionist_tables()
+
+    request = BulkSlotRequest(start_date="2099-01-01", end_date="2099-12-31", start_time="09:00",
+                              end_time="16:00", interval_minutes=15)
+    slots = expand_slots(request)[:args.days * 28]
+    print(f"Range: {len(slots)} slots ({slots[0][0]} .. {slots[-1][0]})\n")
+
+    if not args.skip_naive:
+        elapsed = naive_create(slots)
+        print(f"{'put_item':<8} {len(slots):>7} ok {elapsed:>7.2f}s  {len(slots) / elapsed:>8.1f} slots/s  (per-item baseline)")
+        naive_delete(slots)
+
+    run("create", slots)
+    run("create", slots)   # everything exists now: measures the BatchGetItem skip path
+
+    booked = [sid for sid, _, _ in slots[::len(slots) // BOOKED_SAMPLE]][:BOOKED_SAMPLE]
+    for sid in booked:
+        slots_table.update_item(Key={"slot_id": sid}, UpdateExpression="SET #s = :b, is_available = :f",
+                                ExpressionAttributeNames={"#s": "status"},
+                                ExpressionAttributeValues={":b": "BOOKED", ":f": False})
+
+    run("block", slots)
+    run("unblock", slots)
+    delete = run("delete", slots)
+
+    survivors = [sid for sid in booked if slots_table.get_item(Key={"slot_id": sid}).get("Item")]
+    print(f"\nBooked slots protected: {len(survivors)}/{len(booked)} (delete skipped {delete['skipped']})")
+    for sid in booked:
+        slots_table.delete_item(Key={"slot_id": sid})
+
+
+if __name__ == "__main__":
+    main()
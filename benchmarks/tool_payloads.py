@@ -0,0 +1,139 @@
+"""
+Token size of get_available_slots payloads per conversation, before and
+after server-side filtering and the compact projection. No database needed.
+
+Builds a week of inventory shaped like the seeded Slots table (8 hourly
+slots a day, a few booked), then for every availability lookup in the
+recorded conversations (benchmarks/conversations) and a set of typical
+requests at different times of day, compares:
+  * before: every available item for the date, all attributes, past times included;
+  * after:  slot_id + time only, past and out-of-window times removed (the
+            bounds app.services.slots.slot_time_range gives the FilterExpression).
+A tool result stays in the model's context for the rest of the conversation,
+so per-conversation totals count it once for every later model turn too.
+
+Tokens are estimated at 4 characters per token; with --gemini and
+GEMINI_API_KEY set they are counted by the Gemini tokenizer instead.
+
+Usage:
+    python -m benchmarks.tool_payloads [--conversations benchmarks/conversations] [--gemini]
+"""
+import os
+import json
+import glob
+import argparse
+from datetime import datetime, timedelta
+from app.services.slots import slot_time_range
+
+BUSINESS_HOURS = ["09:00", "10:00", "11:00", "12:00", "13:00", "14:00", "15:00", "16:00"]
+
+# (description, days from today, time of the request, time_preference, exact_time)
+SCENARIOS = [
+    ("today, asked at 08:30", 0, "08:30", None, None),
+    ("today, asked at 13:30", 0, "13:30", None, None),
+    ("today afternoon, asked at 13:30", 0, "13:30", "afternoon", None),
+    ("tomorrow, no preference", 1, "10:00", None, None),
+    ("tomorrow morning", 1, "10:00", "morning", None),
+    ("tomorrow at 3pm", 1, "10:00", "exact_time", "15:00"),
+    ("next week, evening", 6, "10:00", "evening", None),
+]
+
+
+def build_inventory(today: datetime) -> dict:
+    """date -> list of Slots items, as the resource layer used to return them."""
+    inventory = {}
+    for day in range(7):
+        date_str = (today + timedelta(days=day)).strftime("%Y-%m-%d")
+        inventory[date_str] = [
+            {"slot_id": f"{date_str}-{hour}", "date": date_str, "start_time": hour,
+             "status": "BOOKED" if (day + i) % 4 == 0 else "AVAILABLE",
+             "is_available": (day + i) % 4 != 0, "version": 2 if (day + i) % 4 == 0 else 0}
+            for i, hour in enumerate(BUSINESS_HOURS)
+        ]
+    return inventory
+
+
+def before_payload(inventory: dict, date_str: str) -> list:
+    return [item for item in inventory.get(date_str, []) if item["is_available"]]
+
+
+def after_payload(inventory: dict, date_str: str, now: datetime, preference=None, exact_time=None) -> list:
+    bounds = slot_time_range(date_str, now, preference, exact_time)
+    if bounds is None:
+        return []
+    earliest, latest = bounds
+    return [
+        {"slot_id": item["slot_id"], "time": item["start_time"]}
+        for item in before_payload(inventory, date_str)
+        if earliest < item["start_time"] <= latest
+    ]
+
+
+class TokenCounter:
+    def __init__(self, use_gemini: bool):
+        self.client = None
+        if use_gemini and os.getenv("GEMINI_API_KEY"):
+            from google import genai
+            self.client = genai.Client(api_key=os.getenv("GEMINI_API_KEY"))
+
+    def count(self, payload) -> int:
+        text = json.dumps(payload)
+        if self.client is None:
+            return max(1, len(text) // 4)
+        return self.client.models.count_tokens(model="gemini-2.5-flash", contents=text).total_tokens
+
+
+def conversation_lookups(path: str, today: datetime) -> list:
+    """(name, [(turn_index, args)], turn_count) per recorded conversation, dates moved to start today."""
+    conversations = []
+    for file in sorted(glob.glob(os.path.join(path, "*.json"))):
+        with open(file) as f:
+            conversation = json.load(f)
+        recorded_on = datetime.strptime(conversation["recorded_on"], "%Y-%m-%d")
+        lookups = []
+        for index, turn in enumerate(conversation["turns"]):
+            for call in turn.get("tool_calls", []):
+                if call["name"] == "get_available_slots":
+                    args = dict(call.get("args") or {})
+                    recorded_day = datetime.strptime(args.get("date", conversation["recorded_on"]), "%Y-%m-%d")
+                    args["date"] = (today + (recorded_day - recorded_on)).strftime("%Y-%m-%d")
+                    lookups.append((index, args))
+        conversations.append((conversation["name"], lookups, len(conversation["turns"])))
+    return conversations
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--conversations", default=os.path.join(os.path.dirname(__file__), "conversations"))
+    parser.add_argument("--gemini", action="store_true", help="count with the Gemini tokenizer (needs GEMINI_API_KEY)")
+    args = parser.parse_args()
+
+    counter = TokenCounter(args.gemini)
+    today = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
+    inventory = build_inventory(today)
+    unit = "tokens" if counter.client else "~tokens"
+
+    print(f"{'lookup':<34} {'slots before':>12} {'after':>6} {unit + ' before':>15} {'after':>6}")
+    for description, day, at, preference, exact in SCENARIOS:
+        date_str = (today + timedelta(days=day)).strftime("%Y-%m-%d")
+        now = today.replace(hour=int(at[:2]), minute=int(at[3:]))
+        before = before_payload(inventory, date_str)
+        after = after_payload(inventory, date_str, now, preference, exact)
+        print(f"{description:<34} {len(before):>12} {len(after):>6} {counter.count(before):>15} {counter.count(after):>6}")
+
+    print(f"\n{'conversation (asked at 13:30)':<34} {'lookups':>12} {'':>6} {unit + ' before':>15} {'after':>6}")
+    now = today.replace(hour=13, minute=30)
+    for name, lookups, turn_count in conversation_lookups(args.conversations, today):
+        before_total = after_total = 0
+        for turn_index, call_args in lookups:
+            # The result is re-read on this and every later model turn
+            rounds = turn_count - turn_index
+            before_total += counter.count(before_payload(inventory, call_args["date"])) * rounds
+            after_total += counter.count(after_payload(inventory, call_args["date"], now,
+                                                       call_args.get("time_preference"),
+                                                       call_args.get("exact_time"))) * rounds
+        print(f"{name:<34} {len(lookups):>12} {'':>6} {before_total:>15} {after_total:>6}")
+
+
+if __name__ == "__main__":
+    main()
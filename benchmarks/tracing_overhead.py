@@ -0,0 +1,76 @@
+"""
+Measures the CPU cost of per-call voice tracing.
+
+Drives the same hooks the voice stream calls (per 20ms inbound frame, per
+100ms outbound chunk, and a turn with a tool call every few seconds) for a
+synthetic call, with tracing on (every call sampled, exported to a temp
+file) and off (no-op tracer), and reports the difference as a share of one
+core per call and for 100 concurrent calls.
+
+Usage:
+    python -m benchmarks.tracing_overhead [--seconds 600]
+"""
+import os
+import time
+import argparse
+import tempfile
+from app.voice import tracing
+
+
+def simulate(trace, call_seconds: int):
+    for frame in range(call_seconds * 50):
+        trace.twilio_media(frame * 20)
+        trace.transcode("inbound", 2000)
+        trace.transcode("vad", 3000)
+        if frame % 5 == 0:
+            trace.model_audio()
+            trace.transcode("outbound", 4000)
+        if frame % 250 == 0:
+            trace.end_turn()
+            trace.speech_ended()
+            trace.flush_dequeued()
+            with trace.span("gemini.send_audio_tail", {"bytes": 3200}):
+                pass
+            with trace.span("tool get_available_slots", {"tool.name": "get_available_slots"}):
+                pass
+        if frame % 250 == 100:
+            trace.playback_acked()
+    trace.finish({"vad.suppressed_ratio": 0.4})
+
+
+def cpu_of(trace, call_seconds: int) -> float:
+    started = time.process_time()
+    simulate(trace, call_seconds)
+    return time.process_time() - started
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--seconds", type=int, default=600)
+    args = parser.parse_args()
+
+    # Warm up both paths, then measure; finish() doesn't queue anything while no export target is set
+    tracing.TRACE_FILE = tracing.OTLP_ENDPOINT = None
+    cpu_of(tracing.NOOP_TRACE, 10)
+    cpu_of(tracing.CallTrace(sampled=True), 10)
+    untraced = cpu_of(tracing.NOOP_TRACE, args.seconds)
+    trace = tracing.CallTrace(sampled=True)
+    traced = cpu_of(trace, args.seconds)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        tracing.TRACE_FILE = os.path.join(tmp, "traces.jsonl")
+        started = time.process_time()
+        tracing.exporter.export([trace])
+        export_cpu = time.process_time() - started
+        size = os.path.getsize(tracing.TRACE_FILE)
+
+    overhead = traced + export_cpu - untraced
+    print(f"Simulated call length  : {args.seconds}s ({args.seconds // 5} turns)")
+    print(f"Hooks, tracing on      : {traced * 1000:.1f} ms CPU (+{export_cpu * 1000:.1f} ms export, {size / 1e3:.0f} kB OTLP)")
+    print(f"Hooks, tracing off     : {untraced * 1000:.1f} ms CPU")
+    print(f"Overhead per call      : {overhead / args.seconds * 100:.4f}% of one core")
+    print(f"100 concurrent calls   : {overhead / args.seconds * 100 * 100:.2f}% of one core (all sampled)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,182 @@
+"""
+Exports DynamoDB tables to local gzip-compressed JSON-lines files for analytics.
+
+Each table is read with a parallel scan (Segment/TotalSegments) spread over a
+thread pool, throttled to a read-capacity budget so an export doesn't starve
+production traffic. Every segment streams to its own file, one page at a
+time, so memory use stays at one page per worker whatever the table size:
+
+    <out>/<Table>/segment-0003.jsonl.gz    (read with zcat / gzip.open)
+    <out>/<Table>/checkpoint.json          (progress; makes the export resumable)
+    <out>/<Table>/manifest.json            (written when the table is complete)
+
+Each page is written as its own gzip member and the checkpoint records the
+file offset after it together with the scan position. A resumed export
+truncates each file back to its checkpoint and continues from there, so an
+interrupted run (Ctrl-C, crash) neither loses nor duplicates rows.
+
+Usage:
+    python export_data.py [--tables Appointments Slots] [--out exports]
+                          [--segments 8] [--rcu 200] [--resume]
+"""
+import os
+import sys
+import json
+import gzip
+import time
+import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from app.db import make_client, plain_item
+from app.services.rate_limit import TokenBucket
+
+DEFAULT_TABLES = ("Appointments", "Slots")
+DEFAULT_SEGMENTS = int(os.getenv("EXPORT_SEGMENTS", "8"))
+# Read capacity units per second the export may consume (eventually consistent reads: 0.5 RCU per 4 KB)
+DEFAULT_RCU_BUDGET = float(os.getenv("EXPORT_RCU_PER_SECOND", "200"))
+
+
+class Checkpoint:
+    """Per-segment scan position and file offset, saved atomically after every page."""
+
+    def __init__(self, path: str, total_segments: int, resume: bool):
+        self.path = path
+        self._lock = threading.Lock()
+        if os.path.exists(path):
+            if not resume:
+                sys.exit(f"{path} exists: pass --resume to continue that export, or remove the directory.")
+            with open(path) as f:
+                self.state = json.load(f)
+            if self.state["total_segments"] != total_segments:
+                sys.exit(f"{path} was written with --segments {self.state['total_segments']}; resume with the same value.")
+        else:
+            self.state = {"total_segments": total_segments, "segments": {}}
+
+    def segment(self, segment: int) -> dict:
+        with self._lock:
+            return dict(self.state["segments"].get(str(segment), {"last_key": None, "offset": 0, "rows": 0, "done": False}))
+
+    def save(self, segment: int, progress: dict):
+        with self._lock:
+            self.state["segments"][str(segment)] = progress
+            tmp = f"{self.path}.tmp"
+            with open(tmp, "w") as f:
+                json.dump(self.state, f)
+            os.replace(tmp, self.path)
+
+
+def scan_segment(client, table: str, segment: int, total_segments: int, out_dir: str,
+                 checkpoint: Checkpoint, budget: TokenBucket, stats: dict, stop: threading.Event,
+                 page_size: int = None):
+    progress = checkpoint.segment(segment)
+    if progress["done"]:
+        return
+    path = os.path.join(out_dir, f"segment-{segment:04d}.jsonl.gz")
+    kwargs = {"TableName": table, "Segment": segment, "TotalSegments": total_segments,
+              "ReturnConsumedCapacity": "TOTAL"}
+    if page_size:
+        kwargs["Limit"] = page_size
+
+    with open(path, "ab") as f:
+        # Drop anything written after the last checkpoint (a page that never got checkpointed)
+        f.truncate(progress["offset"])
+        f.seek(progress["offset"])
+        while not stop.is_set():
+            if progress["last_key"]:
+                kwargs["ExclusiveStartKey"] = progress["last_key"]
+            response = client.scan(**kwargs)
+            items = response.get("Items", [])
+            if items:
+                lines = "".join(json.dumps(plain_item(item), default=str) + "\n" for item in items)
+                f.write(gzip.compress(lines.encode()))
+                f.flush()
+                os.fsync(f.fileno())
+
+            progress["last_key"] = response.get("LastEvaluatedKey")
+            progress["offset"] = f.tell()
+            progress["rows"] += len(items)
+            progress["done"] = progress["last_key"] is None
+            checkpoint.save(segment, progress)
+
+            consumed = response.get("ConsumedCapacity", {}).get("CapacityUnits", len(items) * 0.5)
+            with stats["lock"]:
+                stats["rows"] += len(items)
+                stats["pages"] += 1
+                stats["rcu"] += consumed
+            if progress["done"]:
+                return
+            # Stay within the read budget shared by all segments
+            wait = budget.spend(consumed)
+            if wait:
+                time.sleep(wait)
+
+
+def export_table(table: str, out: str = "exports", segments: int = DEFAULT_SEGMENTS, workers: int = None,
+                 rcu_per_second: float = DEFAULT_RCU_BUDGET, page_size: int = None, resume: bool = False,
+                 stop: threading.Event = None) -> dict:
+    """Exports one table; returns a summary. Setting `stop` ends it early at the next page boundary."""
+    out_dir = os.path.join(out, table)
+    os.makedirs(out_dir, exist_ok=True)
+    workers = workers or segments
+    stop = stop or threading.Event()
+    checkpoint = Checkpoint(os.path.join(out_dir, "checkpoint.json"), segments, resume)
+    budget = TokenBucket(rcu_per_second)
+    client = make_client(max_pool_connections=max(workers, 10))
+    stats = {"rows": 0, "pages": 0, "rcu": 0.0, "lock": threading.Lock()}
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = [
+            pool.submit(scan_segment, client, table, segment, segments, out_dir, checkpoint, budget, stats, stop, page_size)
+            for segment in range(segments)
+        ]
+        try:
+            for future in futures:
+                future.result()
+        except BaseException:
+            # Ctrl-C or a failed segment: let the others checkpoint their current page and stop
+            stop.set()
+            raise
+    elapsed = time.perf_counter() - started
+
+    done = all(checkpoint.segment(s)["done"] for s in range(segments))
+    summary = {
+        "table": table,
+        "complete": done,
+        "rows": sum(checkpoint.segment(s)["rows"] for s in range(segments)),
+        "rows_this_run": stats["rows"],
+        "pages": stats["pages"],
+        "consumed_rcu": round(stats["rcu"], 1),
+        "seconds": round(elapsed, 2),
+        "rows_per_second": round(stats["rows"] / elapsed, 1) if elapsed else 0.0,
+    }
+    if done:
+        with open(os.path.join(out_dir, "manifest.json"), "w") as f:
+            json.dump(dict(summary, segments=segments,
+                           files=[f"segment-{s:04d}.jsonl.gz" for s in range(segments)]), f, indent=2)
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tables", nargs="+", default=list(DEFAULT_TABLES))
+    parser.add_argument("--out", default="exports")
+    parser.add_argument("--segments", type=int, default=DEFAULT_SEGMENTS)
+    parser.add_argument("--workers", type=int, help="threads (default: one per segment)")
+    parser.add_argument("--rcu", type=float, default=DEFAULT_RCU_BUDGET, help="read capacity units per second")
+    parser.add_argument("--page-size", type=int, help="items per Scan page (default: 1 MB pages)")
+    parser.add_argument("--resume", action="store_true", help="continue an interrupted export")
+    args = parser.parse_args()
+
+    for table in args.tables:
+        print(f"📦 Exporting {table} ({args.segments} segments, {args.rcu:g} RCU/s)...")
+        try:
+            summary = export_table(table, args.out, args.segments, args.workers, args.rcu, args.page_size, args.resume)
+        except KeyboardInterrupt:
+            sys.exit("\n⏸️  Interrupted. Progress is checkpointed: rerun with --resume to continue.")
+        print(f"✅ {summary}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,53 +1,83 @@
 # app/db/setup_slots.py
-import boto3
 from botocore.exceptions import ClientError
 from datetime import datetime, timedelta
 
-# Professional Tip: Use a session or a central config for region/endpoints
-dynamodb = boto3.resource('dynamodb', region_name='us-east-1')
+# Shared resource from app.db so DYNAMODB_ENDPOINT_URL (DynamoDB Local) is honoured
+from app.db import dynamodb
 
 def create_receptionist_tables():
+    # Slots and Appointments publish a change stream (see app/background/change_stream.py)
     tables = [
-        {"name": "Slots", "key": "slot_id"},
-        {"name": "Appointments", "key": "appointment_id"}
+        {"name": "Slots", "key": "slot_id", "stream": True},
+        {"name": "Appointments", "key": "appointment_id", "stream": True},
+        {"name": "Waitlist", "key": "entry_id", "stream": False},
+        # Appointments by start hour ("YYYY-MM-DDTHH"), for the reminder scheduler
+        {"name": "Reminders", "key": "bucket", "sort": "appointment_id", "stream": False, "ttl": "expires_at"}
     ]
+    stream_spec = {'StreamEnabled': True, 'StreamViewType': 'NEW_AND_OLD_IMAGES'}
     
     for t in tables:
         try:
+            extra = {"StreamSpecification": stream_spec} if t["stream"] else {}
+            key_schema = [{'AttributeName': t["key"], 'KeyType': 'HASH'}]
+            attributes = [{'AttributeName': t["key"], 'AttributeType': 'S'}]
+            if t.get("sort"):
+                key_schema.append({'AttributeName': t["sort"], 'KeyType': 'RANGE'})
+                attributes.append({'AttributeName': t["sort"], 'AttributeType': 'S'})
             table = dynamodb.create_table(
                 TableName=t["name"],
-                KeySchema=[{'AttributeName': t["key"], 'KeyType': 'HASH'}],
-                AttributeDefinitions=[{'AttributeName': t["key"], 'AttributeType': 'S'}],
-                ProvisionedThroughput={'ReadCapacityUnits': 5, 'WriteCapacityUnits': 5}
+                KeySchema=key_schema,
+                AttributeDefinitions=attributes,
+                ProvisionedThroughput={'ReadCapacityUnits': 5, 'WriteCapacityUnits': 5},
+                **extra
             )
             table.wait_until_exists()
+            if t.get("ttl"):
+                dynamodb.meta.client.update_time_to_live(
+                    TableName=t["name"],
+                    TimeToLiveSpecification={'Enabled': True, 'AttributeName': t["ttl"]}
+                )
             print(f"✅ Table '{t['name']}' ready.")
         except ClientError as e:
             if e.response['Error']['Code'] == 'ResourceInUseException':
                 print(f"ℹ️ Table '{t['name']}' already exists. Skipping creation.")
+                if t["stream"]:
+                    enable_stream(t["name"], stream_spec)
+
+def enable_stream(table_name: str, stream_spec: dict):
+    """Turns the change stream on for a table created before streams were used."""
+    table = dynamodb.Table(table_name)
+    if table.stream_specification and table.stream_specification.get('StreamEnabled'):
+        return
+    table.update(StreamSpecification=stream_spec)
+    print(f"📡 Enabled change stream on '{table_name}'.")
 
 def seed_dynamic_data():
     table = dynamodb.Table("Slots")
     today = datetime.now()
     
-    # Generate 5 days of slots (6 slots per day)
-    for day_offset in range(5):
-        date_str = (today + timedelta(days=day_offset)).strftime('%Y-%m-%d')
-        for hour in [9, 10, 11, 14, 15, 16]:
-            time_str = f"{hour:02d}:00"
-            # Using a dash-separated ID is standard for DynamoDB sorting
-            slot_id = f"{date_str}-{time_str}"
+    # Generate 5 days of slots (6 slots per day).
+    # batch_writer groups puts into 25-item BatchWriteItem calls and resends unprocessed items
+    with table.batch_writer(overwrite_by_pkeys=["slot_id"]) as batch:
+        for day_offset in range(5):
+            date_str = (today + timedelta(days=day_offset)).strftime('%Y-%m-%d')
+            for hour in [9, 10, 11, 14, 15, 16]:
+                time_str = f"{hour:02d}:00"
+                # Using a dash-separated ID is standard for DynamoDB sorting
+                slot_id = f"{date_str}-{time_str}"
             
-            table.put_item(Item={
-                "slot_id": slot_id,
-                "date": date_str,
-                "start_time": time_str,
-                "is_available": True,  # Critical for your AI filter
-                "status": "AVAILABLE",
-                "version": 0           # Good for handling concurrent bookings later
-            })
+                batch.put_item(Item={
+                    "slot_id": slot_id,
+                    "date": date_str,
+                    "start_time": time_str,
+                    "is_available": True,  # Critical for your AI filter
+                    "status": "AVAILABLE",
+                    "version": 0           # Good for handling concurrent bookings later
+                })
     print(f"✨ Seeded dynamic slots starting from {today.strftime('%Y-%m-%d')}")
 
 if __name__ == "__main__":
     create_receptionist_tables()
-    seed_dynamic_data()
\ No newline at end of file
+    seed_dynamic_data()
+    from app.background.reminders import backfill_reminder_index
+    print(f"🔔 Indexed {backfill_reminder_index()} upcoming appointments for reminders")
\ No newline at end of file
@@ -0,0 +1,15 @@
+import os
+import sys
+
+# Importing the app builds the Twilio and boto3 clients, which need credentials
+# to exist (they are never used by the unit tests), and the LLM: the offline
+# mock. Tests that talk to DynamoDB skip themselves unless DYNAMODB_ENDPOINT_URL
+# points at DynamoDB Local.
+os.environ.setdefault("TWILIO_ACCOUNT_SID", "ACtest")
+os.environ.setdefault("TWILIO_AUTH_TOKEN", "test")
+os.environ.setdefault("AWS_ACCESS_ID", "test")
+os.environ.setdefault("AWS_SECRET_ACCESS_KEY", "test")
+os.environ.setdefault("NOTIFICATIONS_DRY_RUN", "true")
+os.environ.setdefault("LLM_PROVIDER", "mock")
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,151 @@
+import asyncio
+import unittest
+from unittest import mock
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.services import admission
+from app.services.admission import ChannelLimiter, PhoneRateLimiter
+from app.api import routes
+
+
+class ChannelLimiterTest(unittest.TestCase):
+
+    def test_limit_caps_concurrent_work(self):
+        limiter = ChannelLimiter("test", max_limit=2, target_ms=100)
+        self.assertTrue(limiter.try_acquire())
+        self.assertTrue(limiter.try_acquire())
+        self.assertFalse(limiter.try_acquire())
+        limiter.release()
+        self.assertTrue(limiter.try_acquire())
+
+    def test_reservations_count_until_claimed_or_lapsed(self):
+        limiter = ChannelLimiter("test", max_limit=1, target_ms=100)
+        self.assertTrue(limiter.reserve())
+        self.assertFalse(limiter.reserve())
+        self.assertTrue(limiter.claim())
+        self.assertEqual(limiter.active, 1)
+        limiter.release()
+
+        self.assertTrue(limiter.reserve())
+        with mock.patch("app.services.admission.time.monotonic", return_value=1e12):
+            self.assertEqual(limiter.in_flight(), 0)
+        self.assertEqual(limiter.snapshot()["reservations_lapsed"], 1)
+
+    def test_waiters_are_admitted_in_order_or_time_out(self):
+        async def scenario():
+            limiter = ChannelLimiter("test", max_limit=1, target_ms=100)
+            self.assertTrue(await limiter.acquire(0.1))
+            first = asyncio.create_task(limiter.acquire(1.0))
+            second = asyncio.create_task(limiter.acquire(0.05))
+            await asyncio.sleep(0)
+            self.assertFalse(await second)          # timed out while the first waited
+            limiter.release()
+            self.assertTrue(await first)
+            self.assertEqual(limiter.snapshot()["timed_out"], 1)
+        asyncio.run(scenario())
+
+    def test_limit_shrinks_when_slow_and_grows_back_when_busy_and_fast(self):
+        limiter = ChannelLimiter("test", max_limit=8, target_ms=100)
+        for _ in range(admission.MIN_OBSERVATIONS):
+            limiter.observe(500)
+        self.assertEqual(limiter.limit, 6)
+
+        for _ in range(6):
+            limiter.try_acquire()
+        for _ in range(admission.MIN_OBSERVATIONS):
+            limiter.observe(10)
+        self.assertEqual(limiter.limit, 7)
+
+    def test_limit_does_not_grow_while_idle(self):
+        limiter = ChannelLimiter("test", max_limit=8, target_ms=100)
+        limiter.limit = 4
+        for _ in range(admission.MIN_OBSERVATIONS):
+            limiter.observe(10)
+        self.assertEqual(limiter.limit, 4)
+
+
+class PhoneRateLimiterTest(unittest.TestCase):
+
+    def test_burst_then_limited_with_one_busy_reply(self):
+        limiter = PhoneRateLimiter(per_minute=1, burst=2)
+        self.assertTrue(limiter.allow("+15550101"))
+        self.assertTrue(limiter.allow("+15550101"))
+        self.assertFalse(limiter.allow("+15550101"))
+        self.assertTrue(limiter.first_refusal("+15550101"))
+        self.assertFalse(limiter.allow("+15550101"))
+        self.assertFalse(limiter.first_refusal("+15550101"))
+        # Other senders have their own bucket
+        self.assertTrue(limiter.allow("+15550102"))
+
+    def test_busy_reply_again_after_an_allowed_text(self):
+        limiter = PhoneRateLimiter(per_minute=60, burst=1)
+        self.assertTrue(limiter.allow("+15550101"))
+        self.assertFalse(limiter.allow("+15550101"))
+        self.assertTrue(limiter.first_refusal("+15550101"))
+        bucket = limiter._buckets["+15550101"]
+        bucket.tokens = bucket.capacity
+        self.assertTrue(limiter.allow("+15550101"))
+        self.assertFalse(limiter.allow("+15550101"))
+        self.assertTrue(limiter.first_refusal("+15550101"))
+
+    def test_least_recent_phones_are_evicted(self):
+        limiter = PhoneRateLimiter(per_minute=1, burst=1, max_phones=2)
+        for phone in ("+1", "+2", "+3"):
+            limiter.allow(phone)
+        self.assertEqual(list(limiter._buckets), ["+2", "+3"])
+
+
+class SmsWebhookAdmissionTest(unittest.TestCase):
+
+    def setUp(self):
+        app = FastAPI()
+        app.include_router(routes.router, prefix="/api/v1")
+        self.client = TestClient(app)
+        self.enqueued = []
+        patches = [
+            mock.patch.object(admission, "sms_senders", PhoneRateLimiter(per_minute=1, burst=1)),
+            mock.patch.object(admission, "SMS_REPLY_MODE", "async"),
+            mock.patch.object(routes, "enqueue_sms", lambda *args: self.enqueued.append(args)),
+            mock.patch.object(routes, "is_offer_reply", return_value=False),
+        ]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+
+    def text(self, sid, body="What times tomorrow?"):
+        form = {"From": "+15550101", "Body": body, "MessageSid": sid}
+        return self.client.post("/api/v1/sms/webhook", data=form).text
+
+    def test_twilio_retry_does_not_spend_the_sender_budget(self):
+        self.text("SM-retry-1")
+        self.text("SM-retry-1")
+        self.assertEqual(len(self.enqueued), 1)
+        self.assertEqual(admission.sms_senders.snapshot()["limited"], 0)
+
+    def test_flood_gets_one_busy_reply(self):
+        self.text("SM-flood-1")
+        busy = self.text("SM-flood-2")
+        silent = self.text("SM-flood-3")
+        self.assertIn(admission.BUSY_REPLY, busy)
+        self.assertNotIn(admission.BUSY_REPLY, silent)
+        self.assertEqual(len(self.enqueued), 1)
+
+    def test_offer_replies_skip_the_limit(self):
+        self.text("SM-offer-1")
+        with mock.patch.object(routes, "is_offer_reply", return_value=True):
+            self.text("SM-offer-2", body="YES")
+        self.assertEqual(len(self.enqueued), 2)
+
+
+class VoiceOverflowTest(unittest.TestCase):
+
+    def test_malformed_hold_counter_counts_as_first_attempt(self):
+        self.assertEqual(routes.hold_count("2"), 2)
+        for value in (None, "", "abc", "1.5", "-3"):
+            self.assertEqual(routes.hold_count(value), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
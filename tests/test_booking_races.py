@@ -0,0 +1,117 @@
+"""
+Booking race checks: a confirm with a stale hold token and a double cancel
+must leave the slot and the appointment consistent.
+
+Runs against DynamoDB Local only (skipped otherwise):
+    DYNAMODB_ENDPOINT_URL=http://localhost:8000 python -m unittest tests.test_booking_races
+"""
+import os
+import unittest
+
+ENDPOINT = os.getenv("DYNAMODB_ENDPOINT_URL")
+
+
+@unittest.skipUnless(ENDPOINT, "set DYNAMODB_ENDPOINT_URL to DynamoDB Local")
+class BookingRaceTest(unittest.TestCase):
+    SLOT_ID = "2099-01-01-09:00"
+    OTHER_SLOT_ID = "2099-01-01-10:00"
+    PHONE = "+15550000000"
+
+    @classmethod
+    def setUpClass(cls):
+        os.environ["NOTIFICATIONS_DRY_RUN"] = "1"
+        from setup_slots import create_receptionist_tables
+        from app.services import bookings
+        create_receptionist_tables()
+        cls.bookings = bookings
+
+    def setUp(self):
+        for slot_id in (self.SLOT_ID, self.OTHER_SLOT_ID):
+            self.bookings.slots_table.put_item(Item={
+                "slot_id": slot_id, "date": "2099-01-01", "start_time": slot_id[-5:],
+                "status": "AVAILABLE", "is_available": True, "version": 0,
+            })
+
+    def tearDown(self):
+        for slot_id in (self.SLOT_ID, self.OTHER_SLOT_ID):
+            self.bookings.slots_table.delete_item(Key={"slot_id": slot_id})
+
+    def slot(self, slot_id: str = None) -> dict:
+        key = {"slot_id": slot_id or self.SLOT_ID}
+        return self.bookings.slots_table.get_item(Key=key, ConsistentRead=True)["Item"]
+
+    def book(self) -> str:
+        held = self.bookings.hold_slot(self.SLOT_ID, self.PHONE)
+        self.assertTrue(held["success"], held)
+        confirmed = self.bookings.confirm_appointment(self.SLOT_ID, self.PHONE, held["hold_token"])
+        self.assertTrue(confirmed["success"], confirmed)
+        return confirmed["appointment_id"]
+
+    def test_confirm_with_stale_token(self):
+        first = self.bookings.hold_slot(self.SLOT_ID, self.PHONE)
+        # The hold lapses and someone else books the slot
+        self.bookings.slots_table.update_item(
+            Key={"slot_id": self.SLOT_ID},
+            UpdateExpression="SET #s = :avail",
+            ExpressionAttributeNames={"#s": "status"},
+            ExpressionAttributeValues={":avail": "AVAILABLE"},
+        )
+        appointment_id = self.book()
+
+        stale = self.bookings.confirm_appointment(self.SLOT_ID, "+15551111111", first["hold_token"])
+        self.assertFalse(stale["success"])
+        self.assertEqual(self.slot()["appointment_id"], appointment_id)
+        self.bookings.cancel_appointment(appointment_id)
+
+    def test_double_cancel(self):
+        appointment_id = self.book()
+        self.assertTrue(self.bookings.cancel_appointment(appointment_id)["success"])
+        self.assertEqual(self.slot()["status"], "AVAILABLE")
+
+        # Someone books the released slot; the repeated cancel must not release it
+        rebooked = self.book()
+        again = self.bookings.cancel_appointment(appointment_id)
+        self.assertFalse(again["success"])
+        slot = self.slot()
+        self.assertEqual(slot["status"], "BOOKED")
+        self.assertEqual(slot["appointment_id"], rebooked)
+        self.bookings.cancel_appointment(rebooked)
+
+    def test_stale_cancel_after_rebooking(self):
+        # A cancel racing past the appointment delete still can't release another booking
+        appointment_id = self.book()
+        self.bookings.slots_table.update_item(
+            Key={"slot_id": self.SLOT_ID},
+            UpdateExpression="SET #s = :avail, is_available = :true",
+            ExpressionAttributeNames={"#s": "status"},
+            ExpressionAttributeValues={":avail": "AVAILABLE", ":true": True},
+        )
+        rebooked = self.book()
+        self.assertTrue(self.bookings.cancel_appointment(appointment_id)["success"])
+        slot = self.slot()
+        self.assertEqual(slot["status"], "BOOKED")
+        self.assertEqual(slot["appointment_id"], rebooked)
+        self.bookings.cancel_appointment(rebooked)
+
+    def test_reschedule_of_cancelled_appointment_books_nothing(self):
+        appointment_id = self.book()
+        self.assertTrue(self.bookings.cancel_appointment(appointment_id)["success"])
+
+        moved = self.bookings.reschedule_appointment(appointment_id, self.OTHER_SLOT_ID)
+        self.assertFalse(moved["success"])
+        self.assertEqual(self.slot(self.OTHER_SLOT_ID)["status"], "AVAILABLE")
+
+    def test_reschedule_books_through_confirm(self):
+        appointment_id = self.book()
+        moved = self.bookings.reschedule_appointment(appointment_id, self.OTHER_SLOT_ID)
+        self.assertTrue(moved["success"], moved)
+
+        self.assertEqual(self.slot()["status"], "AVAILABLE")
+        new_slot = self.slot(self.OTHER_SLOT_ID)
+        self.assertEqual(new_slot["status"], "BOOKED")
+        self.assertEqual(new_slot["appointment_id"], moved["appointment_id"])
+        self.assertTrue(self.bookings.cancel_appointment(moved["appointment_id"])["success"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,120 @@
+import unittest
+from datetime import datetime, timezone
+from unittest import mock
+
+from boto3.dynamodb.types import TypeSerializer
+from botocore.exceptions import ClientError
+
+from app.background import change_stream
+from app.background.change_stream import record_to_event, StreamTailer
+from app.db import slots_table, appointments_table
+from app.services.events import (
+    EventBus, ChangeEvent, SLOT_CREATED, SLOT_HELD, SLOT_RELEASED, SLOT_EXPIRED, SLOT_UNBLOCKED,
+    APPOINTMENT_CONFIRMED, APPOINTMENT_CANCELLED,
+)
+
+_serializer = TypeSerializer()
+CREATED_AT = 4_000_000_000
+
+
+def image(item: dict) -> dict:
+    return {k: _serializer.serialize(v) for k, v in item.items()}
+
+
+def slot_record(event_name, old=None, new=None, slot_id="2099-01-05-10:00", sequence="1"):
+    body = {"Keys": image({"slot_id": slot_id}), "SequenceNumber": sequence,
+            "ApproximateCreationDateTime": datetime.fromtimestamp(CREATED_AT, timezone.utc)}
+    if old:
+        body["OldImage"] = image({"slot_id": slot_id, **old})
+    if new:
+        body["NewImage"] = image({"slot_id": slot_id, **new})
+    return {"eventName": event_name, "dynamodb": body}
+
+
+class RecordToEventTest(unittest.TestCase):
+
+    def event_type(self, record):
+        event = record_to_event(slots_table.name, record)
+        return event and event.type
+
+    def test_slot_transitions(self):
+        self.assertEqual(self.event_type(slot_record("INSERT", new={"status": "AVAILABLE"})), SLOT_CREATED)
+        self.assertEqual(self.event_type(slot_record("MODIFY", {"status": "AVAILABLE"}, {"status": "HELD"})), SLOT_HELD)
+        self.assertEqual(self.event_type(slot_record("MODIFY", {"status": "BLOCKED"}, {"status": "AVAILABLE"})),
+                         SLOT_UNBLOCKED)
+
+    def test_lapsed_hold_is_an_expiry_and_a_live_one_a_release(self):
+        lapsed = slot_record("MODIFY", {"status": "HELD", "hold_expires_at": CREATED_AT - 1}, {"status": "AVAILABLE"})
+        live = slot_record("MODIFY", {"status": "HELD", "hold_expires_at": CREATED_AT + 60}, {"status": "AVAILABLE"})
+        self.assertEqual(self.event_type(lapsed), SLOT_EXPIRED)
+        self.assertEqual(self.event_type(live), SLOT_RELEASED)
+
+    def test_writes_that_keep_the_status_are_not_events(self):
+        self.assertIsNone(self.event_type(slot_record("MODIFY", {"status": "HELD", "version": 1},
+                                                      {"status": "HELD", "version": 2})))
+
+    def test_appointment_records_carry_their_data(self):
+        item = {"appointment_id": "a1", "phone_number": "+15550101", "slot_id": "2099-01-05-10:00",
+                "status": "CONFIRMED", "notes": "not copied"}
+        inserted = {"eventName": "INSERT", "dynamodb": {"Keys": image({"appointment_id": "a1"}),
+                                                         "NewImage": image(item)}}
+        removed = {"eventName": "REMOVE", "dynamodb": {"Keys": image({"appointment_id": "a1"}),
+                                                        "OldImage": image(item)}}
+        event = record_to_event(appointments_table.name, inserted)
+        self.assertEqual((event.type, event.key, event.remote), (APPOINTMENT_CONFIRMED, "a1", True))
+        self.assertEqual(event.data, {"phone_number": "+15550101", "slot_id": "2099-01-05-10:00"})
+        self.assertEqual(record_to_event(appointments_table.name, removed).type, APPOINTMENT_CANCELLED)
+
+
+class FakeStreams:
+    def __init__(self, records=(), error=None):
+        self.records = list(records)
+        self.error = error
+
+    def get_records(self, ShardIterator, Limit):
+        if self.error:
+            raise ClientError({"Error": {"Code": self.error, "Message": self.error}}, "GetRecords")
+        records, self.records = self.records, []
+        return {"Records": records, "NextShardIterator": ShardIterator + "+"}
+
+
+class StreamTailerPollTest(unittest.TestCase):
+
+    def poll(self, streams, bus, tailer=None):
+        tailer = tailer or StreamTailer(slots_table.name)
+        tailer.iterators.setdefault("shard-1", "it")
+        with mock.patch.object(change_stream, "dynamodb_streams", streams), \
+             mock.patch.object(change_stream, "event_bus", bus):
+            return tailer, tailer.poll()
+
+    def test_own_writes_are_skipped_as_echoes(self):
+        bus = EventBus()
+        bus.publish(ChangeEvent(SLOT_HELD, "2099-01-05-10:00", "AVAILABLE", "HELD"))
+        records = [
+            slot_record("MODIFY", {"status": "AVAILABLE"}, {"status": "HELD"}, sequence="1"),
+            slot_record("MODIFY", {"status": "AVAILABLE"}, {"status": "HELD"}, slot_id="2099-01-05-11:00",
+                        sequence="2"),
+        ]
+        tailer, events = self.poll(FakeStreams(records), bus)
+        self.assertEqual([e.key for e in events], ["2099-01-05-11:00"])
+        self.assertEqual(bus.snapshot()["echoes_skipped"], 1)
+        self.assertEqual(tailer.last_sequence["shard-1"], "2")
+        self.assertEqual(tailer.iterators["shard-1"], "it+")
+
+    def test_each_local_publish_suppresses_one_record(self):
+        bus = EventBus()
+        bus.publish(ChangeEvent(SLOT_HELD, "2099-01-05-10:00", "AVAILABLE", "HELD"))
+        records = [slot_record("MODIFY", {"status": "AVAILABLE"}, {"status": "HELD"}, sequence=str(i))
+                   for i in (1, 2)]
+        _, events = self.poll(FakeStreams(records), bus)
+        self.assertEqual(len(events), 1)
+
+    def test_expired_iterator_is_dropped_for_the_next_refresh(self):
+        tailer, events = self.poll(FakeStreams(error="ExpiredIteratorException"), EventBus())
+        self.assertEqual(events, [])
+        self.assertNotIn("shard-1", tailer.iterators)
+        self.assertIn("shard-1", tailer.expired)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,84 @@
+import asyncio
+import unittest
+from unittest import mock
+
+from botocore.exceptions import ClientError
+
+from app.background import expiry
+
+
+def client_error(code):
+    return ClientError({"Error": {"Code": code, "Message": code}}, "UpdateItem")
+
+
+class FakeSlots:
+    """Scan returns the given held slots; update_item raises per slot_id."""
+
+    def __init__(self, slots, errors=None, scan_error=None):
+        self.slots = slots
+        self.errors = errors or {}
+        self.scan_error = scan_error
+        self.updated = []
+
+    def scan(self, **kwargs):
+        if self.scan_error:
+            raise self.scan_error
+        return {"Items": self.slots}
+
+    def update_item(self, Key, **kwargs):
+        error = self.errors.get(Key["slot_id"])
+        if error:
+            raise error
+        self.updated.append(Key["slot_id"])
+
+
+class SweepTest(unittest.TestCase):
+
+    def sweep(self, table):
+        with mock.patch.object(expiry, "slots_table", table), mock.patch.object(expiry, "emit") as emit:
+            released = expiry.sweep_expired_holds()
+        return released, emit
+
+    def test_lapsed_holds_are_released(self):
+        table = FakeSlots([{"slot_id": "a", "version": 1}, {"slot_id": "b", "version": 4}])
+        released, emit = self.sweep(table)
+        self.assertEqual(released, 2)
+        self.assertEqual(table.updated, ["a", "b"])
+        self.assertEqual(emit.call_count, 2)
+
+    def test_errors_on_one_slot_do_not_stop_the_sweep(self):
+        table = FakeSlots(
+            [{"slot_id": "a", "version": 1}, {"slot_id": "b", "version": 1}, {"slot_id": "c", "version": 1}],
+            errors={"a": client_error("ConditionalCheckFailedException"),
+                    "b": client_error("ProvisionedThroughputExceededException")})
+        released, emit = self.sweep(table)
+        self.assertEqual(released, 1)
+        self.assertEqual(table.updated, ["c"])
+
+
+class ExpiryLoopTest(unittest.TestCase):
+
+    def test_failed_sweep_is_logged_and_the_loop_keeps_running(self):
+        calls = []
+
+        def sweep():
+            calls.append(1)
+            if len(calls) == 1:
+                raise client_error("InternalServerError")
+            return 0
+
+        async def stop_after_two(seconds):
+            if len(calls) >= 2:
+                raise asyncio.CancelledError
+
+        async def scenario():
+            with mock.patch.object(expiry, "sweep_expired_holds", sweep), \
+                 mock.patch.object(expiry.asyncio, "sleep", stop_after_two):
+                with self.assertRaises(asyncio.CancelledError):
+                    await expiry.expire_held_slots()
+        asyncio.run(scenario())
+        self.assertEqual(len(calls), 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
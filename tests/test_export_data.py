@@ -0,0 +1,100 @@
+import os
+import gzip
+import json
+import shutil
+import tempfile
+import threading
+import unittest
+from unittest import mock
+
+import export_data
+from export_data import export_table
+
+ROWS = 40
+SEGMENTS = 4
+
+
+class FakeScanClient:
+    """Parallel Scan over ROWS items: each segment pages through its share in key order."""
+
+    def __init__(self, fail_after: int = None):
+        self.fail_after = fail_after
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def scan(self, TableName, Segment, TotalSegments, Limit=5, ExclusiveStartKey=None, **kwargs):
+        with self._lock:
+            self.calls += 1
+            if self.fail_after is not None and self.calls > self.fail_after:
+                raise ConnectionError("connection reset")
+        ids = [i for i in range(ROWS) if i % TotalSegments == Segment]
+        if ExclusiveStartKey:
+            after = int(ExclusiveStartKey["id"]["N"])
+            ids = [i for i in ids if i > after]
+        page, rest = ids[:Limit], ids[Limit:]
+        response = {"Items": [{"id": {"N": str(i)}, "name": {"S": f"row {i}"}} for i in page],
+                    "ConsumedCapacity": {"CapacityUnits": 0.5}}
+        if rest:
+            response["LastEvaluatedKey"] = {"id": {"N": str(page[-1])}}
+        return response
+
+
+def exported_ids(out_dir: str) -> list:
+    ids = []
+    for s in range(SEGMENTS):
+        path = os.path.join(out_dir, "Appointments", f"segment-{s:04d}.jsonl.gz")
+        if os.path.exists(path):
+            with gzip.open(path, "rt") as f:
+                ids.extend(json.loads(line)["id"] for line in f)
+    return sorted(ids)
+
+
+class ExportTableTest(unittest.TestCase):
+
+    def setUp(self):
+        self.out = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.out)
+
+    def export(self, client, resume=False):
+        with mock.patch.object(export_data, "make_client", return_value=client):
+            return export_table("Appointments", self.out, segments=SEGMENTS, rcu_per_second=1e6,
+                                page_size=3, resume=resume)
+
+    def test_full_export_writes_every_row_once(self):
+        summary = self.export(FakeScanClient())
+        self.assertTrue(summary["complete"])
+        self.assertEqual(summary["rows"], ROWS)
+        self.assertEqual(exported_ids(self.out), list(range(ROWS)))
+        with open(os.path.join(self.out, "Appointments", "manifest.json")) as f:
+            self.assertEqual(len(json.load(f)["files"]), SEGMENTS)
+
+    def test_resume_after_a_failure_neither_loses_nor_duplicates_rows(self):
+        with self.assertRaises(ConnectionError):
+            self.export(FakeScanClient(fail_after=6))
+        self.assertFalse(os.path.exists(os.path.join(self.out, "Appointments", "manifest.json")))
+
+        # A page written after the last checkpoint save is cut off on resume
+        with open(os.path.join(self.out, "Appointments", "segment-0000.jsonl.gz"), "ab") as f:
+            f.write(gzip.compress(b'{"id": 0}\n'))
+
+        summary = self.export(FakeScanClient(), resume=True)
+        self.assertTrue(summary["complete"])
+        self.assertLess(summary["rows_this_run"], ROWS)
+        self.assertEqual(exported_ids(self.out), list(range(ROWS)))
+
+    def test_existing_checkpoint_needs_resume(self):
+        with self.assertRaises(ConnectionError):
+            self.export(FakeScanClient(fail_after=2))
+        with self.assertRaises(SystemExit):
+            self.export(FakeScanClient())
+
+    def test_resume_requires_the_same_segment_count(self):
+        with self.assertRaises(ConnectionError):
+            self.export(FakeScanClient(fail_after=2))
+        with mock.patch.object(export_data, "make_client", return_value=FakeScanClient()):
+            with self.assertRaises(SystemExit):
+                export_table("Appointments", self.out, segments=SEGMENTS * 2, resume=True)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,99 @@
+import asyncio
+import threading
+import unittest
+
+from app.services.idempotency import ToolCallCache, current_turn_tools
+
+
+class Counter:
+    def __init__(self, result=None):
+        self.result = result or {"success": True}
+        self.calls = 0
+
+    def __call__(self, **kwargs):
+        self.calls += 1
+        return self.result
+
+
+class ToolCallCacheTest(unittest.TestCase):
+
+    def test_repeated_call_is_served_from_cache(self):
+        cache, hold = ToolCallCache(), Counter()
+        cache.call("+15550101", "hold_slot", hold, {"slot_id": "2099-01-05-10:00"})
+        cache.call("+15550101", "hold_slot", hold, {"slot_id": " 2099-01-05-10:00 "})
+        self.assertEqual(hold.calls, 1)
+        self.assertEqual(cache.snapshot()["hits"], 1)
+
+    def test_conversations_do_not_share_results(self):
+        cache, hold = ToolCallCache(), Counter()
+        cache.call("+15550101", "hold_slot", hold, {"slot_id": "a"})
+        cache.call("+15550102", "hold_slot", hold, {"slot_id": "a"})
+        self.assertEqual(hold.calls, 2)
+
+    def test_failures_are_not_cached(self):
+        cache, hold = ToolCallCache(), Counter({"success": False, "message": "taken"})
+        cache.call("+15550101", "hold_slot", hold, {"slot_id": "a"})
+        cache.call("+15550101", "hold_slot", hold, {"slot_id": "a"})
+        self.assertEqual(hold.calls, 2)
+
+    def test_mutation_clears_the_conversations_other_entries(self):
+        cache, hold, cancel = ToolCallCache(), Counter(), Counter()
+        cache.call("+15550101", "hold_slot", hold, {"slot_id": "a"})
+        cache.call("+15550101", "cancel_appointment", cancel, {"appointment_id": "x"})
+        cache.call("+15550101", "hold_slot", hold, {"slot_id": "a"})
+        self.assertEqual(hold.calls, 2)
+
+    def test_slot_changes_drop_cached_reads_only(self):
+        cache, slots, hold = ToolCallCache(), Counter(), Counter()
+        cache.call("+15550101", "get_available_slots", slots, {"date": "2099-01-05"})
+        cache.call("+15550101", "hold_slot", hold, {"slot_id": "a"})
+        cache.invalidate_reads()
+        cache.call("+15550101", "get_available_slots", slots, {"date": "2099-01-05"})
+        cache.call("+15550101", "hold_slot", hold, {"slot_id": "a"})
+        self.assertEqual((slots.calls, hold.calls), (2, 1))
+
+    def test_entries_expire(self):
+        cache, slots = ToolCallCache(window_seconds=0), Counter()
+        cache.call("+15550101", "get_available_slots", slots, {})
+        cache.call("+15550101", "get_available_slots", slots, {})
+        self.assertEqual(slots.calls, 2)
+
+    def test_calls_without_a_conversation_always_run(self):
+        cache, slots = ToolCallCache(), Counter()
+        tools = []
+        token = current_turn_tools.set(tools)
+        try:
+            cache.call(None, "get_available_slots", slots, {})
+            cache.call(None, "get_available_slots", slots, {})
+        finally:
+            current_turn_tools.reset(token)
+        self.assertEqual(slots.calls, 2)
+        self.assertEqual(tools, ["get_available_slots", "get_available_slots"])
+        self.assertEqual(cache.snapshot()["entries"], 0)
+
+    def test_parallel_duplicate_waits_for_the_call_in_flight(self):
+        cache = ToolCallCache()
+        started, release = threading.Event(), threading.Event()
+        calls = []
+
+        def hold(**kwargs):
+            calls.append(kwargs)
+            started.set()
+            release.wait(5)
+            return {"success": True, "hold_token": "1.ab"}
+
+        async def scenario():
+            first = asyncio.create_task(cache.acall("+15550101", "hold_slot", hold, {"slot_id": "a"}))
+            await asyncio.to_thread(started.wait, 5)
+            second = asyncio.create_task(cache.acall("+15550101", "hold_slot", hold, {"slot_id": "a"}))
+            await asyncio.sleep(0.05)
+            release.set()
+            return await first, await second
+
+        first, second = asyncio.run(scenario())
+        self.assertEqual(first, second)
+        self.assertEqual(len(calls), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,106 @@
+import asyncio
+import unittest
+
+from app.voice.pipeline import InboundAudioQueue, OutboundAudioPacer, OUTBOUND_CHUNK_BYTES, MULAW_BYTES_PER_MS
+
+FLUSH = object()
+
+
+class FakeWebSocket:
+    def __init__(self):
+        self.sent = []
+
+    async def send_json(self, message):
+        self.sent.append(message)
+
+    def events(self, kind):
+        return [m for m in self.sent if m["event"] == kind]
+
+
+class InboundAudioQueueTest(unittest.TestCase):
+
+    def test_oldest_audio_is_dropped_over_the_cap(self):
+        async def scenario():
+            queue = InboundAudioQueue(max_bytes=10)
+            for chunk in (b"aaaa", FLUSH, b"bbbb", b"cccc"):
+                queue.put_nowait(chunk)
+            return [await queue.get() for _ in range(3)], queue.stats()
+        items, stats = asyncio.run(scenario())
+        # The control item survives; only the oldest audio went
+        self.assertEqual(items, [FLUSH, b"bbbb", b"cccc"])
+        self.assertEqual((stats["dropped_chunks"], stats["dropped_bytes"]), (1, 4))
+
+    def test_drain_keeps_control_items(self):
+        async def scenario():
+            queue = InboundAudioQueue()
+            for chunk in (b"aa", FLUSH, b"bb", None):
+                queue.put_nowait(chunk)
+            drained = queue.drain_audio()
+            return drained, [await queue.get(), await queue.get()], queue.stats()["queued_bytes"]
+        drained, items, queued = asyncio.run(scenario())
+        self.assertEqual(drained, 2)
+        self.assertEqual(items, [FLUSH, None])
+        self.assertEqual(queued, 0)
+
+    def test_get_waits_for_the_next_item(self):
+        async def scenario():
+            queue = InboundAudioQueue()
+            waiter = asyncio.create_task(queue.get())
+            await asyncio.sleep(0)
+            queue.put_nowait(b"late")
+            return await asyncio.wait_for(waiter, 1)
+        self.assertEqual(asyncio.run(scenario()), b"late")
+
+
+class OutboundAudioPacerTest(unittest.TestCase):
+
+    def run_pacer(self, pacer, seconds):
+        async def scenario():
+            task = asyncio.create_task(pacer.run())
+            await asyncio.sleep(seconds)
+            task.cancel()
+        asyncio.run(scenario())
+
+    def test_buffer_is_capped(self):
+        pacer = OutboundAudioPacer(FakeWebSocket(), max_bytes=1000)
+        pacer.push(b"x" * 1500)
+        self.assertEqual(pacer.stats()["buffered_bytes"], 1000)
+        self.assertEqual(pacer.dropped_bytes, 500)
+
+    def test_sends_only_the_lead_ahead_of_playback(self):
+        websocket = FakeWebSocket()
+        pacer = OutboundAudioPacer(websocket, lead_ms=200)
+        pacer.stream_sid = "MZ1"
+        pacer.push(b"x" * 8000 * 2)     # 2s of audio
+        self.run_pacer(pacer, 0.05)
+        sent_ms = pacer.sent_bytes / MULAW_BYTES_PER_MS
+        self.assertGreaterEqual(sent_ms, 200)
+        self.assertLessEqual(sent_ms, 200 + 50 + OUTBOUND_CHUNK_BYTES / MULAW_BYTES_PER_MS)
+        # Every media message is followed by its mark
+        self.assertEqual(len(websocket.events("media")), len(websocket.events("mark")))
+
+    def test_mark_echo_reanchors_playback(self):
+        websocket = FakeWebSocket()
+        pacer = OutboundAudioPacer(websocket, lead_ms=200)
+        pacer.stream_sid = "MZ1"
+        pacer.push(b"x" * 8000 * 2)
+        self.run_pacer(pacer, 0.02)
+        before = pacer.sent_bytes
+        # Twilio reports it has played everything sent so far
+        pacer.on_mark(websocket.events("mark")[-1]["mark"]["name"])
+        self.assertEqual(pacer.stats()["pending_marks"], 0)
+        self.run_pacer(pacer, 0.02)
+        self.assertGreater(pacer.sent_bytes, before)
+
+    def test_clear_purges_both_buffers(self):
+        websocket = FakeWebSocket()
+        pacer = OutboundAudioPacer(websocket)
+        pacer.stream_sid = "MZ1"
+        pacer.push(b"x" * 4000)
+        asyncio.run(pacer.clear())
+        self.assertEqual(pacer.stats()["buffered_bytes"], 0)
+        self.assertEqual(websocket.events("clear"), [{"event": "clear", "streamSid": "MZ1"}])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,50 @@
+import unittest
+from datetime import datetime
+
+from app.background.reminders import index_item, _reminder_text
+
+
+NOW = datetime(2099, 1, 5, 9, 0)
+
+
+def text(slot_id, now=NOW):
+    return _reminder_text({"slot_id": slot_id}, now)
+
+
+class ReminderTextTest(unittest.TestCase):
+
+    def test_hour_before_reports_the_minutes_left(self):
+        self.assertIn("in 60 minutes, at 10:00", text("2099-01-05-10:00"))
+        # A catch-up send after a restart is not "in one hour"
+        self.assertIn("in 20 minutes, at 09:20", text("2099-01-05-09:20"))
+        self.assertIn("in 1 minute, at 09:00", text("2099-01-05-09:00", datetime(2099, 1, 5, 8, 59, 40)))
+
+    def test_day_before_names_the_day(self):
+        self.assertIn("tomorrow at 08:00", text("2099-01-06-08:00"))
+        self.assertIn("today at 17:00", text("2099-01-05-17:00"))
+
+
+class IndexItemTest(unittest.TestCase):
+
+    def test_booking_well_ahead_gets_both_reminders(self):
+        item = index_item("a1", "2099-01-07-10:00", "+15550101", booked_at=NOW)
+        self.assertNotIn("sent_day_before", item)
+        self.assertNotIn("sent_hour_before", item)
+
+    def test_booking_inside_a_window_skips_that_reminder(self):
+        item = index_item("a1", "2099-01-05-15:00", "+15550101", booked_at=NOW)
+        self.assertIn("sent_day_before", item)
+        self.assertNotIn("sent_hour_before", item)
+
+        item = index_item("a1", "2099-01-05-09:30", "+15550101", booked_at=NOW)
+        self.assertIn("sent_day_before", item)
+        self.assertIn("sent_hour_before", item)
+
+    def test_unknown_booking_time_skips_nothing(self):
+        # Backfilled appointments were booked at some unknown earlier time
+        item = index_item("a1", "2099-01-05-09:30", "+15550101")
+        self.assertNotIn("sent_hour_before", item)
+
+
+if __name__ == "__main__":
+    unittest.main()
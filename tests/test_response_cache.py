@@ -0,0 +1,124 @@
+import unittest
+
+from app.services.llm_interface import LLMInterface
+from app.services.idempotency import current_conversation, current_turn_tools
+from app.services.slots import bump_availability_version
+from app.services.response_cache import CachedLLM, normalize_prompt
+
+
+class FakeLLM(LLMInterface):
+    """Counts model calls; optionally reports a tool call and existing history."""
+
+    def __init__(self, reply="We have 10:00 and 11:00 tomorrow.", tools=("get_available_slots",), context=False):
+        self.reply = reply
+        self.tools = tools
+        self.context = context
+        self.calls = 0
+        self.exchanges = []
+
+    def generate_response(self, prompt: str) -> str:
+        self.calls += 1
+        turn_tools = current_turn_tools.get()
+        if turn_tools is not None:
+            turn_tools.extend(self.tools)
+        return self.reply
+
+    def add_exchange(self, prompt: str, reply: str):
+        self.exchanges.append((current_conversation.get(), prompt))
+
+    def has_context(self) -> bool:
+        return self.context
+
+
+def ask(llm, conversation, text):
+    token = current_conversation.set(conversation)
+    try:
+        return llm.generate_response(f"[User Phone: {conversation}] {text}")
+    finally:
+        current_conversation.reset(token)
+
+
+class NormalizePromptTest(unittest.TestCase):
+
+    def test_word_order_and_filler_share_a_key(self):
+        self.assertEqual(normalize_prompt("What times tomorrow?"), normalize_prompt("any times tomorrow please"))
+        self.assertEqual(normalize_prompt("what times tomorrow"), normalize_prompt("Tomorrow, what times?"))
+
+    def test_phone_prefix_is_ignored(self):
+        self.assertEqual(normalize_prompt("[User Phone: +15550100] What times tomorrow?"),
+                         normalize_prompt("What times tomorrow?"))
+
+    def test_actions_and_small_talk_are_uncacheable(self):
+        self.assertIsNone(normalize_prompt("Book the 10am slot"))
+        self.assertIsNone(normalize_prompt("yes"))
+        self.assertIsNone(normalize_prompt("My number is +15550100"))
+
+
+class CachedLLMTest(unittest.TestCase):
+
+    def test_fresh_questions_are_shared_across_patients(self):
+        inner = FakeLLM()
+        llm = CachedLLM(inner)
+        first = ask(llm, "+15550101", "What times tomorrow?")
+        second = ask(llm, "+15550102", "what times tomorrow")
+        self.assertEqual(first, second)
+        self.assertEqual(inner.calls, 1)
+        # The hit is recorded in the second patient's own history
+        self.assertEqual(inner.exchanges, [("+15550102", "[User Phone: +15550102] what times tomorrow")])
+
+    def test_replies_after_history_stay_in_their_conversation(self):
+        inner = FakeLLM(context=True)
+        llm = CachedLLM(inner)
+        ask(llm, "+15550101", "What times tomorrow?")
+        ask(llm, "+15550102", "What times tomorrow?")
+        self.assertEqual(inner.calls, 2)
+        ask(llm, "+15550101", "What times tomorrow?")
+        self.assertEqual(inner.calls, 2)
+
+    def test_context_words_are_never_shared(self):
+        inner = FakeLLM()
+        llm = CachedLLM(inner)
+        ask(llm, "+15550101", "any other times?")
+        ask(llm, "+15550102", "any other times?")
+        self.assertEqual(inner.calls, 2)
+
+    def test_reply_quoting_the_sender_is_not_shared(self):
+        inner = FakeLLM(reply="Hi +1 555-010-1, we have 10:00 tomorrow.")
+        llm = CachedLLM(inner)
+        ask(llm, "+15550101", "What times tomorrow?")
+        ask(llm, "+15550102", "What times tomorrow?")
+        self.assertEqual(inner.calls, 2)
+
+    def test_slot_change_invalidates_availability_answers(self):
+        inner = FakeLLM()
+        llm = CachedLLM(inner)
+        ask(llm, "+15550101", "What times tomorrow?")
+        bump_availability_version()
+        ask(llm, "+15550102", "What times tomorrow?")
+        self.assertEqual(inner.calls, 2)
+        self.assertEqual(llm.snapshot()["invalidations"], 1)
+
+    def test_availability_answer_without_the_tool_is_not_cached(self):
+        inner = FakeLLM(tools=())
+        llm = CachedLLM(inner)
+        ask(llm, "+15550101", "What times tomorrow?")
+        ask(llm, "+15550101", "What times tomorrow?")
+        self.assertEqual(inner.calls, 2)
+
+    def test_faq_answer_without_tools_is_cached(self):
+        inner = FakeLLM(reply="We're at 12 Main Street.", tools=())
+        llm = CachedLLM(inner)
+        ask(llm, "+15550101", "Where are you located?")
+        ask(llm, "+15550102", "where are you located")
+        self.assertEqual(inner.calls, 1)
+
+    def test_writes_are_never_cached(self):
+        inner = FakeLLM(tools=("get_available_slots", "hold_slot"))
+        llm = CachedLLM(inner)
+        ask(llm, "+15550101", "What times tomorrow?")
+        ask(llm, "+15550102", "What times tomorrow?")
+        self.assertEqual(inner.calls, 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,84 @@
+import unittest
+from datetime import datetime
+from unittest import mock
+
+from app.services import slots
+from app.services.slots import slot_time_range, find_available_slots
+
+NOW = datetime(2099, 1, 5, 10, 30)
+
+
+class SlotTimeRangeTest(unittest.TestCase):
+
+    def test_later_date_is_unbounded(self):
+        self.assertEqual(slot_time_range("2099-01-06", NOW), ("", "24:00"))
+
+    def test_today_starts_after_now(self):
+        self.assertEqual(slot_time_range("2099-01-05", NOW), ("10:30", "24:00"))
+
+    def test_past_date_matches_nothing(self):
+        self.assertIsNone(slot_time_range("2099-01-04", NOW))
+
+    def test_windows_include_their_start_and_exclude_their_end(self):
+        self.assertEqual(slot_time_range("2099-01-06", NOW, "morning"), ("", "11:59"))
+        self.assertEqual(slot_time_range("2099-01-06", NOW, "afternoon"), ("11:59", "16:59"))
+        self.assertEqual(slot_time_range("2099-01-06", NOW, "evening"), ("16:59", "23:59"))
+
+    def test_window_already_gone_today(self):
+        self.assertIsNone(slot_time_range("2099-01-05", datetime(2099, 1, 5, 12, 0), "morning"))
+        self.assertEqual(slot_time_range("2099-01-05", NOW, "morning"), ("10:30", "11:59"))
+
+    def test_exact_time(self):
+        self.assertEqual(slot_time_range("2099-01-06", NOW, "exact_time", "9:00"), ("08:59", "09:00"))
+        self.assertEqual(slot_time_range("2099-01-06", NOW, "exact_time", "00:00"), ("", "00:00"))
+        self.assertIsNone(slot_time_range("2099-01-05", NOW, "exact_time", "10:00"))
+
+    def test_unparseable_exact_time_falls_back_to_the_whole_day(self):
+        self.assertEqual(slot_time_range("2099-01-06", NOW, "exact_time", "noonish"), ("", "24:00"))
+
+    def test_unknown_preference_is_ignored(self):
+        self.assertEqual(slot_time_range("2099-01-06", NOW, "whenever"), ("", "24:00"))
+
+
+class FakeClient:
+    """Serves scan pages of typed items and keeps the requests it saw."""
+
+    def __init__(self, pages):
+        self.pages = list(pages)
+        self.requests = []
+
+    def scan(self, **kwargs):
+        self.requests.append(kwargs)
+        items = [{"slot_id": {"S": sid}, "start_time": {"S": sid[-5:]}} for sid in self.pages.pop(0)]
+        return {"Items": items, **({"LastEvaluatedKey": {"slot_id": {"S": "x"}}} if self.pages else {})}
+
+
+class FindAvailableSlotsTest(unittest.TestCase):
+
+    def test_compact_sorted_payload_across_pages(self):
+        client = FakeClient([["2099-01-05-15:00"], ["2099-01-05-11:00"]])
+        with mock.patch.object(slots, "dynamodb_client", client):
+            found = find_available_slots("2099-01-05", NOW)
+        self.assertEqual(found, [{"slot_id": "2099-01-05-11:00", "time": "11:00"},
+                                 {"slot_id": "2099-01-05-15:00", "time": "15:00"}])
+        self.assertEqual(len(client.requests), 2)
+
+    def test_bounds_are_filtered_server_side(self):
+        client = FakeClient([[]])
+        with mock.patch.object(slots, "dynamodb_client", client):
+            find_available_slots("2099-01-05", NOW, "afternoon")
+        request = client.requests[0]
+        self.assertIn("start_time > :earliest", request["FilterExpression"])
+        self.assertEqual(request["ExpressionAttributeValues"][":earliest"], {"S": "11:59"})
+        self.assertEqual(request["ExpressionAttributeValues"][":latest"], {"S": "16:59"})
+        self.assertEqual(request["ProjectionExpression"], "slot_id, start_time")
+
+    def test_no_scan_when_nothing_can_match(self):
+        client = FakeClient([])
+        with mock.patch.object(slots, "dynamodb_client", client):
+            self.assertEqual(find_available_slots("2099-01-04", NOW), [])
+        self.assertEqual(client.requests, [])
+
+
+if __name__ == "__main__":
+    unittest.main()
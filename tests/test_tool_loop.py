@@ -0,0 +1,83 @@
+import uuid
+import unittest
+
+from app.services.llm_interface import ToolCall
+from app.services.tool_loop import ToolExecutor, ToolLoopLLM
+from app.services.idempotency import current_conversation
+
+
+class ScriptedLLM(ToolLoopLLM):
+    """Asks for get_available_slots once, then answers; records the history each round saw."""
+
+    def __init__(self):
+        self.slots_calls = 0
+
+        def get_available_slots(**kwargs):
+            self.slots_calls += 1
+            return {"success": True, "slots": ["10:00"]}
+
+        super().__init__(ToolExecutor({"get_available_slots": get_available_slots}))
+        self.seen = []
+
+    async def astream_turn(self, history: list):
+        self.seen.append(len(history))
+        if history[-1]["role"] == "user":
+            yield ToolCall(name="get_available_slots", args={"date": "2099-01-05"})
+        else:
+            yield "We have 10:00."
+
+
+def ask(llm, conversation, text):
+    token = current_conversation.set(conversation)
+    try:
+        return llm.generate_response(text)
+    finally:
+        current_conversation.reset(token)
+
+
+class ToolLoopTest(unittest.TestCase):
+
+    def setUp(self):
+        # Fresh ids: the process-wide tool cache would serve repeats from earlier tests
+        self.alice, self.bob = f"alice-{uuid.uuid4()}", f"bob-{uuid.uuid4()}"
+
+    def test_tool_results_are_fed_back_until_the_model_answers(self):
+        llm = ScriptedLLM()
+        self.assertEqual(ask(llm, self.alice, "What times?"), "We have 10:00.")
+        self.assertEqual(llm.slots_calls, 1)
+        self.assertEqual(llm.seen, [1, 3])
+
+    def test_history_is_kept_per_conversation(self):
+        llm = ScriptedLLM()
+        ask(llm, self.alice, "What times?")
+        ask(llm, self.bob, "What times?")
+        self.assertEqual(llm.seen, [1, 3, 1, 3])
+        ask(llm, self.alice, "And tomorrow?")
+        self.assertEqual(llm.seen[-2], 5)
+
+    def test_calls_without_a_conversation_share_no_history(self):
+        llm = ScriptedLLM()
+        ask(llm, None, "What times?")
+        ask(llm, None, "What times?")
+        self.assertEqual(llm.seen, [1, 3, 1, 3])
+
+        token = current_conversation.set(None)
+        try:
+            llm.add_exchange("Where are you?", "12 Main Street.")
+            self.assertFalse(llm.has_context())
+        finally:
+            current_conversation.reset(token)
+
+    def test_add_exchange_gives_the_conversation_context(self):
+        llm = ScriptedLLM()
+        token = current_conversation.set(self.alice)
+        try:
+            self.assertFalse(llm.has_context())
+            llm.add_exchange("Where are you?", "12 Main Street.")
+            self.assertTrue(llm.has_context())
+        finally:
+            current_conversation.reset(token)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,75 @@
+import unittest
+
+import numpy as np
+
+from app.voice import vad
+from app.voice.vad import VoiceActivityDetector, FRAME_MS
+
+SAMPLES_PER_FRAME = 8000 * FRAME_MS // 1000
+FRAME_BYTES = SAMPLES_PER_FRAME * 2
+_rng = np.random.default_rng(7)
+
+
+def tone(amplitude=3000.0, hz=200.0, frame=0) -> bytes:
+    t = (np.arange(SAMPLES_PER_FRAME) + frame * SAMPLES_PER_FRAME) / 8000
+    return (amplitude * np.sin(2 * np.pi * hz * t)).astype(np.int16).tobytes()
+
+
+def quiet() -> bytes:
+    return _rng.normal(0, 30, SAMPLES_PER_FRAME).astype(np.int16).tobytes()
+
+
+def hiss() -> bytes:
+    # Loud but sign-flipping on every sample: static, not speech
+    return (np.resize([4000, -4000], SAMPLES_PER_FRAME)).astype(np.int16).tobytes()
+
+
+class VoiceActivityDetectorTest(unittest.TestCase):
+
+    def test_silence_is_not_forwarded(self):
+        detector = VoiceActivityDetector()
+        for _ in range(50):
+            self.assertEqual(detector.process(quiet()), (b"", False))
+        self.assertEqual(detector.stats()["suppressed_ratio"], 1.0)
+
+    def test_onset_carries_the_preroll(self):
+        detector = VoiceActivityDetector()
+        for _ in range(20):
+            detector.process(quiet())
+        out, _ = detector.process(tone())
+        preroll_frames = vad.PREROLL_MS // FRAME_MS
+        self.assertEqual(len(out), (preroll_frames + 1) * FRAME_BYTES)
+        self.assertEqual(detector.utterances, 1)
+
+    def test_end_of_speech_after_the_hangover(self):
+        detector = VoiceActivityDetector()
+        for i in range(25):
+            detector.process(tone(frame=i))
+        ends = [detector.process(quiet())[1] for _ in range(vad.HANGOVER_MS // FRAME_MS)]
+        self.assertEqual(ends, [False] * (len(ends) - 1) + [True])
+        self.assertFalse(detector.speaking)
+        self.assertEqual(detector.process(quiet()), (b"", False))
+
+    def test_hiss_is_not_speech(self):
+        detector = VoiceActivityDetector()
+        for _ in range(25):
+            self.assertEqual(detector.process(hiss()), (b"", False))
+
+    def test_quiet_speech_is_amplified(self):
+        detector = VoiceActivityDetector()
+        for i in range(50):
+            out, _ = detector.process(tone(amplitude=1200, frame=i))
+        level = np.abs(np.frombuffer(out, dtype=np.int16)).max()
+        self.assertGreater(level, 1200 * 2)
+
+    def test_steady_noise_above_the_threshold_is_learned(self):
+        detector = VoiceActivityDetector()
+        # 20s of a constant hum that passes the speech checks at first
+        for i in range(1000):
+            detector.process(tone(amplitude=1000, hz=100, frame=i))
+        self.assertEqual(detector.process(tone(amplitude=1000, hz=100, frame=1000))[0], b"")
+        self.assertFalse(detector.speaking)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,180 @@
+import os
+import time
+import uuid
+import unittest
+from unittest import mock
+
+from app.services import waitlist
+from app.services.waitlist import WaitlistIndex, WAITING, OFFERED
+
+
+def entry(phone="+15550101", joined_at=1, start="2099-01-05", end=None, earliest="09:00", latest="17:00"):
+    return {
+        "entry_id": str(uuid.uuid4()), "phone_number": phone, "start_date": start, "end_date": end or start,
+        "earliest_time": earliest, "latest_time": latest, "status": WAITING,
+        "joined_at": joined_at, "offered_slot_id": None,
+    }
+
+
+def offer(index: WaitlistIndex, found: dict, slot_id: str):
+    # What _match does with the candidate it popped
+    found["status"] = OFFERED
+    found["offered_slot_id"] = slot_id
+    index.offers_by_phone[found["phone_number"]] = found
+    index.offers_by_slot[slot_id] = found
+
+
+class WaitlistIndexTest(unittest.TestCase):
+
+    def test_longest_waiting_patient_gets_the_slot(self):
+        index = WaitlistIndex()
+        late, early = entry("+15550102", joined_at=20), entry("+15550101", joined_at=10)
+        index.add(late)
+        index.add(early)
+        self.assertIs(index.pop_candidate("2099-01-05-10:00"), early)
+
+    def test_window_inside_the_hour_is_respected(self):
+        index = WaitlistIndex()
+        index.add(entry(earliest="10:30", latest="12:00"))
+        self.assertIsNone(index.pop_candidate("2099-01-05-10:00"))
+        self.assertIsNotNone(index.pop_candidate("2099-01-05-10:30"))
+
+    def test_dates_outside_the_range_never_match(self):
+        index = WaitlistIndex()
+        index.add(entry(start="2099-01-05", end="2099-01-06"))
+        self.assertIsNone(index.pop_candidate("2099-01-07-10:00"))
+        self.assertIsNotNone(index.pop_candidate("2099-01-06-10:00"))
+
+    def test_offered_entry_leaves_every_bucket(self):
+        index = WaitlistIndex()
+        found = entry(start="2099-01-05", end="2099-01-06")
+        index.add(found)
+        self.assertIs(index.pop_candidate("2099-01-05-10:00"), found)
+        offer(index, found, "2099-01-05-10:00")
+        self.assertIsNone(index.pop_candidate("2099-01-06-11:00"))
+
+    def test_requeued_entry_keeps_its_place(self):
+        index = WaitlistIndex()
+        first, second = entry("+15550101", joined_at=10), entry("+15550102", joined_at=20)
+        index.add(first)
+        index.add(second)
+        found = index.pop_candidate("2099-01-05-10:00")
+        offer(index, found, "2099-01-05-10:00")
+        # The hold failed: back to WAITING at the original join time
+        found["status"] = WAITING
+        index.end_offer(found)
+        index.requeue(found)
+        self.assertIs(index.pop_candidate("2099-01-05-11:00"), first)
+
+    def test_phone_with_an_offer_is_parked_until_it_resolves(self):
+        index = WaitlistIndex()
+        a, b = entry("+15550101", joined_at=10), entry("+15550101", joined_at=11, start="2099-01-06")
+        other = entry("+15550102", joined_at=30, start="2099-01-06")
+        for e in (a, b, other):
+            index.add(e)
+        offer(index, index.pop_candidate("2099-01-05-10:00"), "2099-01-05-10:00")
+        # The same patient's second entry is skipped while their offer is out
+        self.assertIs(index.pop_candidate("2099-01-06-10:00"), other)
+        a["status"] = "DECLINED"
+        index.end_offer(a)
+        self.assertIs(index.pop_candidate("2099-01-06-10:00"), b)
+
+    def test_prune_drops_past_and_finished_entries(self):
+        index = WaitlistIndex()
+        past, done, live = entry(start="2099-01-01"), entry(), entry()
+        for e in (past, done, live):
+            index.add(e)
+        done["status"] = "FULFILLED"
+        index.prune("2099-01-02")
+        self.assertEqual(set(index.entries), {live["entry_id"]})
+        self.assertEqual(index.size(), 1)
+
+
+class RefreshTest(unittest.TestCase):
+    """The index follows the Waitlist table, so other workers' joins are matched here."""
+
+    def setUp(self):
+        waitlist._refreshed_at = None
+        waitlist._recent_joins = []
+
+    def tearDown(self):
+        waitlist._refreshed_at = None
+        waitlist._index = WaitlistIndex()
+
+    def test_entries_joined_elsewhere_are_picked_up(self):
+        remote = entry("+15550109")
+        with mock.patch.object(waitlist, "_scan_active", return_value=[remote]):
+            waitlist._refresh()
+        self.assertIs(waitlist._index.pop_candidate("2099-01-05-10:00"), remote)
+
+    def test_local_join_missed_by_the_scan_is_kept(self):
+        local = entry("+15550108")
+        waitlist._recent_joins.append(local)
+        with mock.patch.object(waitlist, "_scan_active", return_value=[]):
+            waitlist._refresh()
+        self.assertIn(local["entry_id"], waitlist._index.entries)
+
+    def test_refresh_is_throttled(self):
+        with mock.patch.object(waitlist, "_scan_active", return_value=[]) as scan:
+            waitlist._refresh()
+            waitlist._refresh()
+        self.assertEqual(scan.call_count, 1)
+
+    def test_failed_scan_keeps_the_current_index(self):
+        kept = entry()
+        waitlist._index.add(kept)
+        with mock.patch.object(waitlist, "_scan_active", side_effect=RuntimeError("down")):
+            waitlist._refresh()
+        self.assertIn(kept["entry_id"], waitlist._index.entries)
+
+
+@unittest.skipUnless(os.getenv("DYNAMODB_ENDPOINT_URL"), "set DYNAMODB_ENDPOINT_URL to DynamoDB Local")
+class CrossWorkerMatchTest(unittest.TestCase):
+    SLOT_ID = "2099-01-05-10:00"
+
+    @classmethod
+    def setUpClass(cls):
+        from setup_slots import create_receptionist_tables
+        create_receptionist_tables()
+
+    def setUp(self):
+        waitlist._refreshed_at = None
+        waitlist.bookings.slots_table.put_item(Item={
+            "slot_id": self.SLOT_ID, "date": "2099-01-05", "start_time": "10:00",
+            "status": "AVAILABLE", "is_available": True, "version": 0,
+        })
+
+    def tearDown(self):
+        waitlist.bookings.slots_table.delete_item(Key={"slot_id": self.SLOT_ID})
+        waitlist._refreshed_at = None
+
+    def test_release_is_offered_to_a_patient_who_joined_on_another_worker(self):
+        remote = entry("+15550107", joined_at=int(time.time() * 1000))
+        waitlist.waitlist_table.put_item(Item={k: v for k, v in remote.items() if v is not None})
+        try:
+            waitlist._refresh()
+            waitlist._match(self.SLOT_ID)
+            stored = waitlist.waitlist_table.get_item(Key={"entry_id": remote["entry_id"]})["Item"]
+            self.assertEqual(stored["status"], OFFERED)
+            self.assertEqual(stored["offered_slot_id"], self.SLOT_ID)
+        finally:
+            waitlist.waitlist_table.delete_item(Key={"entry_id": remote["entry_id"]})
+
+    def test_entry_offered_by_another_worker_is_not_offered_again(self):
+        remote = entry("+15550106", joined_at=int(time.time() * 1000))
+        waitlist.waitlist_table.put_item(Item={k: v for k, v in remote.items() if v is not None})
+        try:
+            waitlist._refresh()
+            # Another worker offers it a different slot after our refresh
+            waitlist.waitlist_table.update_item(
+                Key={"entry_id": remote["entry_id"]}, UpdateExpression="SET #s = :o",
+                ExpressionAttributeNames={"#s": "status"}, ExpressionAttributeValues={":o": OFFERED})
+            waitlist._match(self.SLOT_ID)
+            slot = waitlist.bookings.slots_table.get_item(Key={"slot_id": self.SLOT_ID})["Item"]
+            self.assertEqual(slot["status"], "AVAILABLE")
+        finally:
+            waitlist.waitlist_table.delete_item(Key={"entry_id": remote["entry_id"]})
+
+
+if __name__ == "__main__":
+    unittest.main()